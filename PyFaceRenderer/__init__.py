@@ -1 +1,19 @@
-from .renderer import FaceRenderer
\ No newline at end of file
+# exports are imported on first access, so e.g. a headless job importing
+# `PyFaceRenderer.animation` does not pull in pyrender or dearpygui
+_EXPORTS = {
+    'OffscreenFaceRenderer': '.offscreen',
+    'FaceRenderer': '.renderer',
+    'register_model': '.models',
+    'available_models': '.models',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,263 @@
+import json
+import pickle
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+import logging as log
+import numpy as np
+
+logger = log.getLogger('PyRenderer')
+
+ANIMATION_METADATA = 'metadata.json'
+VERTEX_FILE = 'vertex.npy'
+BLENDSHAPES_FILE = 'blendshapes.npy'
+
+
+class Animation:
+    """Frames of an animation, in the per-frame dict format of the README, plus its metadata"""
+
+    def __init__(self, metadata:dict, n_frames:int) -> None:
+        self.metadata = metadata
+        self.n_frames = n_frames
+
+    def __len__(self) -> int:
+        return self.n_frames
+
+    @property
+    def fps(self) -> float:
+        return self.metadata['fps']
+
+    @property
+    def audio(self) -> Optional[str]:
+        return self.metadata.get('audio', None)
+
+    def frames(self, start:int=0, stop:Optional[int]=None) -> Iterator[dict]:
+        stop = len(self) if stop is None else stop
+        for i in range(start, stop):
+            yield self[i]
+
+    def __getitem__(self, i:int) -> dict:
+        raise NotImplementedError
+
+    def frame_vertex(self, i:int) -> Optional[np.ndarray]:
+        """Vertex array of frame `i`, None if it has none"""
+        return self[i].get('vertex', None)
+
+    def vertex_frames(self, start:int=0, stop:Optional[int]=None) -> Iterator[Optional[np.ndarray]]:
+        """Vertex array of every frame in [start, stop), None for frames without one"""
+        for frame in self.frames(start, stop):
+            yield frame.get('vertex', None)
+
+    def blendshape_track(self, blendshape_names:List[str]) -> Optional[np.ndarray]:
+        """Dense [T, K] float32 coefficients with columns ordered as `blendshape_names`, None without blendshapes"""
+        raise NotImplementedError
+
+
+def _report_unknown_blendshapes(unknown:dict, n_frames:int):
+    if len(unknown) > 0:
+        report = ', '.join(f'{name} ({count}/{n_frames} frames)' for name, count in unknown.items())
+        logger.warning(f'{len(unknown)} blendshapes not found in model, ignored: {report}')
+
+
+class PickleAnimation(Animation):
+    """Legacy animation pickle: {'data': [frame, ...], 'metadata': {...}}, loaded in memory"""
+
+    def __init__(self, animation_file:Union[Path, str]) -> None:
+        with open(animation_file, 'rb') as f:
+            animation = pickle.load(f)
+        self.data = animation['data']
+        super().__init__(animation['metadata'], len(self.data))
+
+    def __getitem__(self, i:int) -> dict:
+        return self.data[i]
+
+    def blendshape_track(self, blendshape_names:List[str]) -> Optional[np.ndarray]:
+        name_to_index = {name: i for i, name in enumerate(blendshape_names)}
+        track = np.zeros((len(self), len(blendshape_names)), dtype=np.float32)
+        coe = np.zeros(len(blendshape_names), dtype=np.float32)
+        unknown = {}
+        has_blendshapes = False
+        for i, frame in enumerate(self.data):
+            if 'blendshapes' in frame:
+                has_blendshapes = True
+                for name, value in frame['blendshapes'].items():
+                    idx = name_to_index.get(name, None)
+                    if idx is None:
+                        unknown[name] = unknown.get(name, 0) + 1
+                    else:
+                        coe[idx] = value
+            # values missing from a frame keep their previous value
+            track[i] = coe
+        if not has_blendshapes:
+            return None
+        _report_unknown_blendshapes(unknown, len(self))
+        return track
+
+
+class ColumnarAnimation(Animation):
+    """Animation stored as a directory of memory-mapped arrays.
+
+    `vertex.npy` holds a [T, V, 3] float32 vertex track and `blendshapes.npy` a [T, K]
+    float32 coefficient matrix, whose column names are listed in `metadata.json`
+    together with fps and audio. Frames are read from disk in windows on demand.
+    """
+
+    def __init__(self, animation_dir:Union[Path, str], window:int=256) -> None:
+        animation_dir = Path(animation_dir)
+        with open(animation_dir / ANIMATION_METADATA, 'r') as f:
+            metadata = json.load(f)
+        self.window = window
+        self.vertex = np.load(animation_dir / VERTEX_FILE, mmap_mode='r') if (animation_dir / VERTEX_FILE).exists() else None
+        self.blendshapes = np.load(animation_dir / BLENDSHAPES_FILE, mmap_mode='r') if (animation_dir / BLENDSHAPES_FILE).exists() else None
+        self.blendshape_names:List[str] = metadata.get('blendshape_names', [])
+        tracks = [t for t in [self.vertex, self.blendshapes] if t is not None]
+        if len(tracks) == 0:
+            raise ValueError(f'No {VERTEX_FILE} or {BLENDSHAPES_FILE} in {animation_dir}')
+        n_frames = len(tracks[0])
+        assert all(len(t) == n_frames for t in tracks), 'Tracks must have the same number of frames'
+        super().__init__(metadata, n_frames)
+
+    def read(self, start:int, stop:int) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Read frames [start, stop) of the vertex and blendshape tracks into memory"""
+        vertex = np.array(self.vertex[start:stop]) if self.vertex is not None else None
+        blendshapes = np.array(self.blendshapes[start:stop]) if self.blendshapes is not None else None
+        return vertex, blendshapes
+
+    def _frame(self, vertex, blendshapes, i) -> dict:
+        frame = {}
+        if vertex is not None:
+            frame['vertex'] = vertex[i]
+        if blendshapes is not None:
+            frame['blendshapes'] = dict(zip(self.blendshape_names, blendshapes[i].tolist()))
+        return frame
+
+    def frames(self, start:int=0, stop:Optional[int]=None) -> Iterator[dict]:
+        stop = len(self) if stop is None else stop
+        for w_start in range(start, stop, self.window):
+            w_stop = min(w_start + self.window, stop)
+            vertex, blendshapes = self.read(w_start, w_stop)
+            for i in range(w_stop - w_start):
+                yield self._frame(vertex, blendshapes, i)
+
+    def __getitem__(self, i:int) -> dict:
+        vertex, blendshapes = self.read(i, i + 1)
+        return self._frame(vertex, blendshapes, 0)
+
+    def frame_vertex(self, i:int) -> Optional[np.ndarray]:
+        return None if self.vertex is None else np.array(self.vertex[i])
+
+    def vertex_frames(self, start:int=0, stop:Optional[int]=None) -> Iterator[Optional[np.ndarray]]:
+        stop = len(self) if stop is None else stop
+        if self.vertex is None:
+            yield from (None for _ in range(start, stop))
+            return
+        for w_start in range(start, stop, self.window):
+            yield from np.array(self.vertex[w_start:min(w_start + self.window, stop)])
+
+    def blendshape_track(self, blendshape_names:List[str]) -> Optional[np.ndarray]:
+        if self.blendshapes is None:
+            return None
+        name_to_index = {name: i for i, name in enumerate(blendshape_names)}
+        src, dst = [], []
+        for i, name in enumerate(self.blendshape_names):
+            if name in name_to_index:
+                src.append(i)
+                dst.append(name_to_index[name])
+        track = np.zeros((len(self), len(blendshape_names)), dtype=np.float32)
+        track[:, dst] = self.blendshapes[:, src]
+        unknown = {name: len(self) for name in self.blendshape_names if name not in name_to_index}
+        _report_unknown_blendshapes(unknown, len(self))
+        return track
+
+
+def is_columnar_animation(path:Union[Path, str]) -> bool:
+    path = Path(path)
+    return path.is_dir() and (path / ANIMATION_METADATA).exists()
+
+
+def load_animation(path:Union[Path, str]) -> Animation:
+    """Open a columnar animation directory or a legacy animation pickle"""
+    path = Path(path)
+    if is_columnar_animation(path):
+        return ColumnarAnimation(path)
+    elif path.suffix in ['.pickle', '.pkl']:
+        return PickleAnimation(path)
+    raise NotImplementedError(f'Unrecognized animation file: {path}')
+
+
+def animation_fps_and_audio(animation:Animation) -> Tuple[float, Optional[str]]:
+    """Playback fps of an animation, stretched to the length of its audio track if there is one"""
+    fps = animation.fps
+    audio_file_path = None
+    if animation.audio is not None and Path(animation.audio).exists(): # attach the audio file
+        audio_file_path = animation.audio
+        import librosa
+        sample, sr =  librosa.load(audio_file_path)
+        duration = sample.shape[-1]/sr
+        fps = len(animation)/duration
+    return fps, audio_file_path
+
+
+def save_animation(animation_dir:Union[Path, str], vertex:Optional[np.ndarray]=None, blendshapes:Optional[np.ndarray]=None,
+                   blendshape_names:Optional[List[str]]=None, fps:float=30, audio:Optional[str]=None) -> Path:
+    """Write a columnar animation directory from a [T, V, 3] vertex track and/or a [T, K] coefficient matrix"""
+    animation_dir = Path(animation_dir)
+    if vertex is None and blendshapes is None:
+        raise ValueError('Nothing to save, give a vertex track and/or blendshape coefficients')
+    if blendshapes is not None and (blendshape_names is None or len(blendshape_names) != blendshapes.shape[1]):
+        raise ValueError('One blendshape name is needed per coefficient column')
+    animation_dir.mkdir(parents=True, exist_ok=True)
+    if vertex is not None:
+        np.save(animation_dir / VERTEX_FILE, np.ascontiguousarray(vertex, dtype=np.float32))
+    if blendshapes is not None:
+        np.save(animation_dir / BLENDSHAPES_FILE, np.ascontiguousarray(blendshapes, dtype=np.float32))
+    write_animation_metadata(animation_dir, fps, audio, blendshape_names)
+    return animation_dir
+
+
+def write_animation_metadata(animation_dir:Path, fps, audio, blendshape_names):
+    metadata = {'fps': fps}
+    if audio is not None:
+        metadata['audio'] = str(audio)
+    if blendshape_names is not None:
+        metadata['blendshape_names'] = list(blendshape_names)
+    with open(animation_dir / ANIMATION_METADATA, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def convert_pickle_animation(animation_file:Union[Path, str], animation_dir:Optional[Union[Path, str]]=None) -> Path:
+    """Convert a legacy animation pickle into a columnar animation directory.
+
+    Blendshape values missing from a frame keep their previous value, as they do during playback.
+    """
+    animation_file = Path(animation_file)
+    animation_dir = animation_file.with_suffix('.anim') if animation_dir is None else Path(animation_dir)
+    animation = PickleAnimation(animation_file)
+    animation_dir.mkdir(parents=True, exist_ok=True)
+
+    names = {}
+    vertex_shape = None
+    for frame in animation.data:
+        for name in frame.get('blendshapes', {}):
+            names.setdefault(name, len(names))
+        if vertex_shape is None and 'vertex' in frame:
+            vertex_shape = np.shape(frame['vertex'])
+
+    if vertex_shape is not None:
+        vertex = np.lib.format.open_memmap(animation_dir / VERTEX_FILE, mode='w+', dtype=np.float32, shape=(len(animation), *vertex_shape))
+    if len(names) > 0:
+        blendshapes = np.lib.format.open_memmap(animation_dir / BLENDSHAPES_FILE, mode='w+', dtype=np.float32, shape=(len(animation), len(names)))
+    coe = np.zeros(len(names), dtype=np.float32)
+    for i, frame in enumerate(animation.data):
+        if vertex_shape is not None:
+            vertex[i] = frame['vertex'] if 'vertex' in frame else vertex[i-1] if i > 0 else 0.0
+        if len(names) > 0:
+            for name, value in frame.get('blendshapes', {}).items():
+                coe[names[name]] = value
+            blendshapes[i] = coe
+    if vertex_shape is not None:
+        vertex.flush()
+    if len(names) > 0:
+        blendshapes.flush()
+    write_animation_metadata(animation_dir, animation.fps, animation.audio, list(names) if len(names) > 0 else None)
+    logger.info(f'Converted {animation_file} ({len(animation)} frames) -> {animation_dir}')
+    return animation_dir
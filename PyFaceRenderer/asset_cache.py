@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import logging as log
+import numpy as np
+import pyrender
+import trimesh
+from pyrender.sampler import Sampler
+from pyrender.texture import Texture
+
+logger = log.getLogger('PyRenderer')
+
+# bump when the cached layout changes, old entries are then ignored
+CACHE_VERSION = 1
+CACHE_ENV = 'PYFACERENDERER_CACHE'
+META_FILE = 'meta.json'
+
+_PRIMITIVE_ARRAYS = ['positions', 'normals', 'indices', 'texcoord_0', 'texcoord_1', 'color_0']
+_MATERIAL_FIELDS = ['alphaMode', 'baseColorFactor', 'metallicFactor', 'roughnessFactor', 'doubleSided', 'alphaCutoff', 'smooth', 'wireframe']
+_SAMPLER_FIELDS = ['magFilter', 'minFilter', 'wrapS', 'wrapT']
+
+
+def cache_dir() -> Optional[Path]:
+    """`$PYFACERENDERER_CACHE` or `~/.cache/PyFaceRenderer`, None when the variable is set to `off`"""
+    path = os.environ.get(CACHE_ENV, None)
+    if path is None:
+        return Path.home() / '.cache' / 'PyFaceRenderer'
+    if path.lower() in ['off', '0', '']:
+        return None
+    return Path(path)
+
+
+def cache_key(sources:List[Union[Path, str]]) -> str:
+    """Hash of the resolved path, mtime and size of every source file"""
+    h = hashlib.sha1(f'v{CACHE_VERSION}'.encode())
+    for source in sources:
+        source = Path(source).resolve()
+        stat = source.stat()
+        h.update(f'{source}:{stat.st_mtime_ns}:{stat.st_size};'.encode())
+    return h.hexdigest()[:16]
+
+
+def cached_arrays(name:str, sources:List[Union[Path, str]],
+                  build_fn:Callable[[], Tuple[Dict[str, np.ndarray], dict]]) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Arrays and metadata built by `build_fn` from `sources`, loaded memory-mapped when cached.
+
+    Each entry is a directory of `.npy` files plus `meta.json`, named after `name` and the
+    key of its sources, so editing a source file simply misses the cache.
+    """
+    root = cache_dir()
+    if root is None:
+        return build_fn()
+    entry = root / f'{name}-{cache_key(sources)}'
+    if (entry / META_FILE).exists():
+        try:
+            with open(entry / META_FILE, 'r') as f:
+                meta = json.load(f)
+            arrays = {key: np.load(entry / f'{key}.npy', mmap_mode='r') for key in meta.pop('__arrays__')}
+            logger.debug(f'Loaded {name} from {entry}')
+            return arrays, meta
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f'Ignoring corrupt cache entry {entry}: {e}')
+
+    arrays, meta = build_fn()
+    # write to a private directory first, worker processes may be filling the same entry
+    tmp = entry.with_name(f'{entry.name}.tmp{os.getpid()}')
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        for key, array in arrays.items():
+            np.save(tmp / f'{key}.npy', np.ascontiguousarray(array))
+        with open(tmp / META_FILE, 'w') as f:
+            json.dump({**meta, '__arrays__': list(arrays)}, f)
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+        logger.debug(f'Cached {name} in {entry}')
+    except OSError as e:
+        logger.warning(f'Could not cache {name} in {entry}: {e}')
+        shutil.rmtree(tmp, ignore_errors=True)
+    return arrays, meta
+
+
+def mesh_to_arrays(mesh:pyrender.Mesh) -> Optional[Tuple[Dict[str, np.ndarray], dict]]:
+    """Render-ready arrays of a single-primitive mesh, None for meshes this cache cannot rebuild"""
+    if len(mesh.primitives) != 1:
+        return None
+    primitive = mesh.primitives[0]
+    material = primitive.material
+    if primitive.poses is not None or not isinstance(material, pyrender.MetallicRoughnessMaterial) or \
+        any(t is not None for t in [material.normalTexture, material.occlusionTexture, material.emissiveTexture, material.metallicRoughnessTexture]):
+        return None
+    arrays = {key: getattr(primitive, key) for key in _PRIMITIVE_ARRAYS if getattr(primitive, key) is not None}
+    meta = {'mode': int(primitive.mode),
+            'material': {key: _to_json(getattr(material, key)) for key in _MATERIAL_FIELDS},
+            'emissiveFactor': _to_json(material.emissiveFactor)}
+    texture = material.baseColorTexture
+    if texture is not None:
+        if not isinstance(texture.source, np.ndarray):
+            return None
+        arrays['base_color_texture'] = texture.source
+        meta['texture'] = {'source_channels': texture.source_channels,
+                           'sampler': {key: getattr(texture.sampler, key) for key in _SAMPLER_FIELDS}}
+    return arrays, meta
+
+
+def mesh_from_arrays(arrays:Dict[str, np.ndarray], meta:dict) -> pyrender.Mesh:
+    material = pyrender.MetallicRoughnessMaterial(emissiveFactor=meta['emissiveFactor'], **meta['material'])
+    if 'base_color_texture' in arrays:
+        material.baseColorTexture = Texture(source=arrays['base_color_texture'],
+                                            source_channels=meta['texture']['source_channels'],
+                                            sampler=Sampler(**meta['texture']['sampler']))
+    # vertex data is small and may be edited in place, only the texture stays memory-mapped
+    primitive = pyrender.Primitive(mode=meta['mode'], material=material,
+                                   **{key: np.array(arrays[key]) for key in _PRIMITIVE_ARRAYS if key in arrays})
+    return pyrender.Mesh(primitives=[primitive])
+
+
+def cached_mesh(name:str, sources:List[Union[Path, str]], build_fn:Callable[[], pyrender.Mesh]) -> pyrender.Mesh:
+    """pyrender mesh built by `build_fn`, rebuilt from cached arrays when `sources` did not change"""
+    built = []
+    def build():
+        built.append(build_fn())
+        return mesh_to_arrays(built[0]) or ({}, {'uncacheable': True})
+    arrays, meta = cached_arrays(name, sources, build)
+    if built:
+        return built[0]
+    if meta.get('uncacheable', False):
+        return build_fn()
+    return mesh_from_arrays(arrays, meta)
+
+
+def _obj_dependencies(path:Path) -> List[Path]:
+    """Material libraries and texture images referenced by an OBJ file"""
+    dependencies = []
+    with open(path, 'r', errors='ignore') as f:
+        mtllibs = [line.split(None, 1)[1].strip() for line in f if line.startswith('mtllib ')]
+    for mtllib in mtllibs:
+        mtl = path.parent / mtllib
+        if not mtl.exists():
+            continue
+        dependencies.append(mtl)
+        with open(mtl, 'r', errors='ignore') as f:
+            for line in f:
+                if line.startswith('map_') and len(line.split()) > 1:
+                    image = mtl.parent / line.split()[-1]
+                    if image.exists():
+                        dependencies.append(image)
+    return dependencies
+
+
+def load_mesh(path:Union[Path, str]) -> pyrender.Mesh:
+    """Cached equivalent of `pyrender.Mesh.from_trimesh(trimesh.load(path))`"""
+    path = Path(path)
+    return cached_mesh(path.stem, [path, *_obj_dependencies(path)] if path.suffix == '.obj' else [path],
+                       lambda: pyrender.Mesh.from_trimesh(trimesh.load(str(path))))
+
+
+def mesh_trimesh(mesh:pyrender.Mesh) -> trimesh.Trimesh:
+    """Geometry-only trimesh of a single-primitive pyrender mesh"""
+    primitive = mesh.primitives[0]
+    faces = primitive.indices if primitive.indices is not None else np.arange(len(primitive.positions)).reshape(-1, 3)
+    return trimesh.Trimesh(np.asarray(primitive.positions), np.asarray(faces), process=False)
+
+
+def _to_json(value):
+    return value.tolist() if isinstance(value, np.ndarray) else value
@@ -1,19 +1,20 @@
-import pyrender
 from typing import List, Union, Optional, Iterable
-import trimesh
 import numpy as np
 from copy import copy
 from pathlib import Path
 import logging as log
+from .asset_cache import load_mesh, mesh_trimesh
 
 class BlendshapeModel:
     def __init__(self, neutral_mesh:Union[Path, str], blendshapes: np.ndarray, blendshape_names:Optional[List[str]]=None) -> None:
         self.log = log.getLogger(self.__class__.__name__)
-        self.trimesh = trimesh.load(neutral_mesh)
-        self.neutral_mesh = pyrender.Mesh.from_trimesh(self.trimesh)
+        self.neutral_mesh = load_mesh(neutral_mesh)
+        self.trimesh = mesh_trimesh(self.neutral_mesh)
         self.neutral_position = np.asarray(self.neutral_mesh.primitives[0].positions.copy())
         self.blendshape_names = blendshape_names
         self.blendshapes = blendshapes
+        self._basis = None
+        self._sparse_basis = None
         # self.log.debug(f'BlendshapeModel: {self.blendshapes.shape}')
         self.neutral_mesh.primitives[0].blendshapes_0 = blendshapes.transpose(1, 0, 2).copy()
         self.neutral_mesh.primitives[0].test_move = 0.0
@@ -22,20 +23,69 @@ class BlendshapeModel:
     def n_blendshapes(self) -> int:
         return len(self.blendshapes)    
 
+    @property
+    def basis(self) -> np.ndarray:
+        """Blendshape deltas as a float32 [K, V*3] matrix"""
+        if self._basis is None:
+            self._basis = np.ascontiguousarray(self.blendshapes.reshape(self.n_blendshapes, -1), dtype=np.float32)
+        return self._basis
+
+    def sparse_basis(self, eps:float=1e-6):
+        """Transposed basis [V*3, K] as a scipy CSR matrix, keeping only the vertices each blendshape moves"""
+        if self._sparse_basis is None:
+            from scipy import sparse
+            basis = self.basis.reshape(self.n_blendshapes, -1, 3)
+            moving = np.abs(basis).max(axis=-1, keepdims=True) > eps
+            self._sparse_basis = sparse.csr_matrix(np.where(moving, basis, 0.0).reshape(self.n_blendshapes, -1).T)
+            self.log.debug(f'Sparse basis: {self._sparse_basis.nnz/np.prod(self._sparse_basis.shape):.1%} non-zero')
+        return self._sparse_basis
+
+    def get_meshes(self, coes:np.ndarray, sparse:bool=False, out:Optional[np.ndarray]=None) -> np.ndarray:
+        """Evaluate a batch of coefficient vectors [T, K] into vertices [T, V, 3] (float32).
+
+        The dense path is a single BLAS matrix product; `sparse` skips the vertices a
+        blendshape does not move, which pays off for localized blendshape sets.
+        """
+        coes = np.asarray(coes, dtype=np.float32)
+        assert len(coes.shape) == 2, coes.shape
+        assert coes.shape[1] == self.n_blendshapes, "Number of blendshapes must match number of coefficients"
+        if out is None:
+            out = np.empty((len(coes), *self.neutral_position.shape), dtype=np.float32)
+        _out = out.reshape(len(coes), -1)
+        if sparse:
+            _out[:] = (self.sparse_basis() @ coes.T).T
+        else:
+            np.matmul(coes, self.basis, out=_out)
+        out += self.neutral_position
+        return out
+
     def get_mesh(self, coe:np.ndarray=None) -> np.ndarray:
         if coe is None:
             coe = np.zeros(self.n_blendshapes)
             coe[0] = 1.0 # neutral
         assert len(coe.shape) == 1, coe.shape
         assert len(coe) == self.n_blendshapes, "Number of blendshapes must match number of coefficients"
-        out = np.sum(coe[..., None, None] * self.blendshapes, axis=0) + self.neutral_position
-        return out
+        return self.get_meshes(coe[None])[0]
+
+    def bake_animation(self, coes:np.ndarray, animation_dir:Union[Path, str], fps:float=30, audio:Optional[str]=None,
+                       sparse:bool=False, chunk:int=1024) -> Path:
+        """Evaluate a coefficient track [T, K] into a columnar vertex animation (see `animation.py`)"""
+        from .animation import VERTEX_FILE, write_animation_metadata
+        animation_dir = Path(animation_dir)
+        animation_dir.mkdir(parents=True, exist_ok=True)
+        vertex = np.lib.format.open_memmap(animation_dir / VERTEX_FILE, mode='w+', dtype=np.float32,
+                                           shape=(len(coes), *self.neutral_position.shape))
+        for start in range(0, len(coes), chunk):
+            self.get_meshes(coes[start:start+chunk], sparse=sparse, out=vertex[start:start+chunk])
+        vertex.flush()
+        write_animation_metadata(animation_dir, fps, audio, None)
+        return animation_dir
 
 class ARKitModel(BlendshapeModel):
     def __init__(self, ) -> None:
         src_file = Path(__file__).parent.parent.resolve()
         neutral_mesh = src_file / 'deformation_transfer_ARkit_blendshapes/data/ARKit_blendShapes/Neutral.obj'
-        blendshapes = np.load(src_file / 'data/ARKit_blendshapes.npy')
+        blendshapes = np.load(src_file / 'data/ARKit_blendshapes.npy', mmap_mode='r')
         with open(src_file / 'data/ARKit_blendshapes_names.txt', 'r') as f:
             bs_names = f.read().split('\n')
         super().__init__(neutral_mesh, blendshapes, bs_names)
@@ -0,0 +1,123 @@
+from typing import Optional
+import numpy as np
+from PIL import Image
+
+# depth above which a pixel is covered by the mesh
+DEPTH_EPS = 0.01
+
+
+def _blend(color, background, weight, out, acc, tmp):
+    """out = (color*w + background*(255-w) + 127) // 255 in uint16 fixed point, w in [0, 255]"""
+    np.multiply(color, weight, out=acc)
+    np.subtract(255, weight, out=weight)
+    np.multiply(background, weight, out=tmp)
+    acc += tmp
+    acc += 127
+    np.floor_divide(acc, 255, out=acc)
+    np.copyto(out, acc, casting='unsafe')
+    return out
+
+
+class Compositor:
+    """Composite rendered frames over a cached background image, or into RGBA with the mesh mask as alpha.
+
+    All intermediate and output arrays are allocated once; the returned frame is a
+    buffer that is overwritten by the next call, copy it to keep it.
+    """
+
+    def __init__(self, height:int, width:int, background:Optional[np.ndarray]=None) -> None:
+        self.height = height
+        self.width = width
+        self._mask = np.empty((height, width), dtype=bool)
+        self._weight = np.empty((height, width, 1), dtype=np.uint16)
+        self._acc = np.empty((height, width, 3), dtype=np.uint16)
+        self._tmp = np.empty((height, width, 3), dtype=np.uint16)
+        self._rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgba = np.empty((height, width, 4), dtype=np.uint8)
+        self._background = None
+        self.set_background(background)
+
+    @property
+    def background(self) -> Optional[np.ndarray]:
+        return self._background
+
+    def set_background(self, image:Optional[np.ndarray]):
+        """Set the background image, resized to the frame size if needed"""
+        if image is None:
+            self._background = None
+            return
+        if image.shape[:2] != (self.height, self.width):
+            image = np.array(Image.fromarray(image).resize([self.width, self.height]))
+        if self._background is None:
+            self._background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        np.copyto(self._background, image[..., :3])
+
+    def mask(self, depth:np.ndarray) -> np.ndarray:
+        return np.greater(depth, DEPTH_EPS, out=self._mask)
+
+    def composite(self, color:np.ndarray, depth:Optional[np.ndarray]=None, alpha:float=1.0,
+                  mask:Optional[np.ndarray]=None) -> np.ndarray:
+        """Composite one frame, the mesh coverage comes from `mask`, else from `depth`, else from
+        the alpha channel of an RGBA `color` rendered over a transparent clear"""
+        if mask is None and depth is None:
+            return self._composite_coverage(color, alpha)
+        if mask is None:
+            mask = self.mask(depth)
+        color = color[..., :3]
+        if self._background is None:
+            out = self._rgba
+            out[..., :3] = color
+            np.multiply(mask, int(round(255*alpha)), out=out[..., 3], casting='unsafe')
+        elif alpha >= 1.0:
+            out = self._rgb
+            np.copyto(out, self._background)
+            np.copyto(out, color, where=mask[..., None])
+        else: # alpha blending with image
+            np.multiply(mask[..., None], int(round(255*alpha)), out=self._weight, casting='unsafe')
+            out = _blend(color, self._background, self._weight, self._rgb, self._acc, self._tmp)
+        return out
+
+    def _composite_coverage(self, color:np.ndarray, alpha:float) -> np.ndarray:
+        """Composite with the antialiased coverage in the alpha channel of `color` as weight"""
+        if self._background is None and alpha >= 1.0:
+            return color
+        weight = self._weight
+        np.copyto(weight, color[..., 3:])
+        if alpha < 1.0:
+            weight *= int(round(255*alpha))
+            weight += 127
+            np.floor_divide(weight, 255, out=weight)
+        if self._background is None:
+            out = self._rgba
+            out[..., :3] = color[..., :3]
+            np.copyto(out[..., 3:], weight, casting='unsafe')
+            return out
+        return _blend(color[..., :3], self._background, weight, self._rgb, self._acc, self._tmp)
+
+    def composite_batch(self, colors:np.ndarray, depths:Optional[np.ndarray]=None, alpha:float=1.0,
+                        out:Optional[np.ndarray]=None, backgrounds:Optional[np.ndarray]=None) -> np.ndarray:
+        """Composite frames [N, H, W, C] in one pass, into `out` if given.
+
+        The mesh coverage comes from `depths` [N, H, W], else from the alpha of RGBA `colors`
+        as in `composite`. `backgrounds` [N, H, W, 3] gives each frame its own background
+        instead of the cached one.
+        """
+        backgrounds = self._background if backgrounds is None else backgrounds
+        n_channels = 3 if backgrounds is not None else 4
+        if out is None:
+            out = np.empty((*colors.shape[:3], n_channels), dtype=np.uint8)
+        if depths is None:
+            weight = colors[..., 3:].astype(np.uint16)
+        else:
+            weight = np.greater(depths, DEPTH_EPS)[..., None].astype(np.uint16)
+            weight *= 255
+        if alpha < 1.0:
+            weight *= int(round(255*alpha))
+            weight += 127
+            np.floor_divide(weight, 255, out=weight)
+        if backgrounds is None:
+            out[..., :3] = colors[..., :3]
+            np.copyto(out[..., 3:], weight, casting='unsafe')
+            return out
+        acc = np.empty((*colors.shape[:3], 3), dtype=np.uint16)
+        return _blend(colors[..., :3], backgrounds, weight, out, acc, np.empty_like(acc))
@@ -0,0 +1,235 @@
+import copy
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Union
+import logging as log
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+logger = log.getLogger('PyRenderer')
+
+DATASET_FILE = 'dataset.json'
+# frames rendered before they are composited together
+COMPOSITE_BATCH = 32
+
+DEFAULT_CONFIG = {
+    'model': 'arkit',           # registered model (see models.py) with a `blendshape_model`
+    'height': 256,
+    'width': 256,
+    'camera_type': 'persp',
+    'n_samples': 10000,
+    'shard_size': 256,
+    'seed': 0,
+    'depth': False,             # store linear depth [H, W] per sample
+    # every coefficient is active with probability `active`, uniform in [low, high]
+    'coefficients': {'low': 0.0, 'high': 1.0, 'active': 0.3},
+    # camera on a sphere around the normalized mesh, angles in degrees
+    'camera': {'distance': [0.8, 1.2], 'yaw': [-30.0, 30.0], 'pitch': [-20.0, 20.0], 'roll': [-5.0, 5.0]},
+    'light': {'color_low': [0.3, 0.3, 0.3], 'color_high': [1.0, 1.0, 1.0], 'intensity': [2.0, 8.0]},
+    # background image files, RGBA images with the mesh coverage as alpha without any
+    'backgrounds': [],
+}
+
+
+def dataset_config(config:Optional[dict]=None) -> dict:
+    """`DEFAULT_CONFIG` updated with `config`, nested sections are updated key by key"""
+    merged = copy.deepcopy(DEFAULT_CONFIG)
+    for key, value in (config or {}).items():
+        if key not in merged:
+            raise ValueError(f'Unknown dataset config key {key}, expected one of {list(DEFAULT_CONFIG)}')
+        if isinstance(merged[key], dict):
+            merged[key].update(value)
+        else:
+            merged[key] = value
+    merged['backgrounds'] = [str(f) for f in merged['backgrounds']]
+    return json.loads(json.dumps(merged)) # as stored in dataset.json
+
+
+def shard_ranges(n_samples:int, shard_size:int) -> List[range]:
+    return [range(start, min(start + shard_size, n_samples)) for start in range(0, n_samples, shard_size)]
+
+
+def _uniform(rng:np.random.Generator, bounds) -> float:
+    return float(rng.uniform(bounds[0], bounds[1]))
+
+
+def camera_pose(distance:float, yaw:float, pitch:float, roll:float) -> np.ndarray:
+    """Camera at `distance` from the origin looking at it, angles in degrees (yaw 0 looks down -z)"""
+    yaw, pitch, roll = np.radians([yaw, pitch, roll])
+    eye = distance * np.array([np.sin(yaw) * np.cos(pitch), np.sin(pitch), np.cos(yaw) * np.cos(pitch)])
+    z = eye / distance # away from the target, the camera looks down -z
+    x = np.cross([0.0, 1.0, 0.0], z)
+    x /= np.linalg.norm(x)
+    pose = np.eye(4)
+    pose[:3, 0], pose[:3, 1], pose[:3, 2], pose[:3, 3] = x, np.cross(z, x), z, eye
+    c, s = np.cos(roll), np.sin(roll)
+    pose[:3, :2] = pose[:3, :2] @ np.array([[c, s], [-s, c]]) # roll around the line of sight
+    return pose
+
+
+def sample_labels(config:dict, indices:range, n_blendshapes:int) -> dict:
+    """Labels of samples `indices`, each drawn from a generator seeded by (seed, index)"""
+    labels = {
+        'index': np.array(indices, dtype=np.int64),
+        'coefficients': np.zeros((len(indices), n_blendshapes), dtype=np.float32),
+        'camera_pose': np.zeros((len(indices), 4, 4), dtype=np.float32),
+        'light_color': np.zeros((len(indices), 3), dtype=np.float32),
+        'light_intensity': np.zeros(len(indices), dtype=np.float32),
+        'background': np.full(len(indices), -1, dtype=np.int32),
+    }
+    coefficients, camera, light = config['coefficients'], config['camera'], config['light']
+    for i, index in enumerate(indices):
+        rng = np.random.default_rng([config['seed'], index])
+        active = rng.random(n_blendshapes) < coefficients['active']
+        labels['coefficients'][i] = active * rng.uniform(coefficients['low'], coefficients['high'], n_blendshapes)
+        labels['camera_pose'][i] = camera_pose(*[_uniform(rng, camera[k]) for k in ['distance', 'yaw', 'pitch', 'roll']])
+        labels['light_color'][i] = rng.uniform(light['color_low'], light['color_high'])
+        labels['light_intensity'][i] = _uniform(rng, light['intensity'])
+        if len(config['backgrounds']) > 0:
+            labels['background'][i] = rng.integers(len(config['backgrounds']))
+    return labels
+
+
+class DatasetShardRenderer:
+    """Renders shards of a dataset, one per worker process with its own GL context"""
+
+    def __init__(self, config:dict, output_dir:Union[Path, str]) -> None:
+        from .offscreen import OffscreenFaceRenderer
+        self.config = config
+        self.output_dir = Path(output_dir)
+        self.renderer = OffscreenFaceRenderer(config['model'], height=config['height'], width=config['width'],
+                                              camera_type=config['camera_type'])
+        if not hasattr(self.renderer, 'blendshape_model'):
+            raise ValueError(f"Model {config['model']} has no blendshape model")
+        self.blendshape_model = self.renderer.blendshape_model
+        primitive = self.renderer.mesh.primitives[0]
+        if getattr(primitive, 'coes_0', None) is not None:
+            primitive.coes_0[:] = 0.0 # vertices are evaluated here
+        self.renderer.scale_mesh()
+        self.renderer.center_mesh()
+        self._backgrounds = {}
+
+    def _background(self, i:int) -> Optional[np.ndarray]:
+        if i < 0:
+            return None
+        if i not in self._backgrounds:
+            image = Image.open(self.config['backgrounds'][i]).convert('RGB')
+            self._backgrounds[i] = np.array(image.resize([self.config['width'], self.config['height']]))
+        return self._backgrounds[i]
+
+    def render(self, shard:int, indices:range) -> Path:
+        config, renderer = self.config, self.renderer
+        labels = sample_labels(config, indices, self.blendshape_model.n_blendshapes)
+        vertices = self.blendshape_model.get_meshes(labels['coefficients'])
+        height, width = config['height'], config['width']
+        has_backgrounds = len(config['backgrounds']) > 0
+        images = np.empty((len(indices), height, width, 3 if has_backgrounds else 4), dtype=np.uint8)
+        if config['depth']:
+            labels['depth'] = np.empty((len(indices), height, width), dtype=np.float32)
+        # RGBA renders and their backgrounds, composited a batch at a time
+        batch = min(COMPOSITE_BATCH, len(indices))
+        colors = np.empty((batch, height, width, 4), dtype=np.uint8)
+        backgrounds = np.empty((batch, height, width, 3), dtype=np.uint8) if has_backgrounds else None
+        for i in range(len(indices)):
+            renderer.update_mesh(vertices[i])
+            renderer.camera_pose = labels['camera_pose'][i]
+            renderer.set_light_color(labels['light_color'][i])
+            renderer.set_light_intensity(float(labels['light_intensity'][i]))
+            j = i % batch
+            if config['depth']:
+                colors[j], labels['depth'][i] = renderer.render('rgba+depth')
+            else:
+                colors[j] = renderer.render('rgba')
+            if has_backgrounds:
+                backgrounds[j] = self._background(int(labels['background'][i]))
+            if j == batch - 1 or i == len(indices) - 1:
+                start = i - j
+                with renderer.profiler.stage('composite'):
+                    renderer.compositor.composite_batch(colors[:j+1], alpha=renderer.alpha, out=images[start:i+1],
+                                                        backgrounds=None if backgrounds is None else backgrounds[:j+1])
+
+        filename = shard_filename(self.output_dir, shard)
+        tmp = filename.with_name(f'.{filename.stem}.tmp{os.getpid()}.npz')
+        np.savez(tmp, images=images, **labels)
+        os.replace(tmp, filename)
+        return filename
+
+    def close(self):
+        """Free the GL context now rather than whenever the renderer is garbage collected"""
+        self.renderer._renderer.delete()
+
+
+def shard_filename(output_dir:Path, shard:int) -> Path:
+    return Path(output_dir) / f'shard-{shard:06d}.npz'
+
+
+def read_shard(filename:Union[Path, str]) -> dict:
+    """Arrays of one shard: images, index, coefficients, camera_pose, light_color, light_intensity, background (, depth)"""
+    with np.load(filename) as shard:
+        return {key: shard[key] for key in shard.files}
+
+
+_worker = None
+
+
+def _init_worker(config:dict, output_dir:Path):
+    global _worker
+    os.environ.setdefault('LP_NUM_THREADS', '1') # one single-threaded software rasterizer per core
+    _worker = DatasetShardRenderer(config, output_dir)
+
+
+def _render_shard(shard:int, indices:range) -> Path:
+    return _worker.render(shard, indices)
+
+
+def _write_dataset_file(output_dir:Path, config:dict):
+    filename = output_dir / DATASET_FILE
+    if filename.exists():
+        with open(filename, 'r') as f:
+            existing = json.load(f)['config']
+        if existing != config:
+            raise ValueError(f'{output_dir} holds a dataset generated with another config, use a new directory to change it')
+        return
+    with open(filename, 'w') as f:
+        json.dump({'config': config}, f, indent=2)
+
+
+def generate_dataset(output_dir:Union[Path, str], config:Optional[dict]=None, n_workers:Optional[int]=None) -> List[Path]:
+    """Render the dataset described by `config` (see `DEFAULT_CONFIG`) into npz shards in `output_dir`.
+
+    Every sample is drawn from its own generator seeded by (seed, sample index), so the
+    dataset does not depend on `n_workers` or on the order shards are rendered in. Shards
+    are rendered by `n_workers` processes (default: one per core), each writing its shards
+    directly. Existing shards are kept, so calling it again resumes an interrupted run.
+
+        generate_dataset('out/faces', {'model': 'arkit', 'n_samples': 1_000_000, 'seed': 7})
+    """
+    config = dataset_config(config)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _write_dataset_file(output_dir, config)
+
+    ranges = shard_ranges(config['n_samples'], config['shard_size'])
+    todo = [shard for shard in range(len(ranges)) if not shard_filename(output_dir, shard).exists()]
+    logger.info(f'{len(ranges) - len(todo)}/{len(ranges)} shards of {output_dir} done, rendering {len(todo)}')
+    if len(todo) > 0:
+        n_workers = min(n_workers or os.cpu_count(), len(todo))
+        if n_workers == 1:
+            worker = DatasetShardRenderer(config, output_dir)
+            try:
+                for shard in tqdm(todo):
+                    worker.render(shard, ranges[shard])
+            finally:
+                worker.close()
+        else:
+            # spawn: GL contexts do not survive a fork
+            with ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(config, output_dir)) as executor:
+                futures = [executor.submit(_render_shard, shard, ranges[shard]) for shard in todo]
+                for future in tqdm(as_completed(futures), total=len(futures)):
+                    future.result()
+    return [shard_filename(output_dir, shard) for shard in range(len(ranges))]
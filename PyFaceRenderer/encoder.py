@@ -0,0 +1,183 @@
+import re
+import subprocess
+import threading
+import queue
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+import logging as log
+import numpy as np
+
+
+class FFmpegWriter:
+    """Encode frames by piping raw RGB data into an ffmpeg subprocess.
+
+    Frames are handed to a writer thread through a bounded queue, so rendering the
+    next frame overlaps with ffmpeg consuming the previous ones.
+    """
+
+    def __init__(self, output_filename:Union[Path, str], width:int, height:int, fps:float,
+                 audio:Optional[Union[Path, str]]=None, queue_size:int=8,
+                 codec_args=('-c:v', 'libx264', '-pix_fmt', 'yuv420p')) -> None:
+        self.log = log.getLogger(self.__class__.__name__)
+        self.output_filename = str(output_filename)
+        self._shape = (height, width, 3)
+        command = ['ffmpeg', '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-framerate', str(fps), '-i', '-']
+        if audio is not None: # optional, so a video without sound can be given as audio source
+            command += ['-i', str(audio), '-map', '0:v', '-map', '1:a?']
+        command += [*codec_args, self.output_filename]
+        self.log.debug(' '.join(command))
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _write_loop(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                continue # keep draining so the producer never blocks
+            try:
+                self._process.stdin.write(frame.data)
+            except (BrokenPipeError, OSError) as e:
+                self._error = e
+
+    def write(self, frame:np.ndarray):
+        """Queue an RGB(A) uint8 frame of the size given at construction"""
+        if self._error is not None:
+            raise RuntimeError(f'ffmpeg stopped accepting frames: {self._error}')
+        if frame.shape[:2] != self._shape[:2]:
+            raise ValueError(f'Frame shape {frame.shape} does not match {self._shape}')
+        # copy: the renderer may reuse its buffers for the next frame
+        self._queue.put(np.array(frame[..., :3], dtype=np.uint8, order='C'))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        stderr = self._process.stderr.read().decode(errors='replace')
+        returncode = self._process.wait()
+        if returncode != 0:
+            raise RuntimeError(f'ffmpeg exited with {returncode} while writing {self.output_filename}: {stderr}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else: # do not mask the original error
+            try:
+                self.close()
+            except RuntimeError as e:
+                self.log.error(e)
+
+
+def probe_video(filename:Union[Path, str]) -> Tuple[int, int, float]:
+    """(width, height, fps) of the first video stream as decoded (rotation applied), parsed from `ffmpeg -i`"""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-i', str(filename)], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    info = result.stderr.decode(errors='replace')
+    size = re.search(r'Video: .*?, (\d+)x(\d+)', info) # not the hex codec tag
+    if size is None:
+        raise RuntimeError(f'No video stream in {filename}: {info.strip()}')
+    width, height = int(size.group(1)), int(size.group(2))
+    if re.search(r'rotation of -?(90|270)', info): # ffmpeg rotates while decoding
+        width, height = height, width
+    fps = re.search(r'([\d.]+) fps', info) or re.search(r'([\d.]+) tbr', info)
+    return width, height, float(fps.group(1)) if fps is not None else 30.0
+
+
+class FFmpegReader:
+    """Decode the frames of a video into RGB arrays with an ffmpeg subprocess.
+
+    A reader thread fills a bounded queue, so decoding overlaps with whatever consumes
+    the frames. Frames are scaled to `width` x `height` if given.
+    """
+
+    def __init__(self, filename:Union[Path, str], width:Optional[int]=None, height:Optional[int]=None, queue_size:int=8) -> None:
+        self.log = log.getLogger(self.__class__.__name__)
+        self.filename = str(filename)
+        _width, _height, self.fps = probe_video(filename)
+        self.width = width or _width
+        self.height = height or _height
+        command = ['ffmpeg', '-loglevel', 'error', '-i', self.filename,
+                   '-vf', f'scale={self.width}:{self.height}', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-']
+        self.log.debug(' '.join(command))
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        frame_size = self.width * self.height * 3
+        while not self._stopped.is_set():
+            data = self._process.stdout.read(frame_size)
+            if len(data) < frame_size:
+                break
+            frame = np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3)
+            while not self._stopped.is_set():
+                try:
+                    self._queue.put(frame, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+        self._queue.put(None)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        """Frames [H, W, 3] uint8, in order"""
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            yield frame
+        returncode = self._process.wait()
+        if returncode != 0 and not self._stopped.is_set():
+            raise RuntimeError(f'ffmpeg exited with {returncode} while reading {self.filename}: {self._process.stderr.read().decode(errors="replace")}')
+
+    def close(self):
+        self._stopped.set()
+        if self._process.poll() is None:
+            self._process.kill()
+        while self._thread.is_alive(): # unblock the reader thread
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def concat_videos(segments:List[Union[Path, str]], output_filename:Union[Path, str], audio:Optional[Union[Path, str]]=None):
+    """Losslessly concatenate video segments encoded with identical settings, optionally muxing an audio track"""
+    output_filename = Path(output_filename)
+    list_file = output_filename.with_name(output_filename.name + '.segments.txt')
+    with open(list_file, 'w') as f:
+        for segment in segments:
+            f.write(f"file '{Path(segment).resolve()}'\n")
+    command = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', str(list_file)]
+    if audio is not None:
+        command += ['-i', str(audio), '-map', '0:v', '-map', '1:a']
+    command += ['-c:v', 'copy', str(output_filename)]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    finally:
+        list_file.unlink()
+    if result.returncode != 0:
+        raise RuntimeError(f'ffmpeg failed to concatenate into {output_filename}: {result.stderr.decode(errors="replace")}')
+    return output_filename
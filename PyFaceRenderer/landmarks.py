@@ -0,0 +1,121 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple, Union
+import logging as log
+import numpy as np
+from .asset_cache import cache_dir, cache_key
+from .encoder import FFmpegReader
+from .mesh_sequence import prefetch_map
+
+logger = log.getLogger('PyRenderer')
+
+N_LANDMARKS = 468
+# orthographic camera looking at normalized landmarks: image y points down, mediapipe z towards the camera
+LANDMARK_CAMERA_POSE = np.array([
+    [1, 0, 0, 0.0],
+    [0, -1, 0, 0.0],
+    [0, 0, -1, -5.0],
+    [0, 0, 0, 1.0],
+])
+
+
+def face_landmarks(landmark_list) -> np.ndarray:
+    """[N, 3] float32 normalized (x, y, z) of a mediapipe `NormalizedLandmarkList`"""
+    landmarks = landmark_list.landmark
+    return np.fromiter((v for landmark in landmarks for v in (landmark.x, landmark.y, landmark.z)),
+                       dtype=np.float32, count=3*len(landmarks)).reshape(-1, 3)
+
+
+def landmarks_to_vertices(landmarks:np.ndarray, aspect:float, out:Optional[np.ndarray]=None) -> np.ndarray:
+    """Mesh vertices of normalized landmarks [..., N, 3] in a frame of `aspect` = width/height.
+
+    x and z are scaled by the aspect so the face keeps its proportions; seen through
+    `LANDMARK_CAMERA_POSE` with an orthographic camera of xmag 0.5*aspect and ymag 0.5,
+    the mesh lines up with the frame.
+    """
+    out = np.subtract(landmarks, 0.5, out=out, dtype=np.float32)
+    out[..., 0] *= aspect
+    out[..., 2] *= aspect
+    return out
+
+
+class MediapipeLandmarker:
+    """Face landmarks of single RGB frames with mediapipe FaceMesh, one graph per calling thread"""
+
+    def __init__(self, min_detection_confidence:float=0.5) -> None:
+        self.min_detection_confidence = min_detection_confidence
+        self._local = threading.local()
+
+    @property
+    def cache_name(self) -> str:
+        """Name of the landmarks cached by `video_landmark_frames`, the detection threshold changes them"""
+        if self.min_detection_confidence == 0.5:
+            return 'facemesh'
+        return f'facemesh-{self.min_detection_confidence:g}'
+
+    def __call__(self, frame:np.ndarray) -> Optional[np.ndarray]:
+        face_mesh = getattr(self._local, 'face_mesh', None)
+        if face_mesh is None:
+            import mediapipe as mp
+            face_mesh = self._local.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=True, max_num_faces=1, min_detection_confidence=self.min_detection_confidence)
+        results = face_mesh.process(frame)
+        if not results.multi_face_landmarks:
+            return None
+        return face_landmarks(results.multi_face_landmarks[0])[:N_LANDMARKS]
+
+
+def landmark_cache_file(video:Union[Path, str], width:int, height:int, name:str) -> Optional[Path]:
+    root = cache_dir()
+    if root is None:
+        return None
+    video = Path(video)
+    return root / 'landmarks' / f'{video.stem}-{cache_key([video])}-{name}-{width}x{height}.npy'
+
+
+def video_landmark_frames(video:Union[Path, str], width:Optional[int]=None, height:Optional[int]=None,
+                          landmark_fn:Optional[Callable]=None, n_workers:int=4, queue_size:int=8,
+                          cache_name:Optional[str]=None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Frames [H, W, 3] of `video` with their landmarks [468, 3] (NaN where no face was found).
+
+    Frames are decoded by a reader thread and landmarked by `n_workers` threads running
+    `landmark_fn` (default: `MediapipeLandmarker`), with at most `queue_size` frames waiting
+    between stages. Once a clip has been read to the end its landmarks are cached as a
+    [T, 468, 3] array under `cache_name`, and later passes skip the landmark inference.
+    `cache_name` defaults to the `cache_name` attribute of `landmark_fn`, a function
+    without one is not cached ('' disables the cache).
+    """
+    landmark_fn = landmark_fn or MediapipeLandmarker()
+    if cache_name is None:
+        cache_name = getattr(landmark_fn, 'cache_name', None)
+    reader = FFmpegReader(video, width, height, queue_size=queue_size)
+    cache = landmark_cache_file(video, reader.width, reader.height, cache_name) if cache_name else None
+    with reader:
+        if cache is not None and cache.exists():
+            logger.info(f'Using cached landmarks {cache}')
+            yield from zip(reader, np.load(cache, mmap_mode='r'))
+            return
+
+        no_face = np.full((N_LANDMARKS, 3), np.nan, dtype=np.float32)
+        def landmark(frame):
+            landmarks = landmark_fn(frame)
+            return frame, no_face if landmarks is None else np.asarray(landmarks, dtype=np.float32)
+        track = []
+        with ThreadPoolExecutor(n_workers) as executor:
+            for frame, landmarks in prefetch_map(landmark, reader, executor, queue_size):
+                track.append(landmarks)
+                yield frame, landmarks
+
+    if cache is not None and len(track) > 0:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_name(f'{cache.stem}.tmp{os.getpid()}.npy')
+        np.save(tmp, np.stack(track))
+        os.replace(tmp, cache)
+        logger.info(f'Cached {len(track)} frames of landmarks in {cache}')
+
+
+def video_landmarks(video:Union[Path, str], **kwargs) -> np.ndarray:
+    """Landmarks [T, 468, 3] of every frame of `video`, see `video_landmark_frames`"""
+    return np.stack([np.array(landmarks) for _, landmarks in video_landmark_frames(video, **kwargs)])
@@ -0,0 +1,285 @@
+import json
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+import logging as log
+import numpy as np
+
+logger = log.getLogger('PyRenderer')
+
+DEFAULT_PORT = 9870
+# packed packet: magic, sender timestamp (s, 0 for none), count, then count float32 coefficients in model order
+PACKED_MAGIC = b'FRB1'
+PACKED_HEADER = struct.Struct('<4sdI')
+# TCP carries packets prefixed by their length
+TCP_LENGTH = struct.Struct('<I')
+
+
+def encode_packet(coefficients:np.ndarray, timestamp:Optional[float]=None, blendshape_names:Optional[List[str]]=None) -> bytes:
+    """Packed float packet of `coefficients`, or a JSON name/value packet if `blendshape_names` are given"""
+    if blendshape_names is not None:
+        packet = {'blendshapes': dict(zip(blendshape_names, np.asarray(coefficients, dtype=float).tolist()))}
+        if timestamp is not None:
+            packet['timestamp'] = timestamp
+        return json.dumps(packet).encode('utf-8')
+    coefficients = np.asarray(coefficients, dtype='<f4')
+    return PACKED_HEADER.pack(PACKED_MAGIC, timestamp or 0.0, len(coefficients)) + coefficients.tobytes()
+
+
+def decode_packet(data:bytes) -> Tuple[Optional[float], Union[np.ndarray, dict]]:
+    """(sender timestamp or None, coefficients [K] of a packed packet or {name: value} of a JSON one)"""
+    if data[:4] == PACKED_MAGIC:
+        _, timestamp, count = PACKED_HEADER.unpack_from(data)
+        coefficients = np.frombuffer(data, dtype='<f4', count=count, offset=PACKED_HEADER.size)
+        return timestamp or None, coefficients
+    packet = json.loads(data.decode('utf-8'))
+    return packet.get('timestamp', None), packet['blendshapes']
+
+
+class CoefficientBuffer:
+    """Ring buffer of timestamped coefficient vectors, sampled with linear interpolation"""
+
+    def __init__(self, n_channels:int, capacity:int=256) -> None:
+        self.times = np.zeros(capacity)
+        self.values = np.zeros((capacity, n_channels), dtype=np.float32)
+        self.capacity = capacity
+        self.count = 0
+        self._head = 0 # next slot to write
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _order(self) -> np.ndarray:
+        return (self._head - self.count + np.arange(self.count)) % self.capacity
+
+    def latest(self) -> Tuple[float, np.ndarray]:
+        i = (self._head - 1) % self.capacity
+        return self.times[i], self.values[i]
+
+    def push(self, t:float, values:np.ndarray) -> bool:
+        """Append a sample, samples older than the latest one (reordered datagrams) are dropped"""
+        if self.count > 0 and t <= self.latest()[0]:
+            return False
+        self.times[self._head] = t
+        self.values[self._head] = values
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def sample(self, t:float, out:Optional[np.ndarray]=None) -> np.ndarray:
+        """Values at time `t`, clamped to the oldest and newest samples"""
+        if out is None:
+            out = np.empty(self.values.shape[1], dtype=np.float32)
+        if self.count == 0:
+            out[:] = 0.0
+            return out
+        order = self._order()
+        times = self.times[order]
+        i = int(np.searchsorted(times, t))
+        if i == 0 or i == self.count:
+            out[:] = self.values[order[min(i, self.count - 1)]]
+            return out
+        w = (t - times[i-1]) / (times[i] - times[i-1])
+        np.multiply(self.values[order[i-1]], 1.0 - w, out=out)
+        out += w * self.values[order[i]]
+        return out
+
+
+class BlendshapeStream:
+    """Receives ARKit-style coefficient packets on a local UDP or TCP socket.
+
+    Packets are decoded on a background thread into a `CoefficientBuffer`, either packed
+    float arrays in the order of `blendshape_names` or JSON name/value packets (names
+    missing from a packet keep their value). Sender timestamps are mapped to the local
+    clock with the smallest observed offset, so network jitter does not move samples;
+    `sample` then interpolates at `delay` seconds in the past (0 shows the newest state).
+    """
+
+    def __init__(self, blendshape_names:List[str], host:str='127.0.0.1', port:int=DEFAULT_PORT,
+                 protocol:str='udp', delay:float=0.0, capacity:int=256) -> None:
+        if protocol not in ['udp', 'tcp']:
+            raise ValueError(f'Unknown protocol {protocol}, expected udp or tcp')
+        self.log = log.getLogger(self.__class__.__name__)
+        self.blendshape_names = list(blendshape_names)
+        self._name_to_index = {name: i for i, name in enumerate(self.blendshape_names)}
+        self.address = (host, port)
+        self.protocol = protocol
+        self.delay = delay
+        self.buffer = CoefficientBuffer(len(self.blendshape_names), capacity)
+        self.n_packets = 0
+        self.n_dropped = 0
+        self._clock_offset = None
+        self._coe = np.zeros(len(self.blendshape_names), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._socket = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self) -> 'BlendshapeStream':
+        kind = socket.SOCK_DGRAM if self.protocol == 'udp' else socket.SOCK_STREAM
+        self._socket = socket.socket(socket.AF_INET, kind)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(self.address)
+        self._socket.settimeout(0.1)
+        if self.protocol == 'tcp':
+            self._socket.listen(1)
+        self._thread = threading.Thread(target=self._run_udp if self.protocol == 'udp' else self._run_tcp,
+                                        name='BlendshapeStream', daemon=True)
+        self._thread.start()
+        self.log.info(f'Listening for blendshapes on {self.protocol}://{self.address[0]}:{self.address[1]}')
+        return self
+
+    def close(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._socket is not None:
+            self._socket.close()
+
+    def __enter__(self) -> 'BlendshapeStream':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _run_udp(self):
+        while not self._stopped.is_set():
+            try:
+                data = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            self._receive(data, time.time())
+
+    def _run_tcp(self):
+        while not self._stopped.is_set():
+            try:
+                connection, address = self._socket.accept()
+            except socket.timeout:
+                continue
+            self.log.info(f'Blendshape sender connected from {address}')
+            connection.settimeout(0.1)
+            with connection:
+                pending = b''
+                while not self._stopped.is_set():
+                    try:
+                        data = connection.recv(65536)
+                    except socket.timeout:
+                        continue
+                    if len(data) == 0:
+                        break
+                    pending += data
+                    while len(pending) >= TCP_LENGTH.size:
+                        length = TCP_LENGTH.unpack_from(pending)[0]
+                        if len(pending) < TCP_LENGTH.size + length:
+                            break
+                        self._receive(pending[TCP_LENGTH.size:TCP_LENGTH.size + length], time.time())
+                        pending = pending[TCP_LENGTH.size + length:]
+
+    def _receive(self, data:bytes, received:float):
+        try:
+            timestamp, coefficients = decode_packet(data)
+            if timestamp is not None:
+                timestamp = float(timestamp)
+                if not np.isfinite(timestamp):
+                    raise ValueError(f'timestamp {timestamp}')
+            if isinstance(coefficients, dict):
+                coefficients = {name: float(value) for name, value in coefficients.items()}
+            else: # packed, or a JSON list in model order
+                coefficients = np.asarray(coefficients, dtype=np.float32)
+                if coefficients.ndim != 1:
+                    raise ValueError(f'coefficients of shape {coefficients.shape}')
+        except (ValueError, KeyError, TypeError, AttributeError, struct.error) as e:
+            self.n_dropped += 1
+            self.log.debug(f'Dropped malformed packet: {e}')
+            return
+        if timestamp is None:
+            t = received
+        else: # sender clock + smallest offset seen, i.e. the least delayed packet
+            offset = received - timestamp
+            if self._clock_offset is None or offset < self._clock_offset:
+                self._clock_offset = offset
+            t = timestamp + self._clock_offset
+        with self._lock:
+            if isinstance(coefficients, dict):
+                for name, value in coefficients.items():
+                    i = self._name_to_index.get(name, None)
+                    if i is not None:
+                        self._coe[i] = value
+            elif len(coefficients) == len(self._coe):
+                self._coe[:] = coefficients
+            else:
+                self.n_dropped += 1
+                self.log.debug(f'Dropped packet of {len(coefficients)} coefficients, expected {len(self._coe)}')
+                return
+            if self.buffer.push(t, self._coe):
+                self.n_packets += 1
+            else:
+                self.n_dropped += 1
+
+    def sample(self, now:Optional[float]=None, out:Optional[np.ndarray]=None) -> np.ndarray:
+        """Coefficients at `now` (default: the current time) minus `delay`"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self.buffer.sample(now - self.delay, out)
+
+
+def animation_blendshape_names(animation) -> List[str]:
+    """Blendshape names of an animation, in order of first appearance for pickles"""
+    if hasattr(animation, 'blendshape_names'):
+        return list(animation.blendshape_names)
+    names = {}
+    for frame in animation.frames():
+        names.update(dict.fromkeys(frame.get('blendshapes', {})))
+    return list(names)
+
+
+def replay_animation(animation_file:Union[Path, str], host:str='127.0.0.1', port:int=DEFAULT_PORT, protocol:str='udp',
+                     blendshape_names:Optional[List[str]]=None, speed:float=1.0, loop:bool=False):
+    """Stream the blendshape track of an animation file in real time, to test a `BlendshapeStream`.
+
+    Sends JSON name/value packets, or packed packets in the order of `blendshape_names` if given.
+    """
+    from .animation import load_animation
+    animation = load_animation(animation_file)
+    names = animation_blendshape_names(animation) if blendshape_names is None else blendshape_names
+    track = animation.blendshape_track(names)
+    if track is None:
+        raise ValueError(f'{animation_file} has no blendshapes')
+    packet_names = names if blendshape_names is None else None
+    frame_time = 1.0 / (animation.fps * speed)
+
+    kind = socket.SOCK_DGRAM if protocol == 'udp' else socket.SOCK_STREAM
+    with socket.socket(socket.AF_INET, kind) as sender:
+        if protocol == 'tcp':
+            sender.connect((host, port))
+        logger.info(f'Replaying {len(track)} frames of {animation_file} to {protocol}://{host}:{port}')
+        while True:
+            start = time.time()
+            for i, coefficients in enumerate(track):
+                wait = start + i * frame_time - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                packet = encode_packet(coefficients, time.time(), packet_names)
+                if protocol == 'udp':
+                    sender.sendto(packet, (host, port))
+                else:
+                    sender.sendall(TCP_LENGTH.pack(len(packet)) + packet)
+            if not loop:
+                break
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Replay the blendshapes of an animation file to a live FaceRenderer')
+    parser.add_argument('animation_file', type=str)
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--protocol', type=str, default='udp', choices=['udp', 'tcp'])
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--loop', action='store_true')
+    args = parser.parse_args()
+    log.basicConfig(level='INFO')
+    replay_animation(args.animation_file, args.host, args.port, args.protocol, speed=args.speed, loop=args.loop)
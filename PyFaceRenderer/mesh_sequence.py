@@ -0,0 +1,93 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+import collections
+import multiprocessing
+import logging as log
+import numpy as np
+import trimesh
+
+logger = log.getLogger('PyRenderer')
+
+
+def read_obj_vertices(path:Union[Path, str]) -> np.ndarray:
+    """[V, 3] float32 positions of the `v` lines of an OBJ file, ignoring everything else"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    lines = [line[2:] for line in data.split(b'\n') if line.startswith(b'v ')]
+    if len(lines) == 0:
+        raise ValueError(f'No vertices in {path}')
+    values = np.fromstring(b' '.join(lines), dtype=np.float32, sep=' ')
+    if values.size % len(lines) != 0:
+        raise ValueError(f'Vertex lines of {path} have different lengths')
+    # `v x y z [w | r g b]`
+    return np.ascontiguousarray(values.reshape(len(lines), -1)[:, :3])
+
+
+def load_obj_vertices(path:Union[Path, str]) -> np.ndarray:
+    """Vertex positions the way `trimesh.load` + `pyrender.Mesh.from_trimesh` would give them"""
+    return np.asarray(trimesh.load(path).vertices, dtype=np.float32)
+
+
+def prefetch_map(fn:Callable, items:Iterable, executor:Executor, depth:int) -> Iterator:
+    """Ordered `map(fn, items)` on `executor` with at most `depth` results in flight"""
+    pending = collections.deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class MeshSequence:
+    """Vertex frames of a directory of OBJs sharing one topology, parsed ahead of the renderer.
+
+    Only the vertex lines are parsed (`read_obj_vertices`). The first frame is checked
+    once against trimesh, which may merge or reorder vertices on load; if they disagree
+    every frame goes through trimesh instead. Upcoming frames are parsed by a thread
+    (or process) pool, with at most `prefetch` frames held in memory.
+    """
+
+    def __init__(self, files:List[Union[Path, str]], n_workers:int=4, prefetch:int=16, use_processes:bool=False) -> None:
+        self.files = list(files)
+        self.n_workers = n_workers
+        self.prefetch = max(prefetch, 1)
+        self.use_processes = use_processes
+        if len(self.files) == 0:
+            raise ValueError('Empty mesh sequence')
+        fast = read_obj_vertices(self.files[0])
+        reference = load_obj_vertices(self.files[0])
+        if fast.shape == reference.shape and np.allclose(fast, reference):
+            self.loader = read_obj_vertices
+        else:
+            logger.warning(f'{self.files[0]}: trimesh vertices {reference.shape} differ from the OBJ vertex lines {fast.shape}, '
+                           'parsing the sequence with trimesh')
+            self.loader = load_obj_vertices
+        self.n_vertices = len(reference)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def _executor(self) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(self.n_workers, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(self.n_workers)
+
+    def _check(self, i:int, vertex:np.ndarray) -> np.ndarray:
+        if vertex.shape != (self.n_vertices, 3):
+            raise ValueError(f'{self.files[i]} has {len(vertex)} vertices, expected {self.n_vertices}')
+        return vertex
+
+    def __getitem__(self, i:int) -> np.ndarray:
+        """[V, 3] float32 vertices of frame `i`, parsed on the calling thread"""
+        return self._check(i, self.loader(self.files[i]))
+
+    def frames(self, start:int=0, stop:Optional[int]=None) -> Iterator[np.ndarray]:
+        """[V, 3] float32 vertices of frames [start, stop)"""
+        with self._executor() as executor:
+            for i, vertex in enumerate(prefetch_map(self.loader, self.files[start:stop], executor, self.prefetch), start):
+                yield self._check(i, vertex)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return self.frames()
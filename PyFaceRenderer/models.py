@@ -0,0 +1,80 @@
+from typing import Callable, Dict, List
+import numpy as np
+import pyrender
+import trimesh
+from .asset_cache import cached_mesh, load_mesh, mesh_trimesh
+from .points import points_mesh
+
+# model name -> loader(renderer, **options), which sets `renderer.mesh` (and optionally
+# `trimesh`, `mesh_type`, ...); loaders import what they need, so unused models cost nothing
+MODELS:Dict[str, Callable] = {}
+
+
+def register_model(name:str):
+    """Decorator registering a model loader under `name`, usable as `FaceRenderer(name)`"""
+    def register(loader:Callable) -> Callable:
+        MODELS[name] = loader
+        return loader
+    return register
+
+
+def available_models() -> List[str]:
+    return list(MODELS)
+
+
+def load_model(renderer, name:str, **options):
+    if name not in MODELS:
+        raise NotImplementedError(f'Unrecognized mesh or topology: {name}, registered models: {available_models()}')
+    MODELS[name](renderer, **options)
+
+
+@register_model('mediapipe')
+def _load_mediapipe(renderer, **options):
+    renderer.mesh = load_mesh('data/models/face_mesh.obj')
+    renderer.trimesh = mesh_trimesh(renderer.mesh)
+
+
+@register_model('fuze')
+def _load_fuze(renderer, **options):
+    renderer.mesh = load_mesh('data/models/fuze.obj')
+    renderer.trimesh = mesh_trimesh(renderer.mesh)
+
+
+@register_model('arkit')
+def _load_arkit(renderer, **options):
+    from .blendshape_model import ARKitModel
+    renderer.blendshape_model = ARKitModel()
+    renderer.trimesh = renderer.blendshape_model.trimesh
+    renderer.mesh = renderer.blendshape_model.neutral_mesh
+    renderer.mesh_type = 'blendshape'
+
+
+def _flame_mesh() -> pyrender.Mesh:
+    import pickle
+    with open('data/models/flame/generic_model_converted.pkl', 'rb') as f:
+        model = pickle.load(f)
+    return pyrender.Mesh.from_trimesh(trimesh.Trimesh(model['v_template'], model['f']))
+
+
+@register_model('flame')
+def _load_flame(renderer, **options):
+    renderer.mesh = cached_mesh('flame', ['data/models/flame/generic_model_converted.pkl'], _flame_mesh)
+    renderer.trimesh = mesh_trimesh(renderer.mesh)
+
+
+@register_model('pointcloud')
+def _load_pointcloud(renderer, n_points=1000, **options):
+    sm = trimesh.creation.uv_sphere(radius=1.0)
+    sm.visual.vertex_colors = [1.0, 1.0, 1.0]
+    pts = np.random.rand(n_points, 3) - 0.5
+    tfs = np.tile(np.eye(4), (len(pts), 1, 1))
+    tfs[:,:3,3] = pts
+    renderer.mesh = pyrender.Mesh.from_trimesh(sm, poses=tfs)
+    renderer._init_position = renderer.mesh._primitives[0].positions.copy()
+
+
+@register_model('points')
+def _load_points(renderer, n_points=1000, **options):
+    """Point sprites, one vertex per point instead of an instanced sphere"""
+    renderer.mesh = points_mesh(np.random.rand(n_points, 3) - 0.5)
+    renderer.mesh_type = 'points'
@@ -0,0 +1,22 @@
+from typing import Optional, Tuple
+import numpy as np
+from pyrender.camera import IntrinsicsCamera
+
+
+def atlas_grid(n_views:int, columns:Optional[int]=None) -> Tuple[int, int]:
+    """(rows, columns) of an atlas of `n_views` tiles, close to square by default"""
+    if columns is None:
+        columns = int(np.ceil(np.sqrt(n_views)))
+    columns = max(1, min(columns, n_views))
+    return int(np.ceil(n_views / columns)), columns
+
+
+def intrinsics_cameras(intrinsics:np.ndarray, n_views:int, znear:float, zfar:float):
+    """pyrender cameras for intrinsics [N, 3, 3] or a shared [3, 3] matrix, in pixels"""
+    intrinsics = np.asarray(intrinsics, dtype=float)
+    if intrinsics.shape == (3, 3):
+        intrinsics = np.broadcast_to(intrinsics, (n_views, 3, 3))
+    if intrinsics.shape != (n_views, 3, 3):
+        raise ValueError(f'Expected intrinsics [{n_views}, 3, 3] or [3, 3], got {intrinsics.shape}')
+    return [IntrinsicsCamera(fx=K[0, 0], fy=K[1, 1], cx=K[0, 2], cy=K[1, 2], znear=znear, zfar=zfar) for K in intrinsics]
+
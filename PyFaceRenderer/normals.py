@@ -0,0 +1,38 @@
+from typing import Optional
+import numpy as np
+from scipy import sparse
+
+
+class VertexNormals:
+    """Area-weighted vertex normals for a fixed triangle topology.
+
+    The face -> vertex incidence is built once as a sparse [V, F] matrix, so the normals
+    of a deformed frame (or a batch of frames) are a cross product and a sparse product.
+    """
+
+    def __init__(self, faces:Optional[np.ndarray], n_vertices:int) -> None:
+        if faces is None: # unindexed triangles
+            faces = np.arange(n_vertices).reshape(-1, 3)
+        self.faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        self.n_vertices = n_vertices
+        n_faces = len(self.faces)
+        self.incidence = sparse.csr_matrix(
+            (np.ones(3*n_faces, dtype=np.float32), (self.faces.ravel(), np.repeat(np.arange(n_faces), 3))),
+            shape=(n_vertices, n_faces))
+
+    def __call__(self, vertices:np.ndarray) -> np.ndarray:
+        """Unit normals of vertices [V, 3] or [T, V, 3], same shape as the input (float32)"""
+        vertices = np.asarray(vertices, dtype=np.float32)
+        assert vertices.shape[-2:] == (self.n_vertices, 3), vertices.shape
+        v0 = vertices[..., self.faces[:, 0], :]
+        # the cross product norm is twice the face area, which gives the area weighting
+        face_normals = np.cross(vertices[..., self.faces[:, 1], :] - v0, vertices[..., self.faces[:, 2], :] - v0)
+        if vertices.ndim == 2:
+            normals = self.incidence @ face_normals
+        else:
+            n_frames = len(vertices)
+            face_normals = face_normals.transpose(1, 0, 2).reshape(len(self.faces), -1)
+            normals = (self.incidence @ face_normals).reshape(self.n_vertices, n_frames, 3).transpose(1, 0, 2)
+        norm = np.linalg.norm(normals, axis=-1, keepdims=True)
+        np.maximum(norm, 1e-12, out=norm)
+        return np.ascontiguousarray(normals / norm, dtype=np.float32)
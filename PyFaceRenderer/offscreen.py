@@ -0,0 +1,473 @@
+from typing import List, Union, Optional, Tuple
+from pathlib import Path
+from datetime import datetime
+import logging as log
+import time
+import numpy as np
+import pyrender
+import trimesh
+from pyrender.trackball import Trackball
+from pyrender.camera import OrthographicCamera, PerspectiveCamera
+from pyrender.node import Node
+from pyrender.constants import GLTF, RenderFlags
+from tqdm import tqdm
+from .utils import rot2quat
+from .encoder import FFmpegWriter, probe_video
+from .primitive_extension import dirty_range, merge_ranges, upload_instance_translations, upload_vertex_data
+from .normals import VertexNormals
+from .compositing import Compositor
+from .animation import load_animation, animation_fps_and_audio
+from .mesh_sequence import MeshSequence
+from .asset_cache import load_mesh, mesh_trimesh
+from .models import MODELS, load_model
+from .profiling import StageProfiler
+from .points import install_point_sprites
+from .readback import OUTPUTS, FramebufferReader
+from .multiview import atlas_grid, intrinsics_cameras
+from .landmarks import LANDMARK_CAMERA_POSE, landmarks_to_vertices, video_landmark_frames
+
+logger = log.getLogger('PyRenderer')
+
+class OffscreenFaceRenderer:
+    """Face renderer that keeps its render state as plain values and renders with
+    `pyrender.OffscreenRenderer`, without needing a DearPyGui context.
+    """
+
+    def __init__(self, mesh: Union[pyrender.Mesh, str], height=640, width=360,
+                 default_camera_pose=None, background_image:Optional[np.ndarray]=None,
+                 camera_type='ortho', n_points=1000,
+                 ) -> None:
+        self._height = height
+        self._width = width
+        self.mesh_type = 'static'
+        # constructor arguments, used to build identical renderers in worker processes
+        self._init_args = (mesh, dict(height=height, width=width, default_camera_pose=default_camera_pose,
+                                      background_image=background_image, camera_type=camera_type, n_points=n_points))
+        if isinstance(mesh, pyrender.Mesh):
+            self.mesh = mesh
+            if mesh.primitives[0].mode == GLTF.POINTS:
+                self.mesh_type = 'points'
+        elif isinstance(mesh, trimesh.Trimesh):
+            self.trimesh = mesh
+            self.mesh = pyrender.Mesh.from_trimesh(self.trimesh, )
+        elif isinstance(mesh, str) and mesh in MODELS:
+            load_model(self, mesh, n_points=n_points)
+        elif isinstance(mesh, (str, Path)):
+            mesh_path = Path(mesh)
+            assert mesh_path.exists(), mesh_path
+            self.mesh = load_mesh(mesh_path)
+            self.trimesh = mesh_trimesh(self.mesh)
+
+        else:
+            raise NotImplementedError(f'Unrecognized mesh or topology: {mesh}')
+
+        self.compositor = Compositor(self._height, self._width, background_image)
+        # transparent clear, so the alpha of 'rgba' renders is the mesh coverage
+        self.scene = pyrender.Scene(bg_color=[0.3, 0.3, 0.3, 0.0], )
+
+        self.mesh_node = Node(mesh=self.mesh, )
+        self.scene.add_node(self.mesh_node)
+
+        if default_camera_pose is None:
+            default_camera_pose = np.eye(4)
+            default_camera_pose[2, -1] = 0.5
+
+        self.init_camera_pose = default_camera_pose
+        logger.info(self.init_camera_pose)
+
+        self.trackball = Trackball(pose=self.init_camera_pose, size=(self._width, self._height), scale=1.0, )
+
+        self.light = pyrender.DirectionalLight(color=np.array([0.0, 0.45, 0.5]), intensity=5.0,)
+        self._camera_node = None
+        self.set_camera(camera_type)
+        self.scene.add_node(self._camera_node)
+        self.scene.main_camera_node = self._camera_node
+
+        # Render state, applied to the scene on every render
+        self.mesh_translation = np.zeros(3)
+        self.mesh_rotation = np.zeros(3)
+        self.mesh_scale = 1.0
+        self.alpha = 1.0
+        self.wireframe = False
+        self.point_radius = 1.0 # world-space radius of point sprites ('points' model)
+
+        self._vertex_normals = None
+        self.profiler = StageProfiler()
+        self._draw_start = 0
+        self._create_renderer()
+
+    def _create_renderer(self):
+        self._renderer = pyrender.OffscreenRenderer(self._width, self._height)
+
+    def _instrument_renderer(self):
+        """Hook point sprites into pyrender's renderer, and replace its framebuffer read with one that
+        reads only the requested outputs, timed as 'gl_draw' and 'readback' stages"""
+        renderer = self._renderer._renderer
+        install_point_sprites(renderer, lambda: self.point_radius)
+        self._reader = FramebufferReader(renderer, self.profiler, lambda: self._draw_start)
+        self._reader.install()
+
+    def _ensure_instrumented(self):
+        if not getattr(self._renderer._renderer, '_face_renderer_instrumented', False): # pyrender may recreate it
+            self._instrument_renderer()
+
+    def run_gl(self, fn, wait=True):
+        """Run `fn` with the renderer's GL context current and return its result"""
+        self._renderer._platform.make_current()
+        return fn()
+
+    @property
+    def camera_pose(self) -> np.ndarray:
+        return self.trackball.pose
+
+    @camera_pose.setter
+    def camera_pose(self, pose:np.ndarray):
+        pose = np.array(pose, dtype=float)
+        self.trackball._n_pose = pose
+        self.trackball._pose = pose.copy()
+
+    def get_state(self) -> dict:
+        """Snapshot of the render state as plain Python/NumPy values"""
+        state = {
+            'mesh_translation': np.array(self.mesh_translation, dtype=float),
+            'mesh_rotation': np.array(self.mesh_rotation, dtype=float),
+            'mesh_scale': float(self.mesh_scale),
+            'alpha': float(self.alpha),
+            'point_radius': float(self.point_radius),
+            'wireframe': bool(self.wireframe),
+            'camera_pose': np.array(self.camera_pose, dtype=float),
+            'light_color': np.array(self.light.color, dtype=float),
+            'light_intensity': float(self.light.intensity),
+        }
+        if isinstance(self.camera, PerspectiveCamera):
+            state['camera'] = {'type': 'persp', 'yfov': float(self.camera.yfov)}
+        else:
+            state['camera'] = {'type': 'ortho', 'xmag': float(self.camera.xmag), 'ymag': float(self.camera.ymag)}
+        return state
+
+    def set_state(self, state:dict):
+        for key in ['mesh_translation', 'mesh_rotation']:
+            if key in state:
+                setattr(self, key, np.array(state[key], dtype=float)[:3])
+        for key in ['mesh_scale', 'alpha', 'point_radius']:
+            if key in state:
+                setattr(self, key, float(state[key]))
+        if 'wireframe' in state:
+            self.wireframe = bool(state['wireframe'])
+        if 'camera_pose' in state:
+            self.camera_pose = state['camera_pose']
+        if 'light_color' in state:
+            self.light.color = np.array(state['light_color'])
+        if 'light_intensity' in state:
+            self.light.intensity = float(state['light_intensity'])
+        if 'camera' in state:
+            camera = dict(state['camera'])
+            if camera.pop('type') != ('persp' if isinstance(self.camera, PerspectiveCamera) else 'ortho'):
+                self.set_camera('persp' if isinstance(self.camera, OrthographicCamera) else 'ortho')
+            for key, value in camera.items():
+                setattr(self.camera, key, float(value))
+
+    def set_light_intensity(self, intensity):
+        self.light.intensity = intensity
+
+    def set_light_color(self, color):
+        self.light.color = np.array(color)
+
+    def set_camera(self, cam_type:str):
+        if cam_type == 'persp':
+            self.camera = PerspectiveCamera(
+                yfov=np.pi/2.0,
+                aspectRatio=self._width/self._height,
+                znear=0.01,
+                zfar=1000000.0,
+            )
+        else:
+            self.camera = OrthographicCamera(
+                xmag=0.5, ymag=0.5,
+                znear=0.01,
+                zfar=1000000.0,
+            )
+        if self._camera_node is None:
+            self._camera_node = Node(matrix=self.trackball._n_pose, camera=self.camera, light=self.light)
+        else:
+            self._camera_node.camera = self.camera
+        return
+
+    def set_fov(self, fov):
+        self._camera_node.camera.yfov = fov
+
+    def center_mesh(self):
+        center = (self.mesh._primitives[0].bounds[1] + self.mesh._primitives[0].bounds[0])/2
+        self.mesh_translation = -center*self.mesh_scale
+
+    def scale_mesh(self):
+        _p = self.mesh._primitives[0]
+        ori_scale = max(_p.bounds[1] - _p.bounds[0])
+        self.mesh_scale = 1.0/ori_scale
+
+    def reset_mesh(self):
+        self.mesh_scale = 1.0
+        self.mesh_translation = np.zeros(3)
+
+    def reset_pose(self):
+        logger.info('Reset pose')
+        self.trackball = Trackball(pose=self.init_camera_pose, size=(self._width, self._height), scale=1.0, )
+
+    def update_pointcloud_size(self, size, ):
+        if self.mesh_type == 'points': # sprites are sized in the shader, nothing to upload
+            self.point_radius = size
+            return
+        primitive = self.mesh._primitives[0]
+        primitive.positions = self._init_position * size
+        if primitive._in_context():
+            self.run_gl(lambda: upload_vertex_data(primitive), wait=False)
+
+    def update_points(self, points:np.ndarray):
+        """Move the N points of a 'points' or 'pointcloud' renderer to `points` [N, 3]"""
+        if self.mesh_type == 'points':
+            return self.update_mesh(points, update_normal=False)
+        primitive = self.mesh.primitives[0]
+        if primitive.poses is None or len(primitive.poses) != len(points):
+            raise ValueError(f'Expected {0 if primitive.poses is None else len(primitive.poses)} points, got {len(points)}')
+        primitive.poses[:, :3, 3] = points
+        primitive._bounds = None
+        if primitive._in_context(): # otherwise uploaded on the first render
+            self.run_gl(lambda: upload_instance_translations(primitive), wait=False)
+
+    def update_mesh(self, vertex:np.ndarray, update_normal=True):
+        primitive = self.mesh.primitives[0]
+        if vertex.shape != primitive.positions.shape:
+            logger.error(f'Shape mismatch: {vertex.shape} != {primitive.positions.shape}')
+            logger.error(f'self.mesh.primitives: {self.mesh.primitives}')
+            return
+        # only the span of vertices that moved is uploaded, e.g. a mouth region of a face
+        previous = primitive.positions
+        primitive.positions = vertex
+        vertex_range = dirty_range(previous, primitive.positions)
+        update_normal = update_normal and primitive.normals is not None
+        if update_normal:
+            if self._vertex_normals is None:
+                self._vertex_normals = VertexNormals(primitive.indices, len(primitive.positions))
+            normals = self._vertex_normals(primitive.positions)
+            vertex_range = merge_ranges(vertex_range, dirty_range(primitive.normals, normals))
+            primitive.normals = normals
+        if primitive._in_context(): # otherwise uploaded on the first render
+            self.run_gl(lambda: upload_vertex_data(primitive, normals=update_normal, vertex_range=vertex_range), wait=False)
+        logger.debug('Updated Mesh from vertex array')
+
+    def render(self, outputs:str='color+depth'):
+        """Apply the render state to the scene and render it.
+
+        `outputs` selects what is read back: 'color+depth' returns (color, depth), 'color' RGB,
+        'rgba' RGBA with the mesh coverage as alpha, 'rgba+depth' (rgba, depth), 'depth' linear
+        depth, 'none' nothing.
+        The returned arrays are reused by the next render.
+        """
+        with self.profiler.stage('scene_update'):
+            self._camera_node.matrix = self.trackball.pose.copy()
+            self._apply_mesh_state()
+        return self._render_scene(outputs)
+
+    def _apply_mesh_state(self):
+        self.mesh_node.translation = self.mesh_translation[:3]
+        self.mesh_node.rotation = rot2quat(*self.mesh_rotation[:3])
+        self.mesh_node.scale = [self.mesh_scale]*3
+
+    def _render_scene(self, outputs:str):
+        if outputs not in OUTPUTS:
+            raise ValueError(f'Unknown render outputs {outputs}, expected one of {OUTPUTS}')
+        flags = RenderFlags.NONE
+        if self.wireframe:
+            flags |= RenderFlags.FLIP_WIREFRAME
+        if outputs.startswith('rgba'):
+            flags |= RenderFlags.RGBA
+        elif outputs == 'depth':
+            flags |= RenderFlags.DEPTH_ONLY
+
+        self._ensure_instrumented()
+        self._reader.outputs = outputs
+        self._draw_start = time.perf_counter_ns()
+        return self._renderer.render(self.scene, flags)
+
+    def render_views(self, camera_poses:np.ndarray, intrinsics:Optional[np.ndarray]=None, outputs:str='color',
+                     atlas:bool=False, columns:Optional[int]=None, out:Optional[np.ndarray]=None) -> np.ndarray:
+        """Render the current mesh state from every camera pose [N, 4, 4] in one call.
+
+        `intrinsics` ([N, 3, 3] or a shared [3, 3], in pixels) replaces the current camera.
+        `outputs` is 'color', 'rgba' or 'depth' (see `render`). Returns the stacked views
+        [N, H, W(, C)], or with `atlas` one image of the views tiled row by row over `columns`.
+        Every view is drawn and read back at the renderer's size either way, the atlas only
+        changes where the views are written (drawing all tiles into one atlas-sized target
+        costs more in the resolve and readback than it saves in calls).
+        """
+        if outputs not in ['color', 'rgba', 'depth']:
+            raise ValueError(f'render_views outputs must be color, rgba or depth, got {outputs}')
+        camera_poses = np.asarray(camera_poses, dtype=float).reshape(-1, 4, 4)
+        n_views = len(camera_poses)
+        camera = self._camera_node.camera
+        cameras = [camera] * n_views
+        if intrinsics is not None:
+            cameras = intrinsics_cameras(intrinsics, n_views, camera.znear, camera.zfar)
+        with self.profiler.stage('scene_update'):
+            self._apply_mesh_state()
+
+        rows, columns = atlas_grid(n_views, columns)
+        height, width = self._height, self._width
+        try:
+            for i, (pose, view_camera) in enumerate(zip(camera_poses, cameras)):
+                self._camera_node.matrix = pose
+                self._camera_node.camera = view_camera
+                frame = self._render_scene(outputs)
+                if out is None:
+                    shape = (rows * height, columns * width, *frame.shape[2:]) if atlas else (n_views, *frame.shape)
+                    out = np.empty(shape, dtype=frame.dtype)
+                if atlas:
+                    row, column = divmod(i, columns)
+                    out[row * height:(row + 1) * height, column * width:(column + 1) * width] = frame
+                else:
+                    out[i] = frame
+        finally:
+            self._camera_node.camera = camera
+        if atlas and rows * columns > n_views: # fill the tiles left empty with the background
+            is_visible = self.mesh.is_visible
+            self.mesh.is_visible = False
+            try:
+                background = self._render_scene(outputs)
+            finally:
+                self.mesh.is_visible = is_visible
+            for i in range(n_views, rows * columns):
+                row, column = divmod(i, columns)
+                out[row * height:(row + 1) * height, column * width:(column + 1) * width] = background
+        return out
+
+    @property
+    def background_image(self) -> Optional[np.ndarray]:
+        return self.compositor.background
+
+    @background_image.setter
+    def background_image(self, image:Optional[np.ndarray]):
+        self.compositor.set_background(image)
+
+    def composite(self, color:np.ndarray, depth:Optional[np.ndarray]=None) -> np.ndarray:
+        """Blend a rendered frame with the background image (RGB), or attach the mesh mask as alpha (RGBA).
+
+        The mesh coverage comes from `depth`, or from the alpha of an 'rgba' render if no depth
+        is given. The result is a buffer reused by the next call.
+        """
+        with self.profiler.stage('composite'):
+            return self.compositor.composite(color, depth, self.alpha)
+
+    def render_frame(self) -> np.ndarray:
+        """Render a frame for export: RGB, composited over the background image if any"""
+        if self.background_image is None:
+            return self.render('color')
+        return self.composite(self.render('rgba'))
+
+    def _output_filename(self, name:str) -> Path:
+        Path('Screenshots').mkdir(exist_ok=True)
+        return Path(datetime.now().strftime(f'Screenshots/{name}_rendered_%Y%m%d_%H%M%S.mp4'))
+
+    def render_animation_from_mesh_sequence(self, mesh_sequence: List[Path], sequence_name:str, fps:float=25, audio:Path=None,
+                                            output_filename:Optional[Path]=None, n_workers:int=4) -> Path:
+        """Render a sequence of OBJs with the topology of the current mesh, parsed ahead by `n_workers` threads"""
+        if output_filename is None:
+            output_filename = self._output_filename(sequence_name)
+        if audio is not None and not Path(audio).exists():
+            audio = None
+
+        log.info(f'Rendering {sequence_name}: {len(mesh_sequence)} frames to {output_filename}')
+        if hasattr(self.mesh.primitives[0], 'coes_0') and self.mesh.primitives[0].coes_0 is not None:
+            self.mesh.primitives[0].coes_0[:] = 0.0
+
+        sequence = MeshSequence(mesh_sequence, n_workers=n_workers)
+        with FFmpegWriter(output_filename, self._width, self._height, fps, audio=audio) as writer:
+            for vertex in tqdm(self.profiler.timed('frame_load', sequence), total=len(sequence)):
+                with self.profiler.stage('mesh_update'):
+                    self.update_mesh(vertex)
+                frame = self.render_frame()
+                with self.profiler.stage('encode'):
+                    writer.write(frame)
+        return output_filename
+
+    def render_animation_file(self, animation_file:Path, output_filename:Optional[Path]=None,
+                              frame_range:Optional[Tuple[int, int]]=None, n_workers:int=1,
+                              fps:Optional[float]=None, attach_audio:bool=True) -> Path:
+        """Render an animation (legacy pickle or columnar directory, see `animation.py`) to a video.
+
+        `frame_range` renders only frames [start, end), `n_workers` > 1 splits the
+        animation into shards rendered by separate processes (see `parallel.py`).
+        """
+        animation_file = Path(animation_file)
+        if output_filename is None:
+            output_filename = self._output_filename(animation_file.stem)
+        if n_workers > 1:
+            from .parallel import render_animation_sharded
+            return render_animation_sharded(self, animation_file, output_filename, n_workers=n_workers)
+
+        animation = load_animation(animation_file)
+        start, end = (0, len(animation)) if frame_range is None else frame_range
+        log.info(f'Rendering animation: {end-start} frames from {animation_file} -> {output_filename}')
+        if hasattr(self.mesh.primitives[0], 'coes_0') and self.mesh.primitives[0].coes_0 is not None:
+            self.mesh.primitives[0].coes_0[:] = 0.0
+
+        _fps, audio_file_path = animation_fps_and_audio(animation)
+        fps = _fps if fps is None else fps
+        if not attach_audio:
+            audio_file_path = None
+
+        coes = self._blendshape_track(animation)
+        with FFmpegWriter(output_filename, self._width, self._height, fps, audio=audio_file_path) as writer:
+            vertex_frames = self.profiler.timed('frame_load', animation.vertex_frames(start, end))
+            for i, vertex in tqdm(enumerate(vertex_frames, start), total=end-start):
+                with self.profiler.stage('mesh_update'):
+                    if coes is not None:
+                        self.mesh.primitives[0].coes_0[:] = coes[i]
+                    if vertex is not None:
+                        self.update_mesh(vertex)
+                frame = self.render_frame()
+                with self.profiler.stage('encode'):
+                    writer.write(frame)
+        return output_filename
+
+    render_animation_from_pkl = render_animation_file
+
+    def render_landmark_video(self, video:Path, output_filename:Optional[Path]=None, landmark_fn=None,
+                              n_workers:int=4, attach_audio:bool=True) -> Path:
+        """Render the face landmarks of every frame of a video over the frame, for a 'mediapipe' renderer.
+
+        Decoding, landmark inference (see `landmarks.video_landmark_frames`), rendering and
+        encoding overlap; landmarks are cached, so rendering the clip again skips inference.
+        Frames are scaled to the renderer size, use one with the aspect ratio of the video.
+        """
+        video = Path(video)
+        if output_filename is None:
+            output_filename = self._output_filename(video.stem)
+        aspect = self._width / self._height
+        self.reset_mesh()
+        self.set_camera('ortho')
+        self.camera.xmag = 0.5 * aspect
+        self.camera_pose = LANDMARK_CAMERA_POSE
+        vertices = np.empty((len(self.mesh.primitives[0].positions), 3), dtype=np.float32)
+
+        frames = video_landmark_frames(video, self._width, self._height, landmark_fn=landmark_fn, n_workers=n_workers)
+        with FFmpegWriter(output_filename, self._width, self._height, probe_video(video)[2],
+                          audio=video if attach_audio else None) as writer:
+            for frame, landmarks in tqdm(self.profiler.timed('frame_load', frames)):
+                with self.profiler.stage('mesh_update'):
+                    if not np.isnan(landmarks[0, 0]): # keep the last mesh on frames without a face
+                        self.update_mesh(landmarks_to_vertices(landmarks, aspect, out=vertices))
+                    self.background_image = frame
+                frame = self.render_frame()
+                with self.profiler.stage('encode'):
+                    writer.write(frame)
+        return output_filename
+
+    def _blendshape_track(self, animation) -> Optional[np.ndarray]:
+        """Coefficients of `animation` as a [T, K] matrix in the column order of the blendshape model"""
+        if not hasattr(self, 'blendshape_model'):
+            return None
+        n_blendshapes = self.blendshape_model.n_blendshapes
+        track = animation.blendshape_track(self.blendshape_model.blendshape_names[:n_blendshapes])
+        if track is not None and getattr(self.mesh.primitives[0], 'coes_0', None) is None:
+            self.mesh.primitives[0].coes_0 = np.zeros(n_blendshapes)
+        return track
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+import logging as log
+import numpy as np
+from .encoder import concat_videos
+from .animation import load_animation, animation_fps_and_audio
+
+logger = log.getLogger('PyRenderer')
+
+
+def split_frame_range(n_frames:int, n_shards:int) -> List[Tuple[int, int]]:
+    """Split [0, n_frames) into at most `n_shards` contiguous, non-empty ranges"""
+    n_shards = max(1, min(n_shards, n_frames))
+    bounds = np.linspace(0, n_frames, n_shards + 1).round().astype(int)
+    return [(int(s), int(e)) for s, e in zip(bounds[:-1], bounds[1:]) if e > s]
+
+
+def _render_shard(init_args, state:dict, animation_file:Path, segment_file:Path, frame_range:Tuple[int, int], fps:float) -> Path:
+    # every worker owns its own offscreen GL context and mesh
+    from .offscreen import OffscreenFaceRenderer
+    mesh, kwargs = init_args
+    fr = OffscreenFaceRenderer(mesh, **kwargs)
+    fr.set_state(state)
+    return fr.render_animation_file(animation_file, output_filename=segment_file, frame_range=frame_range,
+                                        fps=fps, attach_audio=False)
+
+
+def render_animation_sharded(renderer, animation_file:Path, output_filename:Path, n_workers:Optional[int]=None) -> Path:
+    """Render an animation file with a pool of worker processes and stitch the segments in order.
+
+    Each worker rebuilds `renderer` from its constructor arguments, applies its current render
+    state and encodes one contiguous frame range; segments are then concatenated without re-encoding.
+    """
+    mesh = renderer._init_args[0]
+    if not isinstance(mesh, (str, Path)):
+        raise NotImplementedError('Sharded rendering needs a mesh given by model name or path')
+
+    animation_file = Path(animation_file)
+    output_filename = Path(output_filename)
+    animation = load_animation(animation_file)
+    fps, audio = animation_fps_and_audio(animation)
+    n_frames = len(animation)
+    del animation
+
+    n_workers = n_workers or os.cpu_count()
+    frame_ranges = split_frame_range(n_frames, n_workers)
+    state = renderer.get_state()
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f'.{output_filename.stem}_', dir=output_filename.parent))
+    logger.info(f'Rendering {n_frames} frames of {animation_file} in {len(frame_ranges)} shards')
+    try:
+        # spawn: GL contexts do not survive a fork
+        with ProcessPoolExecutor(len(frame_ranges), mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_render_shard, renderer._init_args, state, animation_file,
+                                       tmp_dir / f'{i:04d}.mp4', frame_range, fps)
+                       for i, frame_range in enumerate(frame_ranges)]
+            segments = [future.result() for future in futures]
+        concat_videos(segments, output_filename, audio=audio)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return output_filename
@@ -0,0 +1,278 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import logging as log
+import numpy as np
+from .animation import Animation, animation_fps_and_audio, is_columnar_animation, load_animation
+from .mesh_sequence import MeshSequence
+
+logger = log.getLogger('PyRenderer')
+
+# a frame is (vertex [V, 3] or None, coefficients [K] or None), None keeps the current state
+Frame = Tuple[Optional[np.ndarray], Optional[np.ndarray]]
+
+
+class AnimationFrames:
+    """Random access to the frames of an animation (see `animation.py`).
+
+    The blendshape track is read once as a dense [T, K] matrix in the order of
+    `blendshape_names`; vertices are read per frame.
+    """
+
+    def __init__(self, animation:Animation, blendshape_names:Optional[List[str]]=None) -> None:
+        self.animation = animation
+        self.fps, self.audio = animation_fps_and_audio(animation)
+        self.blendshapes = None if blendshape_names is None else animation.blendshape_track(blendshape_names)
+
+    def __len__(self) -> int:
+        return len(self.animation)
+
+    def __getitem__(self, i:int) -> Frame:
+        vertex = self.animation.frame_vertex(i)
+        coefficients = None if self.blendshapes is None else self.blendshapes[i]
+        return None if vertex is None else np.asarray(vertex, dtype=np.float32), coefficients
+
+
+class MeshSequenceFrames:
+    """Random access to the vertices of a directory of OBJs, see `MeshSequence`"""
+
+    def __init__(self, files:List[Union[Path, str]], fps:float=25.0) -> None:
+        self.sequence = MeshSequence(files)
+        self.fps = fps
+        self.audio = None
+
+    def __len__(self) -> int:
+        return len(self.sequence)
+
+    def __getitem__(self, i:int) -> Frame:
+        return self.sequence[i], None
+
+
+class ArrayFrames:
+    """Frames of an in-memory [T, V, 3] vertex track and/or [T, K] blendshape track"""
+
+    def __init__(self, vertex:Optional[np.ndarray]=None, blendshapes:Optional[np.ndarray]=None, fps:float=30.0) -> None:
+        tracks = [t for t in [vertex, blendshapes] if t is not None]
+        if len(tracks) == 0:
+            raise ValueError('Nothing to play, give a vertex track and/or blendshape coefficients')
+        if any(len(t) != len(tracks[0]) for t in tracks):
+            raise ValueError('Tracks must have the same number of frames')
+        self.vertex = vertex
+        self.blendshapes = blendshapes
+        self.fps = fps
+        self.audio = None
+
+    def __len__(self) -> int:
+        return len(self.vertex if self.vertex is not None else self.blendshapes)
+
+    def __getitem__(self, i:int) -> Frame:
+        return (None if self.vertex is None else self.vertex[i]), (None if self.blendshapes is None else self.blendshapes[i])
+
+
+def open_frame_source(path:Union[Path, str], blendshape_names:Optional[List[str]]=None, fps:Optional[float]=None):
+    """Frame source of an animation pickle, a columnar animation or a directory of OBJs"""
+    path = Path(path)
+    if path.is_dir() and not is_columnar_animation(path):
+        files = sorted(path.glob('*.obj'))
+        if len(files) == 0:
+            raise ValueError(f'No animation or OBJ files in {path}')
+        return MeshSequenceFrames(files, fps or 25.0)
+    source = AnimationFrames(load_animation(path), blendshape_names)
+    if fps is not None:
+        source.fps = fps
+    return source
+
+
+class FramePrefetcher:
+    """Loads the frames following the playhead on background threads.
+
+    At most `depth` frames from the playhead on (wrapping around if `loop`) are kept;
+    moving the playhead drops the frames outside the new window, so a seek costs
+    nothing but the loads of the frames after it.
+    """
+
+    def __init__(self, source, depth:int=16, n_workers:int=2, loop:bool=True) -> None:
+        self.source = source
+        self.depth = max(depth, 1)
+        self.loop = loop
+        self._frames:Dict[int, Frame] = {}
+        self._loading = set()
+        self._playhead = 0
+        self._stopped = False
+        self._wake = threading.Condition()
+        self._threads = [threading.Thread(target=self._run, name=f'FramePrefetcher-{i}', daemon=True) for i in range(n_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _offset(self, i:int) -> int:
+        """Distance of frame `i` after the playhead"""
+        return (i - self._playhead) % len(self.source) if self.loop else i - self._playhead
+
+    def _in_window(self, i:int) -> bool:
+        return 0 <= self._offset(i) < self.depth
+
+    def _next_missing(self) -> Optional[int]:
+        for k in range(min(self.depth, len(self.source))):
+            i = self._playhead + k
+            if self.loop:
+                i %= len(self.source)
+            elif i >= len(self.source):
+                return None
+            if i not in self._frames and i not in self._loading:
+                return i
+        return None
+
+    def seek(self, i:int):
+        """Move the playhead to frame `i`"""
+        with self._wake:
+            if i == self._playhead:
+                return
+            self._playhead = i
+            for j in [j for j in self._frames if not self._in_window(j)]:
+                del self._frames[j]
+            self._wake.notify_all()
+
+    def get(self, i:int, wait:bool=False) -> Optional[Frame]:
+        """Frame `i` if it is loaded, or loaded on the calling thread if `wait`; moves the playhead to `i`"""
+        self.seek(i)
+        with self._wake:
+            frame = self._frames.get(i, None)
+        if frame is None and wait:
+            frame = self.source[i]
+            with self._wake:
+                if self._in_window(i):
+                    self._frames[i] = frame
+        return frame
+
+    def _run(self):
+        while True:
+            with self._wake:
+                i = self._next_missing()
+                while not self._stopped and i is None:
+                    self._wake.wait()
+                    i = self._next_missing()
+                if self._stopped:
+                    return
+                self._loading.add(i)
+            try:
+                frame = self.source[i]
+            except Exception as e:
+                logger.exception(e)
+                frame = (None, None)
+            with self._wake:
+                self._loading.discard(i)
+                if self._in_window(i):
+                    self._frames[i] = frame
+                self._wake.notify_all()
+
+    def close(self):
+        with self._wake:
+            self._stopped = True
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+
+class PlaybackClock:
+    """Frame index of a clip playing at `fps` x `speed` against the wall clock"""
+
+    def __init__(self, n_frames:int, fps:float, speed:float=1.0, loop:bool=True) -> None:
+        self.n_frames = n_frames
+        self.fps = fps
+        self.speed = speed
+        self.loop = loop
+        self.playing = False
+        self._origin_frame = 0
+        self._origin_time = 0.0
+
+    def frame(self, now:Optional[float]=None) -> int:
+        if not self.playing:
+            return self._origin_frame
+        now = time.perf_counter() if now is None else now
+        frame = self._origin_frame + int((now - self._origin_time) * self.fps * self.speed)
+        return frame % self.n_frames if self.loop else min(frame, self.n_frames - 1)
+
+    def finished(self, now:Optional[float]=None) -> bool:
+        return self.playing and not self.loop and self.frame(now) == self.n_frames - 1
+
+    def play(self, now:Optional[float]=None):
+        if not self.playing:
+            self._origin_time = time.perf_counter() if now is None else now
+            self.playing = True
+
+    def pause(self, now:Optional[float]=None):
+        self._origin_frame = self.frame(now)
+        self.playing = False
+
+    def seek(self, frame:int, now:Optional[float]=None):
+        self._origin_frame = int(np.clip(frame, 0, self.n_frames - 1))
+        self._origin_time = time.perf_counter() if now is None else now
+
+
+class AnimationPlayer:
+    """Real-time playback of a frame source.
+
+    `update` is called once per displayed frame and returns the frame the clock is at,
+    if it changed and is loaded. Frames the display could not keep up with are skipped
+    (counted in `n_dropped`) rather than slowing playback down, and a frame still being
+    loaded is shown on a later update. Seeking only moves the clock and the prefetch window.
+    """
+
+    def __init__(self, source, prefetch:int=16, n_workers:int=2, loop:bool=True, speed:float=1.0) -> None:
+        if len(source) == 0:
+            raise ValueError('Empty animation')
+        self.source = source
+        self.clock = PlaybackClock(len(source), source.fps, speed, loop)
+        self.prefetcher = FramePrefetcher(source, prefetch, n_workers, loop)
+        self.current = -1 # frame last returned by `update`
+        self.n_shown = 0
+        self.n_dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    @property
+    def fps(self) -> float:
+        return self.clock.fps
+
+    @property
+    def playing(self) -> bool:
+        return self.clock.playing
+
+    def play(self):
+        if not self.clock.loop and self.clock.frame() == len(self) - 1:
+            self.clock.seek(0)
+        self.clock.play()
+
+    def pause(self):
+        self.clock.pause()
+
+    def stop(self):
+        self.clock.pause()
+        self.seek(0)
+
+    def seek(self, frame:int):
+        self.clock.seek(frame)
+        self.prefetcher.seek(self.clock.frame())
+        self.current = -1 # show the frame sought even if it is the current one, without counting drops
+
+    def update(self, now:Optional[float]=None) -> Optional[Tuple[int, Frame]]:
+        """(index, frame) to show now, None to keep showing the current one"""
+        target = self.clock.frame(now)
+        if self.clock.finished(now):
+            self.clock.pause(now)
+        if target == self.current:
+            return None
+        # paused (seek, stop) the exact frame is wanted; playing, a late frame is skipped
+        frame = self.prefetcher.get(target, wait=not self.clock.playing)
+        if frame is None:
+            return None
+        if self.clock.playing and self.current >= 0:
+            self.n_dropped += (target - self.current) % len(self) - 1
+        self.current = target
+        self.n_shown += 1
+        return target, frame
+
+    def close(self):
+        self.prefetcher.close()
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Union
+import collections
+import os
+import threading
+import logging as log
+import numpy as np
+from .asset_cache import cache_dir, cache_key
+
+logger = log.getLogger('PyRenderer')
+
+
+def stack_frames(files:List[Union[Path, str]], output:Union[Path, str]) -> np.ndarray:
+    """Stack per-frame [N, 3] .npy files into one [T, N, 3] float32 .npy, frame by frame"""
+    first = np.load(files[0], mmap_mode='r')
+    frames = np.lib.format.open_memmap(output, mode='w+', dtype=np.float32, shape=(len(files), *first.shape))
+    for i, file in enumerate(files):
+        frame = np.load(file, mmap_mode='r')
+        if frame.shape != first.shape:
+            raise ValueError(f'{file} has shape {frame.shape}, expected {first.shape} like {files[0]}')
+        frames[i] = frame
+    frames.flush()
+    return frames
+
+
+class PointCloudSequence:
+    """Frames of a point cloud capture as one memory-mapped [T, N, 3] float32 array.
+
+    `source` is a [T, N, 3] .npy file, or a directory of per-frame [N, 3] .npy files which
+    is stacked once into the asset cache (see `asset_cache.py`). Frames around the last one
+    read are copied into memory by a background thread, so scrubbing back and forth does
+    not wait on the disk.
+    """
+
+    def __init__(self, source:Union[Path, str], prefetch:int=4) -> None:
+        source = Path(source)
+        if source.is_dir():
+            self.files = sorted(source.glob('*.npy'))
+            if len(self.files) == 0:
+                raise ValueError(f'No .npy frames in {source}')
+            self.frames = self._stacked(source)
+        else:
+            self.files = [source]
+            self.frames = np.load(source, mmap_mode='r')
+        if self.frames.ndim != 3 or self.frames.shape[-1] != 3:
+            raise ValueError(f'Expected [T, N, 3] frames, got {self.frames.shape}')
+        self.prefetch = prefetch
+        self._cache = collections.OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(1) if prefetch > 0 else None
+
+    def _stacked(self, source:Path) -> np.ndarray:
+        root = cache_dir()
+        if root is None:
+            return np.stack([np.load(f) for f in self.files]).astype(np.float32)
+        stacked = root / f'{source.name}-{cache_key(self.files)}.npy'
+        if not stacked.exists():
+            logger.info(f'Stacking {len(self.files)} frames of {source} into {stacked}')
+            root.mkdir(parents=True, exist_ok=True)
+            tmp = stacked.with_name(f'{stacked.stem}.tmp{os.getpid()}.npy')
+            try:
+                stack_frames(self.files, tmp)
+                os.replace(tmp, stacked)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+        return np.load(stacked, mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def n_points(self) -> int:
+        return self.frames.shape[1]
+
+    def _read(self, i:int) -> np.ndarray:
+        with self._lock:
+            frame = self._cache.get(i, None)
+            if frame is not None:
+                self._cache.move_to_end(i)
+                return frame
+        frame = np.array(self.frames[i])
+        with self._lock:
+            self._cache[i] = frame
+            self._pending.discard(i)
+            while len(self._cache) > 4 * self.prefetch + 1:
+                self._cache.popitem(last=False)
+        return frame
+
+    def __getitem__(self, i:int) -> np.ndarray:
+        """[N, 3] points of frame `i` (clipped to the sequence), do not modify"""
+        i = int(np.clip(i, 0, len(self) - 1))
+        frame = self._read(i)
+        if self._executor is not None:
+            with self._lock:
+                neighbours = [j for k in range(1, self.prefetch + 1) for j in (i + k, i - k)
+                              if 0 <= j < len(self) and j not in self._cache and j not in self._pending]
+                self._pending.update(neighbours)
+            for j in neighbours:
+                self._executor.submit(self._read, j)
+        return frame
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
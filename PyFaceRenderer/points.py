@@ -0,0 +1,39 @@
+from pathlib import Path
+from typing import Callable, Optional
+import numpy as np
+import pyrender
+from pyrender.constants import GLTF, RenderFlags
+from pyrender.shader_program import ShaderProgramCache
+
+SHADER_DIR = Path(__file__).parent / 'shaders'
+
+
+def points_mesh(points:np.ndarray, colors:Optional[np.ndarray]=None) -> pyrender.Mesh:
+    """GL_POINTS mesh of points [N, 3] with optional per-point RGB(A) colors [N, 3|4]"""
+    return pyrender.Mesh.from_points(np.asarray(points, dtype=np.float32), colors=colors)
+
+
+def install_point_sprites(renderer:pyrender.renderer.Renderer, point_radius:Callable[[], float]):
+    """Draw the GL_POINTS primitives of `renderer` as round, depth-attenuated sprites.
+
+    pyrender draws points with its mesh shader, which never sets `gl_PointSize`. This
+    swaps in `shaders/points.*` for point primitives in colour and depth-only passes, with the attribute
+    locations pyrender chose, and sizes every point as a sphere of radius `point_radius()`.
+    """
+    programs = ShaderProgramCache(shader_dir=str(SHADER_DIR))
+    get_primitive_program = renderer._get_primitive_program
+
+    def _get_primitive_program(primitive, flags, program_flags):
+        program = get_primitive_program(primitive, flags, program_flags)
+        if primitive.mode != GLTF.POINTS or flags & (RenderFlags.SEG | RenderFlags.FLAT):
+            return program
+        program = programs.get_program('points.vert', 'points.frag', defines=program.defines)
+        if not program._in_context():
+            program._add_to_context()
+        program._bind()
+        program.set_uniform('point_radius', float(point_radius()))
+        program.set_uniform('viewport_height', float(renderer.viewport_height * renderer.dpscale))
+        return program
+
+    renderer._get_primitive_program = _get_primitive_program
+    renderer._face_renderer_point_programs = programs
@@ -1,54 +1,87 @@
+import ctypes
+from typing import Optional, Tuple
 import numpy as np
 from OpenGL.GL import *
 from pyrender.constants import FLOAT_SZ
 
-def upload_vertex_data(primitive):
-    vertexbuffer = primitive._buffers[0]
-    glBindVertexArray(primitive._vaid)
-    glBindBuffer(GL_ARRAY_BUFFER, vertexbuffer)
+# Attribute locations of pyrender's interleaved vertex buffer
+POSITION_LOCATION = 0
+NORMAL_LOCATION = 1
 
-    if hasattr(primitive, 'face_renderer_buffer'):
-        primitive.face_renderer_buffer[primitive.face_renderer_indice] = primitive.positions.reshape(-1).astype(np.float32)
-    else:
-        # Positions
-        vertex_data = primitive.positions
-        n_vertex = vertex_data.shape[0]
-        attr_sizes = [3]
 
-        # Normals
+class AttributeStream:
+    """A per-vertex attribute moved out of pyrender's interleaved buffer into its own float32 VBO.
+
+    Re-pointing the attribute of the primitive's VAO lets it be updated on its own, instead
+    of re-uploading every interleaved attribute whenever positions change.
+    """
+
+    def __init__(self, primitive, location:int, data:np.ndarray) -> None:
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        self.location = location
+        self.n_vertex, self.size = data.shape
+        self.vbo = glGenBuffers(1)
+        primitive._buffers.append(self.vbo) # freed with the primitive
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+        glVertexAttribPointer(location, self.size, GL_FLOAT, GL_FALSE, FLOAT_SZ * self.size, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(location)
+
+    def upload(self, data:np.ndarray, vertex_range=None):
+        if vertex_range is not None and vertex_range[0] >= vertex_range[1]:
+            return # nothing changed
+        # pyrender already stores attributes as contiguous float32, so this does not copy
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        if vertex_range is None or (vertex_range[0] <= 0 and vertex_range[1] >= self.n_vertex):
+            # full update: orphan the old storage so the driver does not stall on in-flight draws
+            glBufferData(GL_ARRAY_BUFFER, data.nbytes, None, GL_STREAM_DRAW)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, data.nbytes, data)
+        else:
+            start, stop = vertex_range
+            stride = FLOAT_SZ * self.size
+            glBufferSubData(GL_ARRAY_BUFFER, start * stride, (stop - start) * stride, data[start:stop])
+
+
+def dirty_range(old:Optional[np.ndarray], new:np.ndarray) -> Optional[Tuple[int, int]]:
+    """(start, stop) span of the rows of `new` that differ from `old`, (0, 0) if none do,
+    None if everything has to be uploaded: the shapes differ, or `new` was edited in place"""
+    if old is None or old.shape != new.shape or np.may_share_memory(old, new):
+        return None
+    changed = np.flatnonzero((old != new).any(axis=1))
+    if len(changed) == 0:
+        return (0, 0)
+    return int(changed[0]), int(changed[-1]) + 1
+
+
+def merge_ranges(a:Optional[Tuple[int, int]], b:Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """Smallest span covering two dirty ranges (None is everything)"""
+    if a is None or b is None:
+        return None
+    if a[0] >= a[1]:
+        return b
+    if b[0] >= b[1]:
+        return a
+    return min(a[0], b[0]), max(a[1], b[1])
+
+
+def upload_vertex_data(primitive, normals=False, vertex_range=None):
+    """Upload the positions, and the normals if `normals`, of a primitive already in the GL context.
+
+    Only the vertices in `vertex_range` = (start, stop) are uploaded when it is given (see `dirty_range`).
+    """
+    glBindVertexArray(primitive._vaid)
+    if not hasattr(primitive, 'face_renderer_streams'):
+        streams = {'positions': AttributeStream(primitive, POSITION_LOCATION, primitive.positions)}
         if primitive.normals is not None:
-            vertex_data = np.hstack((vertex_data, primitive.normals))
-            attr_sizes.append(3)
-
-        # Tangents
-        if primitive.tangents is not None:
-            vertex_data = np.hstack((vertex_data, primitive.tangents))
-            attr_sizes.append(4)
-
-        # Texture Coordinates
-        if primitive.texcoord_0 is not None:
-            vertex_data = np.hstack((vertex_data, primitive.texcoord_0))
-            attr_sizes.append(2)
-        if primitive.texcoord_1 is not None:
-            vertex_data = np.hstack((vertex_data, primitive.texcoord_1))
-            attr_sizes.append(2)
-
-        # Color
-        if primitive.color_0 is not None:
-            vertex_data = np.hstack((vertex_data, primitive.color_0))
-            attr_sizes.append(4)
-        vertex_data = np.ascontiguousarray(
-            vertex_data.flatten().astype(np.float32)
-        )
-
-        primitive.face_renderer_buffer = vertex_data
-        total_attr_size = sum(attr_sizes)
-        _idx = np.arange(n_vertex) * total_attr_size
-        indice_array = np.concatenate([_idx, _idx+1, _idx+2])
-        indice_array.sort()
-        primitive.face_renderer_indice = indice_array
-
-    glBufferSubData( GL_ARRAY_BUFFER, 0, FLOAT_SZ * len(primitive.face_renderer_buffer), primitive.face_renderer_buffer,)
+            streams['normals'] = AttributeStream(primitive, NORMAL_LOCATION, primitive.normals)
+        primitive.face_renderer_streams = streams
+    else:
+        streams = primitive.face_renderer_streams
+        streams['positions'].upload(primitive.positions, vertex_range)
+        if normals and 'normals' in streams:
+            streams['normals'].upload(primitive.normals, vertex_range)
+    glBindVertexArray(0)
 
 
 def upload_pose_data(primitive):
@@ -63,4 +96,23 @@ def upload_pose_data(primitive):
     glBufferData(
         GL_ARRAY_BUFFER, FLOAT_SZ * len(pose_data),
         pose_data, GL_DYNAMIC_DRAW
-    )
\ No newline at end of file
+    )
+
+def upload_instance_translations(primitive, instance_range=None):
+    """Upload the translations of `primitive.poses`, for instances whose rotation and scale do not change.
+
+    The instance buffer content is kept in a preallocated staging array, so only the
+    translation column is copied on the CPU, and the buffer is updated in place
+    (glBufferSubData) instead of being transposed and reallocated like `upload_pose_data`.
+    """
+    poses = primitive.poses
+    staging = getattr(primitive, 'face_renderer_pose_staging', None)
+    if staging is None or len(staging) != len(poses):
+        # pyrender stores each pose transposed, the translation is then floats 12:15 of the instance
+        staging = np.ascontiguousarray(np.transpose(poses, [0,2,1]).reshape(len(poses), 16), dtype=np.float32)
+        primitive.face_renderer_pose_staging = staging
+    start, stop = (0, len(poses)) if instance_range is None else instance_range
+    staging[start:stop, 12:15] = poses[start:stop, :3, 3]
+    stride = FLOAT_SZ * 16
+    glBindBuffer(GL_ARRAY_BUFFER, primitive._buffers[1])
+    glBufferSubData(GL_ARRAY_BUFFER, start * stride, (stop - start) * stride, staging[start:stop])
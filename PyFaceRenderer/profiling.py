@@ -0,0 +1,118 @@
+from pathlib import Path
+from typing import Dict, Union
+import collections
+import json
+import os
+import threading
+import time
+import numpy as np
+
+
+class _Stage:
+    __slots__ = ['profiler', 'name', 'start']
+
+    def __init__(self, profiler, name:str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+_NO_STAGE = _NoStage()
+
+
+class StageProfiler:
+    """Wall-clock timers around the stages of the render pipeline.
+
+    `with profiler.stage('readback'): ...` keeps the last `window` durations of each stage
+    for rolling statistics, and the last `trace_capacity` spans for a Chrome trace
+    (chrome://tracing or https://ui.perfetto.dev). A disabled profiler costs one attribute check.
+
+    GL calls return before the GPU is done, so by default 'gl_draw' only times the draw
+    submission and the wait for the GPU lands in 'readback'. `sync_gpu` waits for the GPU
+    (glFinish) in between to split them, which stalls the pipeline: use it only while profiling.
+    """
+
+    def __init__(self, window:int=240, trace_capacity:int=200000, enabled:bool=True, sync_gpu:bool=False) -> None:
+        self.enabled = enabled
+        self.sync_gpu = sync_gpu
+        self.window = window
+        self._durations:Dict[str, collections.deque] = {}
+        self._counts:Dict[str, int] = collections.Counter()
+        self._trace = collections.deque(maxlen=trace_capacity)
+        self._origin = time.perf_counter_ns()
+
+    def stage(self, name:str):
+        return _Stage(self, name) if self.enabled else _NO_STAGE
+
+    def timed(self, name:str, iterable):
+        """Iterate over `iterable`, timing the wait for each item as stage `name`"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, start, time.perf_counter_ns())
+            yield item
+
+    def record(self, name:str, start_ns:int, end_ns:int):
+        """Add a span measured with `time.perf_counter_ns`"""
+        if not self.enabled:
+            return
+        durations = self._durations.get(name, None)
+        if durations is None:
+            durations = self._durations.setdefault(name, collections.deque(maxlen=self.window))
+        durations.append(end_ns - start_ns)
+        self._counts[name] += 1
+        self._trace.append((name, start_ns, end_ns, threading.get_ident()))
+
+    def stats(self) -> Dict[str, dict]:
+        """Rolling statistics in milliseconds of every stage seen, in first-seen order"""
+        stats = {}
+        for name, durations in list(self._durations.items()):
+            if len(durations) == 0:
+                continue
+            ms = np.array(durations) / 1e6
+            stats[name] = {'last_ms': float(ms[-1]), 'mean_ms': float(ms.mean()), 'p95_ms': float(np.percentile(ms, 95)),
+                           'max_ms': float(ms.max()), 'count': self._counts[name]}
+        return stats
+
+    def summary(self) -> str:
+        lines = [f'{"stage":<16}{"mean":>9}{"p95":>9}{"max":>9}']
+        for name, stat in self.stats().items():
+            lines.append(f'{name:<16}{stat["mean_ms"]:>7.2f}ms{stat["p95_ms"]:>7.2f}ms{stat["max_ms"]:>7.2f}ms')
+        return '\n'.join(lines)
+
+    def reset(self):
+        self._durations.clear()
+        self._counts.clear()
+        self._trace.clear()
+
+    def export_trace(self, filename:Union[Path, str]) -> Path:
+        """Write the recorded spans in the Chrome trace event format"""
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for name, start, end, thread in list(self._trace):
+            tid = threads.setdefault(thread, len(threads))
+            events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': (start - self._origin) / 1e3, 'dur': (end - start) / 1e3})
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'stats': self.stats()}}, f)
+        return filename
@@ -0,0 +1,96 @@
+from typing import Callable
+import time
+import numpy as np
+from OpenGL.GL import *
+
+# what `OffscreenFaceRenderer.render` reads back from the framebuffer
+OUTPUTS = ['color+depth', 'rgba+depth', 'color', 'rgba', 'depth', 'none']
+
+
+class FramebufferReader:
+    """Replacement for pyrender's `Renderer._read_main_framebuffer` that reads only the requested outputs.
+
+    pyrender always resolves and reads both depth and color and linearizes the depth,
+    allocating new arrays every frame. Here `outputs` selects 'color' (RGB), 'rgba'
+    (alpha written by GL), 'depth', 'color+depth', 'rgba+depth' or 'none', and every image is read
+    into a preallocated buffer that the next render overwrites: copy it to keep it.
+    """
+
+    def __init__(self, renderer, profiler, draw_start:Callable[[], int]) -> None:
+        self.renderer = renderer
+        self.profiler = profiler
+        self._draw_start = draw_start
+        self.outputs = 'color+depth'
+        self._buffers = {}
+
+    def install(self):
+        self.renderer._read_main_framebuffer = self.read
+        self.renderer._face_renderer_instrumented = True
+
+    def _buffer(self, name:str, shape, dtype) -> np.ndarray:
+        # keyed by shape too, the viewport may be resized between renders
+        buffer = self._buffers.get((name, shape), None)
+        if buffer is None:
+            buffer = self._buffers[(name, shape)] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def read(self, scene, flags):
+        if self.profiler.enabled:
+            if self.profiler.sync_gpu:
+                glFinish() # wait for the draw calls, so the readback time is only the copy
+            self.profiler.record('gl_draw', self._draw_start(), time.perf_counter_ns())
+        with self.profiler.stage('readback'):
+            return self._read(scene)
+
+    def _read(self, scene):
+        outputs = self.outputs
+        if outputs == 'none':
+            return None
+        width, height = self.renderer._main_fb_dims[0], self.renderer._main_fb_dims[1]
+        read_color = outputs != 'depth'
+        read_depth = outputs in ['depth', 'color+depth', 'rgba+depth']
+
+        # resolve the multisampled framebuffer, only the buffers that are read
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.renderer._main_fb_ms)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.renderer._main_fb)
+        if read_color:
+            glBlitFramebuffer(0, 0, width, height, 0, 0, width, height, GL_COLOR_BUFFER_BIT, GL_LINEAR)
+        if read_depth:
+            glBlitFramebuffer(0, 0, width, height, 0, 0, width, height, GL_DEPTH_BUFFER_BIT, GL_NEAREST)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.renderer._main_fb)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+
+        depth = self._read_depth(scene, width, height) if read_depth else None
+        if outputs == 'depth':
+            return depth
+        n_channels = 4 if outputs.startswith('rgba') else 3
+        raw = self._buffer(f'color_raw{n_channels}', (height, width, n_channels), np.uint8)
+        glReadPixels(0, 0, width, height, GL_RGBA if n_channels == 4 else GL_RGB, GL_UNSIGNED_BYTE, raw)
+        color = self._buffer(f'color{n_channels}', raw.shape, np.uint8)
+        np.copyto(color, raw[::-1]) # GL rows start at the bottom
+        if read_depth:
+            return color, depth
+        return color
+
+    def _read_depth(self, scene, width:int, height:int) -> np.ndarray:
+        """Linear depth, 0 where nothing was drawn (same values as pyrender)"""
+        raw = self._buffer('depth_raw', (height, width), np.float32)
+        glReadPixels(0, 0, width, height, GL_DEPTH_COMPONENT, GL_FLOAT, raw)
+        depth = self._buffer('depth', raw.shape, np.float32)
+        background = self._buffer('background', raw.shape, bool)
+        np.copyto(depth, raw[::-1])
+        np.equal(depth, 1.0, out=background)
+        depth *= 2.0
+        depth -= 1.0
+        z_near = scene.main_camera_node.camera.znear
+        z_far = scene.main_camera_node.camera.zfar
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if z_far is None:
+                np.subtract(1.0, depth, out=depth)
+                np.divide(2 * z_near, depth, out=depth)
+            else:
+                depth *= -(z_far - z_near)
+                depth += z_far + z_near
+                np.divide(2.0 * z_near * z_far, depth, out=depth)
+        depth[background] = 0.0
+        return depth
@@ -1,104 +1,35 @@
-import os
-import platform
-import subprocess
-from typing import List, Union
-import dearpygui.dearpygui as dpg
 import numpy as np
+import dearpygui.dearpygui as dpg
 from pyrender.trackball import Trackball
-from pyrender.camera import OrthographicCamera, PerspectiveCamera
-from pyrender.node import Node
-from pyrender.light import DirectionalLight
-import pyrender
-from pyrender.constants import RenderFlags
-import trimesh
 import logging as log
-from .utils import numpy2texture_data, lookat, rot2quat
-from .primitive_extension import upload_vertex_data, upload_pose_data
+from .utils import TextureBuffer, lookat, open_file
+from .offscreen import OffscreenFaceRenderer
+from .animation import is_columnar_animation
+from .playback import AnimationPlayer, open_frame_source
+from .scheduler import RenderScheduler, RenderWorker
 from PIL import Image
 from typing import Optional
 from pathlib import Path
-from .blendshape_model import ARKitModel
 from datetime import datetime
+import time
 from tqdm import tqdm
-import pickle
-import shutil
 
 logger = log.getLogger('PyRenderer')
 
-class FaceRenderer:
+class FaceRenderer(OffscreenFaceRenderer):
+    """DearPyGui view on top of `OffscreenFaceRenderer`"""
     fr_window:Optional[int] = None
     ctrl_window = None
 
-    def __init__(self, mesh: Union[pyrender.Mesh, str], height=640, width=360, 
-                 default_camera_pose=None, background_image:Optional[np.ndarray]=None, 
-                 camera_type='ortho', n_points=1000, 
-                 ) -> None:
-        self._height = height
-        self._width = width
-        self.mesh_type = 'static'
+    def __init__(self, *args, render_thread=False, **kwargs) -> None:
+        """`render_thread=True` renders on a background thread that owns the GL context, so
+        the control panel stays responsive however long a frame takes (needs `start_dearpygui`)"""
+        self._render_worker:Optional[RenderWorker] = None
+        self._render_thread = render_thread
+        super().__init__(*args, **kwargs)
+        self._texture = TextureBuffer(self._height, self._width)
         with dpg.texture_registry(show=False):
-            self.__texture_id = dpg.add_dynamic_texture(width, height, np.ones((height, width, 4), dtype=np.uint8)*255, tag='__face_renderer_texture_tag')        
-        if isinstance(mesh, pyrender.Mesh):
-            self.mesh = mesh
-        elif isinstance(mesh, trimesh.Trimesh):
-            self.trimesh = mesh
-            self.mesh = pyrender.Mesh.from_trimesh(self.trimesh, )
-        elif mesh == 'mediapipe':
-            self.trimesh = trimesh.load('data/models/face_mesh.obj')
-            self.mesh = pyrender.Mesh.from_trimesh(self.trimesh, )
-        elif mesh == 'fuze':
-            self.trimesh = trimesh.load('data/models/fuze.obj')
-            self.mesh = pyrender.Mesh.from_trimesh(self.trimesh)
-        elif mesh == 'arkit':
-            self.blendshape_model = ARKitModel()
-            self.trimesh = self.blendshape_model.trimesh
-            self.mesh = self.blendshape_model.neutral_mesh
-            self.mesh_type = 'blendshape'
-        elif mesh == 'flame':
-            model = pickle.load(open('data/models/flame/generic_model_converted.pkl', 'rb'))
-            self.trimesh = trimesh.Trimesh(model['v_template'], model['f'])
-            self.mesh = pyrender.Mesh.from_trimesh(self.trimesh)
-        elif mesh == 'pointcloud':
-            sm = trimesh.creation.uv_sphere(radius=1.0)
-            sm.visual.vertex_colors = [1.0, 1.0, 1.0]
-            pts = np.random.rand(n_points, 3) - 0.5
-            tfs = np.tile(np.eye(4), (len(pts), 1, 1))
-            tfs[:,:3,3] = pts
-            self.mesh = pyrender.Mesh.from_trimesh(sm, poses=tfs)
-            self._init_position = self.mesh._primitives[0].positions.copy()
-        elif isinstance(mesh, (str, Path)):
-            mesh_path = Path(mesh)
-            assert mesh_path.exists(), mesh_path
-            self.trimesh = trimesh.load(str(mesh))
-            self.mesh = pyrender.Mesh.from_trimesh(self.trimesh, )
-            
-        else:
-            raise NotImplementedError(f'Unrecognized mesh or topology: {mesh}')
-        
-        
-        self.background_image = np.array(Image.fromarray(background_image).resize([self._width, self._height])) if background_image is not None else None
-        self.scene = pyrender.Scene(bg_color=[0.3, 0.3, 0.3, 0.2], )
-        
-        self.mesh_node = Node(mesh=self.mesh, )
-        self.scene.add_node(self.mesh_node)
-
-        if default_camera_pose is None:
-            default_camera_pose = np.eye(4)
-            default_camera_pose[2, -1] = 0.5
-
-        self.init_camera_pose = default_camera_pose
-        logger.info(self.init_camera_pose)
-
-        self.trackball = Trackball(pose=self.init_camera_pose, size=(self._width, self._height), scale=1.0, )
-        # self.trackball
-
-        self.light = pyrender.DirectionalLight(color=np.array([0.0, 0.45, 0.5]), intensity=5.0,)
-        self._camera_node = None
-        self.set_camera(camera_type)
-        self.scene.add_node(self._camera_node)
-        self.scene.main_camera_node = self._camera_node
-
-        self._renderer = pyrender.OffscreenRenderer(width, height)
+            self.__texture_id = dpg.add_dynamic_texture(self._width, self._height, self._texture.data.reshape(-1), tag='__face_renderer_texture_tag')
 
         self._render_callbacks = []
         self._update_texture = True
@@ -107,77 +38,199 @@ class FaceRenderer:
         self._start_drag_pos = None
         self._mesh_pos_inv_operations = []
         self._is_rendering = False
+        self._performance_panel_updated = 0.0
+        self._stream_callback = None
+        self._player:Optional[AnimationPlayer] = None
+        self._exporter:Optional[OffscreenFaceRenderer] = None
+        if render_thread:
+            self._render_worker = RenderWorker(lambda: OffscreenFaceRenderer._create_renderer(self), self._render_texture, (self._height, self._width))
+            self._render_worker.start()
+            self.scheduler = RenderScheduler(self._render_worker.request)
+            self.scheduler.add_frame_callback(self._present_frame)
+        else:
+            self.scheduler = RenderScheduler(self._present)
+
+    def _create_renderer(self):
+        if self._render_thread:
+            self._renderer = None # created by the render worker, on its own thread
+        else:
+            super()._create_renderer()
+
+    def run_gl(self, fn, wait=True):
+        if self._render_worker is None:
+            return super().run_gl(fn, wait)
+        return self._render_worker.submit(lambda: super(FaceRenderer, self).run_gl(fn), wait)
+
+    def render_views(self, *args, **kwargs):
+        """`OffscreenFaceRenderer.render_views`, on the render thread if there is one"""
+        return self.run_gl(lambda: super(FaceRenderer, self).render_views(*args, **kwargs))
+
+    def request_render(self):
+        """Render on the next displayed frame (see `RenderScheduler`)"""
+        self.scheduler.request()
+
+    def start_dearpygui(self):
+        """Run DearPyGui with at most one render per displayed frame, use instead of `dpg.start_dearpygui()`"""
+        self.scheduler.run()
 
     def add_render_callbacks(self, callback):
         self._render_callbacks.append(callback)
 
     def set_light_intensity(self, intensity):
-        self.light.intensity = intensity
-        self._render()
+        super().set_light_intensity(intensity)
+        self.request_render()
 
     def set_light_color(self, color):
-        self.light.color = np.array(color)
-        self._render()
-        pass
-
-    def set_camera(self, cam_type:str):
-        if cam_type == 'persp':
-            self.camera = PerspectiveCamera(
-                yfov=np.pi/2.0, 
-                aspectRatio=9/16,
-                znear=0.01,
-                zfar=1000000.0,
-            )
-        else:
-            self.camera = OrthographicCamera(
-                xmag=0.5, ymag=0.5,
-                znear=0.01,
-                zfar=1000000.0,
-            )
-        if self._camera_node is None:
-            self._camera_node = Node(matrix=self.trackball._n_pose, camera=self.camera, light=self.light)
-        else:
-            self._camera_node.camera = self.camera
-        return 
-    
+        super().set_light_color(color)
+        self.request_render()
+
     def set_fov(self, fov):
-        self._camera_node.camera.yfov = fov
-        self._render()
+        super().set_fov(fov)
+        self.request_render()
         return
 
     def center_mesh(self):
-        self._renderer._platform.make_current()
-        center = (self.mesh._primitives[0].bounds[1] + self.mesh._primitives[0].bounds[0])/2
-        _scale = dpg.get_value('__fr_ctrl_panel_mesh_scale')
-        dpg.set_value('__fr_ctrl_panel_mesh_trans', -center*_scale)
-        self._render()
+        super().center_mesh()
+        self._push_state_to_ui()
+        self.request_render()
 
     def scale_mesh(self):
-        self._renderer._platform.make_current()
-        _p = self.mesh._primitives[0]
-        ori_scale = max(_p.bounds[1] - _p.bounds[0])
-        dpg.set_value('__fr_ctrl_panel_mesh_scale', 1.0/ori_scale)
-        self._render()
+        super().scale_mesh()
+        self._push_state_to_ui()
+        self.request_render()
         return 
 
-
     def reset_mesh(self):
-        dpg.set_value('__fr_ctrl_panel_mesh_scale', 1.0)
-        dpg.set_value('__fr_ctrl_panel_mesh_trans', [0.0, 0.0, 0.0])
-        self._render()
+        super().reset_mesh()
+        self._push_state_to_ui()
+        self.request_render()
 
     def reset_pose(self):
-        logger.info('Reset pose')
-        self.trackball = Trackball(pose=self.init_camera_pose, size=(self._width, self._height), scale=1.0, )
-        self._render()
+        super().reset_pose()
+        self.request_render()
 
     def update_pointcloud_size(self, size, ):
-        # print(f'update_pointcloud_size: {size}')
-        self._renderer._platform.make_current()
-        self.mesh._primitives[0].positions = self._init_position * size
-        upload_vertex_data(self.mesh._primitives[0])
-        self._render()        
-        
+        super().update_pointcloud_size(size)
+        self.request_render()
+
+    def update_points(self, points):
+        super().update_points(points)
+        self.request_render()
+
+    def attach_stream(self, stream):
+        """Drive the blendshapes from a live `BlendshapeStream` (see `live.py`), sampled once per displayed frame"""
+        if not hasattr(self, 'blendshape_model'):
+            raise ValueError('Live blendshape streams need a blendshape model')
+        n_blendshapes = self.blendshape_model.n_blendshapes
+        if len(stream.blendshape_names) != n_blendshapes:
+            raise ValueError(f'Stream has {len(stream.blendshape_names)} blendshapes, the model {n_blendshapes}')
+        self.detach_stream()
+        primitive = self.mesh.primitives[0]
+        if getattr(primitive, 'coes_0', None) is None:
+            primitive.coes_0 = np.zeros(n_blendshapes)
+        coe = np.zeros(n_blendshapes, dtype=np.float32)
+        def apply_stream():
+            if len(stream.buffer) == 0:
+                return
+            stream.sample(out=coe)
+            # latest wins: only the state at this frame is rendered, and only if it changed
+            if not np.array_equal(primitive.coes_0, coe):
+                primitive.coes_0[:] = coe
+                self.request_render()
+        self._stream_callback = apply_stream
+        self.scheduler.add_frame_callback(apply_stream)
+
+    def detach_stream(self):
+        if self._stream_callback is not None:
+            self.scheduler.remove_frame_callback(self._stream_callback)
+            self._stream_callback = None
+
+    def load_playback(self, animation=None):
+        """Load an animation file, a directory of OBJs or a frame source (see `playback.py`) into the timeline.
+
+        Defaults to the Animation File of the control panel.
+        """
+        if animation is None:
+            animation = dpg.get_value('__fr_ctrl_panel_animation_file')
+        if isinstance(animation, (str, Path)):
+            names = None
+            if hasattr(self, 'blendshape_model'):
+                names = self.blendshape_model.blendshape_names[:self.blendshape_model.n_blendshapes]
+            animation = open_frame_source(animation, names)
+        self.unload_playback()
+        primitive = self.mesh.primitives[0]
+        if getattr(animation, 'blendshapes', None) is not None and getattr(primitive, 'coes_0', None) is None:
+            primitive.coes_0 = np.zeros(self.blendshape_model.n_blendshapes)
+        loop = dpg.get_value('__fr_ctrl_panel_timeline_loop') if dpg.does_item_exist('__fr_ctrl_panel_timeline_loop') else True
+        self._player = AnimationPlayer(animation, loop=loop)
+        if dpg.does_item_exist('__fr_ctrl_panel_timeline'):
+            dpg.configure_item('__fr_ctrl_panel_timeline', max_value=len(self._player) - 1)
+        self.scheduler.add_frame_callback(self._update_playback)
+        self.seek(0)
+        log.info(f'Loaded {len(self._player)} frames at {self._player.fps:.2f} fps for playback')
+        return self._player
+
+    def unload_playback(self):
+        if self._player is not None:
+            self.scheduler.remove_frame_callback(self._update_playback)
+            self._player.close()
+            self._player = None
+
+    def play(self):
+        """Play the timeline in real time, loading the Animation File first if nothing is loaded"""
+        if self._player is None:
+            self.load_playback()
+        self._player.play()
+
+    def pause(self):
+        if self._player is not None:
+            self._player.pause()
+
+    def stop(self):
+        if self._player is not None:
+            self._player.stop()
+
+    def seek(self, frame:int):
+        if self._player is not None:
+            self._player.seek(frame)
+            if not self.scheduler.running:
+                self._update_playback()
+
+    def _update_playback(self):
+        """Show the frame the playback clock is at, once per displayed frame"""
+        update = self._player.update()
+        if update is None:
+            return
+        i, (vertex, coefficients) = update
+        def apply():
+            if coefficients is not None:
+                self.mesh.primitives[0].coes_0[:] = coefficients
+            if vertex is not None:
+                self.update_mesh(vertex)
+        self.run_gl(apply, wait=False) # in order with the renders of a render thread
+        if dpg.does_item_exist('__fr_ctrl_panel_timeline'):
+            dpg.set_value('__fr_ctrl_panel_timeline', i)
+            dpg.set_value('__fr_ctrl_panel_timeline_status',
+                          f'{i+1}/{len(self._player)}  {self._player.fps:.1f} fps  dropped {self._player.n_dropped}')
+        self.request_render()
+
+    def _pull_state_from_ui(self):
+        """Copy the control panel values into the render state"""
+        with self.profiler.stage('ui_state_read'):
+            self.mesh_translation = np.array(dpg.get_value('__fr_ctrl_panel_mesh_trans')[:3])
+            self.mesh_rotation = np.array(dpg.get_value('__fr_ctrl_panel_mesh_rot')[:3])
+            self.mesh_scale = dpg.get_value('__fr_ctrl_panel_mesh_scale')
+            self.alpha = dpg.get_value('__fr_ctrl_panel_alpha')
+            self.wireframe = dpg.get_value('__fr_ctrl_panel_wireframe')
+
+    def _push_state_to_ui(self):
+        dpg.set_value('__fr_ctrl_panel_mesh_trans', list(self.mesh_translation))
+        dpg.set_value('__fr_ctrl_panel_mesh_rot', list(self.mesh_rotation))
+        dpg.set_value('__fr_ctrl_panel_mesh_scale', self.mesh_scale)
+
+    def _state_changed(self):
+        self._pull_state_from_ui()
+        self.request_render()
 
     def show_face_renderer(self, show_control=True):
         with dpg.window(label='Face Renderer', tag='_face_renderer_window', pos=(0, 0), width=self._width, height=self._height) as self.fr_window:
@@ -205,7 +258,7 @@ class FaceRenderer:
             dpg.add_key_release_handler(dpg.mvKey_S, callback=key_release)
             def scroll(s, a):
                 self.trackball.scroll(a)
-                self._render()
+                self.request_render()
                 
             dpg.add_mouse_wheel_handler(callback=scroll)
             
@@ -220,13 +273,13 @@ class FaceRenderer:
         with dpg.window(label='FR Control panel', show=show_control, tag='_face_renderer_ctrl_window', pos=(self._width, 0), height=self._height-100, width=2*width) as self.ctrl_window:
             with dpg.collapsing_header(label='Mesh', default_open=True):
                 with dpg.group(horizontal=True, horizontal_spacing=0):
-                    dpg.add_drag_doublex(width=width, speed=0.1, tag=f'__fr_ctrl_panel_mesh_trans', size=3, callback=self._render, min_value=-1000.0, max_value=1000.0)
+                    dpg.add_drag_doublex(width=width, speed=0.1, tag=f'__fr_ctrl_panel_mesh_trans', size=3, callback=self._state_changed, min_value=-1000.0, max_value=1000.0)
                     dpg.add_text(' Position')
                 with dpg.group(horizontal=True, horizontal_spacing=0):
-                    dpg.add_drag_doublex(width=width, speed=0.1, tag=f'__fr_ctrl_panel_mesh_rot', size=3, callback=self._render, min_value=-np.pi*2, max_value=np.pi*2)
+                    dpg.add_drag_doublex(width=width, speed=0.1, tag=f'__fr_ctrl_panel_mesh_rot', size=3, callback=self._state_changed, min_value=-np.pi*2, max_value=np.pi*2)
                     dpg.add_text(' Rotation')
                 with dpg.group(horizontal=True, horizontal_spacing=0):
-                    dpg.add_drag_double(width=width, speed=0.0001, tag=f'__fr_ctrl_panel_mesh_scale', default_value=1.0, callback=self._render)
+                    dpg.add_drag_double(width=width, speed=0.0001, tag=f'__fr_ctrl_panel_mesh_scale', default_value=1.0, callback=self._state_changed)
                     dpg.add_text(' Scale')
                 with dpg.group(horizontal=True, horizontal_spacing=0):
                     dpg.add_drag_double(width=width, speed=1.0, tag=f'__fr_ctrl_panel_pointcloud_scale', default_value=1.0, min_value=0.1, clamped=True, callback=lambda s, a: self.update_pointcloud_size(a))
@@ -243,14 +296,14 @@ class FaceRenderer:
                     camera_pos = self.trackball._n_pose[:3, 3]
                     matrix = lookat(camera_pos, center, np.array([1, 0, 0]))
                     self.trackball._n_pose = matrix
-                    self._render()
+                    self.request_render()
                     return 
                 
                 dpg.add_combo(['ROTATE', 'ZOOM', 'PAN', 'ROLL'], label='Mode', default_value='ROTATE', width=width, tag='__fr_ctrl_panel_camera_mode',
                 callback=lambda s, a: self.set_mode(a))
                 def _set_n_pose(s, a, u):
                     self.trackball._n_pose[u] = a
-                    self._render()
+                    self.request_render()
                 for i in range(4):
                     dpg.add_drag_floatx(tag=f'__fr_ctrl_panel_camera_pose_row_{i}', width=width, speed=0.05, min_value=-100.0, max_value=100.0, size=4, callback=_set_n_pose, user_data=i)
                 dpg.add_button(label='LookAt', callback=look_at_centroid, width=width)
@@ -266,8 +319,8 @@ class FaceRenderer:
                 # dpg.add_color_edit(default_value=(0, int(255*0.45), int(255*0.55)), label='Color', callback=lambda s, a: self.set_light_color((a[0:3])), )
 
             with dpg.collapsing_header(label='Visualization', default_open=False):
-                dpg.add_drag_float(label='Mesh Alpha', default_value=1.0, min_value=0.0, max_value=1.0, speed=0.05, clamped=True, tag='__fr_ctrl_panel_alpha', callback=self._render)
-                dpg.add_checkbox(label='Wireframe', tag='__fr_ctrl_panel_wireframe', callback=self._render)
+                dpg.add_drag_float(label='Mesh Alpha', default_value=1.0, min_value=0.0, max_value=1.0, speed=0.05, clamped=True, tag='__fr_ctrl_panel_alpha', callback=self._state_changed)
+                dpg.add_checkbox(label='Wireframe', tag='__fr_ctrl_panel_wireframe', callback=self._state_changed)
             if self.mesh_type == 'blendshape':
                 self._coe = np.zeros(self.blendshape_model.n_blendshapes)
                 def _update_blendshape(s, a, u):
@@ -276,7 +329,7 @@ class FaceRenderer:
                     else:
                         self._coe[u] = np.clip(a, 0.0, 1.0)
                     self.mesh.primitives[0].coes_0 = self._coe
-                    self._render()
+                    self.request_render()
                     
                 with dpg.collapsing_header(label='Blendshapes', default_open=False):
                     blendshape_ids = []
@@ -290,7 +343,7 @@ class FaceRenderer:
                             dpg.set_value(_id, 0.0)
                         self._coe[:] = 0.0
                         self.mesh.primitives[0].coes_0[:] = 0.0
-                        self._render()
+                        self.request_render()
 
                     dpg.add_button(label='Reset', callback=reset_blendshapes, width=width, user_data=blendshape_ids)
 
@@ -313,16 +366,14 @@ class FaceRenderer:
                         for i in range(4):
                             _set_n_pose(None, conf[f'__fr_ctrl_panel_camera_pose_row_{i}'], i)
                         log.info('Imported Config')
-                        self._render()
+                        self._state_changed()
                     else:
                         log.error('Config file not found')
                 dpg.add_button(label='Export', callback=export_config, width=width)
                 dpg.add_button(label='Import', callback=import_config, width=width)
 
                 def screenshot():
-                    self._update_texture = False
-                    color, depth = self._render()
-                    self._update_texture = True
+                    color = self.run_gl(lambda: self.render('color').copy())
                     Path('Screenshots').mkdir(exist_ok=True)
                     filename = datetime.now().strftime('Screenshots/Screenshot_%Y%m%d_%H%M%S.png')
                     Image.fromarray(color).save(filename)
@@ -332,20 +383,44 @@ class FaceRenderer:
             with dpg.collapsing_header(label='Render', default_open=True):
                 dpg.add_button(label='Screenshot', callback=screenshot, width=width)
                 dpg.add_input_text(label='Animation File', default_value='data/mediapipe.pkl', width=width, tag='__fr_ctrl_panel_animation_file')
+                dpg.add_input_int(label='Workers', default_value=1, min_value=1, min_clamped=True, width=width, tag='__fr_ctrl_panel_render_workers')
                 dpg.add_button(label='Render Animation', callback=lambda: self.render_animation(), width=width)
                 
             
+            with dpg.collapsing_header(label='Performance', default_open=False):
+                dpg.add_checkbox(label='Enabled', default_value=self.profiler.enabled, tag='__fr_ctrl_panel_profiler_enabled',
+                                 callback=lambda s, a: setattr(self.profiler, 'enabled', a))
+                dpg.add_checkbox(label='Sync GPU', default_value=self.profiler.sync_gpu, tag='__fr_ctrl_panel_profiler_sync_gpu',
+                                 callback=lambda s, a: setattr(self.profiler, 'sync_gpu', a))
+                dpg.add_text(self.profiler.summary(), tag='__fr_ctrl_panel_profiler_stats')
+                def export_trace():
+                    filename = self.profiler.export_trace(datetime.now().strftime('Screenshots/Trace_%Y%m%d_%H%M%S.json'))
+                    log.info(f'Saved trace to {filename} (open in chrome://tracing or ui.perfetto.dev)')
+                def reset_profiler():
+                    self.profiler.reset()
+                    dpg.set_value('__fr_ctrl_panel_profiler_stats', self.profiler.summary())
+                dpg.add_button(label='Export Trace', callback=export_trace, width=width)
+                dpg.add_button(label='Reset', callback=reset_profiler, width=width)
+            self.scheduler.add_frame_callback(self._update_performance_panel)
+
             dpg.add_separator()
-            dpg.add_button(label='Render', callback=self._render, width=2*width)
+            dpg.add_button(label='Render', callback=self.request_render, width=2*width)
             pass
         
         with dpg.window(label='Timeline', show=show_control, tag='_face_renderer_timeline_window', pos=(self._width, self._height-100), width=2*width) as self.ctrl_window:
-            dpg.add_slider_int(default_value=0, min_value=0, max_value=100, tag='__fr_ctrl_panel_timeline', width=-1)
-            # dpg.add_button(label='Play', callback=self.render_animation, width=width)
-            # dpg.add_button(label='Pause', callback=self.render_animation, width=width)
-            # dpg.add_button(label='Stop', callback=self.render_animation, width=width)
-            pass
-        self._render()
+            dpg.add_slider_int(default_value=0, min_value=0, max_value=100, tag='__fr_ctrl_panel_timeline', width=-1,
+                               callback=lambda s, a: self.seek(a))
+            with dpg.group(horizontal=True):
+                dpg.add_button(label='Play', callback=lambda: self.play(), width=width//3)
+                dpg.add_button(label='Pause', callback=lambda: self.pause(), width=width//3)
+                dpg.add_button(label='Stop', callback=lambda: self.stop(), width=width//3)
+                dpg.add_button(label='Load', callback=lambda: self.load_playback(), width=width//3)
+                def set_loop(s, a):
+                    if self._player is not None:
+                        self._player.clock.loop = self._player.prefetcher.loop = a
+                dpg.add_checkbox(label='Loop', default_value=True, tag='__fr_ctrl_panel_timeline_loop', callback=set_loop)
+            dpg.add_text('', tag='__fr_ctrl_panel_timeline_status')
+        self.request_render()
 
     def set_mode(self, mode):
         mode = getattr(Trackball, f'STATE_{mode}')
@@ -374,186 +449,142 @@ class FaceRenderer:
             # ghost drag
             return
         self.trackball.drag(mouse_coord)
-        self._render()
+        self.request_render()
         return
 
-    def update_mesh(self, vertex:np.ndarray, update_normal=True):
-        self._renderer._platform.make_current()
-        if update_normal:
-            if vertex.shape != self.trimesh.vertices.shape:
-                logger.error(f'Shape mismatch: {vertex.shape} != {self.trimesh.vertices.shape}')
-                logger.error(f'self.mesh.primitives: {self.mesh.primitives}')
-                
-                return
-            self.trimesh.vertices[:] = vertex[:]
-            
-            self.mesh.primitives[0].positions = self.trimesh.vertices
-            self.mesh.primitives[0].normals = self.trimesh.vertex_normals
-        else:
-            if vertex.shape != self.mesh.primitives[0].positions.shape:
-                logger.error(f'Shape mismatch: {vertex.shape} != {self.mesh.primitives[0].positions.shape}')
-                logger.error(f'self.mesh.primitives: {self.mesh.primitives}')
-                return 
-            self.mesh.primitives[0].positions = vertex
-        upload_vertex_data(self.mesh.primitives[0])
-        logger.info('Updated Mesh from vertex array')
-
     def render_animation(self, ):
         animation_file = Path(dpg.get_value('__fr_ctrl_panel_animation_file'))
         if not animation_file.exists():
             log.error(f'Animation file not found: {animation_file}')
             return
         # self._update_texture = False
-        print(f'render_animation {animation_file}')
-        if animation_file.is_dir() and len(list(animation_file.glob('*.obj')))>0:
+        self.pause() # the export drives the mesh
+        logger.debug(f'render_animation {animation_file}')
+        if animation_file.is_dir() and not is_columnar_animation(animation_file) and len(list(animation_file.glob('*.obj')))>0:
             mesh_sequence = list(animation_file.glob('*.obj'))
             mesh_sequence.sort()
-            self.render_animation_from_mesh_sequence(mesh_sequence, animation_file.stem)
+            def export(renderer):
+                open_file(renderer.render_animation_from_mesh_sequence(mesh_sequence, animation_file.stem))
         else:
             
-            if animation_file.is_dir():
+            if is_columnar_animation(animation_file):
+                animation_files = [animation_file]
+            elif animation_file.is_dir():
                 animation_files = list(animation_file.glob('*.pickle')) + list(animation_file.glob('*.pkl'))
+                animation_files += [f for f in animation_file.iterdir() if is_columnar_animation(f)]
             elif animation_file.suffix in ['.pickle', '.pkl']:
                 animation_files = [animation_file]
+            else:
+                log.error(f'Unrecognized animation file: {animation_file}')
+                return
             # print(f'animation_files: {animation_files}')
-            for _f in tqdm(animation_files):
-                print(f'render_animation_from_pkl(animation_file): {_f}')
-                self.render_animation_from_pkl(_f)
-        
-    def render_animation_from_mesh_sequence(self, mesh_sequence: List[Path], sequence_name:str, fps:float=25, audio:Path=None):
-        output_filename = datetime.now().strftime(f'Screenshots/{sequence_name}_rendered_%Y%m%d_%H%M%S.mp4')
-        screenshot = Path('Screenshots')
-        tmp_folder = screenshot / 'tmp'
-        if tmp_folder.exists():
-            shutil.rmtree(tmp_folder) # remove all existing caches
-        tmp_folder.mkdir(parents=True)
-
-        log.info(f'Rendering {sequence_name}: {len(mesh_sequence)} frames to {output_filename}')
-        if hasattr(self.mesh.primitives[0], 'coes_0') and self.mesh.primitives[0].coes_0 is not None:
-            self.mesh.primitives[0].coes_0[:] = 0.0
-        
-        for i, mesh in tqdm(enumerate(mesh_sequence), total=len(mesh_sequence)):
-            _trimesh = trimesh.load(mesh, )
-            _mesh = pyrender.Mesh.from_trimesh(_trimesh)
-            self.update_mesh(_mesh.primitives[0].positions, update_normal=False)
-            color, depth = self._render()
-            Image.fromarray(color).save(f'Screenshots/tmp/{sequence_name}{i:07d}.png')
-        
-        if audio is not None and audio.exists(): # attach the audio file 
-            import librosa
-            sample, sr =  librosa.load(audio)
-            duration = sample.shape[-1]/sr
-            command = f"ffmpeg -framerate {fps} -pattern_type glob -i 'Screenshots/tmp/*.png' -i {audio}  -map 0:v -map 1:a -c:v libx264 -pix_fmt yuv420p {output_filename}"
-        else:
-            command = f"ffmpeg -framerate {fps} -pattern_type glob -i 'Screenshots/tmp/*.png' -c:v libx264 -pix_fmt yuv420p {output_filename}"
-        
-        p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,universal_newlines=True, shell=True)
-        p.wait()
-        _platform = platform.system().lower()
-        if _platform == "windows":
-            os.startfile(output_filename)
-        elif _platform == "darwin":
-            subprocess.Popen(["open", output_filename])
-        else:
-            subprocess.Popen(["xdg-open", output_filename])
+            n_workers = dpg.get_value('__fr_ctrl_panel_render_workers')
+            def export(renderer):
+                for _f in tqdm(animation_files):
+                    logger.debug(f'render_animation_file(animation_file): {_f}')
+                    output_filename = renderer.render_animation_file(_f, n_workers=n_workers)
+                    open_file(output_filename)
+        self._run_export(export)
+
+    def _run_export(self, export):
+        """Run `export(renderer)` on the GL thread.
+
+        With a render thread the UI stays live during the export, so it renders with a
+        snapshot of the current state (see `_export_renderer`) that later interaction does
+        not change. Meshes that cannot be rebuilt from their constructor arguments are
+        exported by this renderer, with the UI waiting for the export to finish.
+        """
+        if self._render_worker is None: # the UI waits for the export anyway
+            return self.run_gl(lambda: export(self))
+        if not isinstance(self._init_args[0], (str, Path)):
+            return self.run_gl(lambda: export(self))
+        state = self.get_state()
+        background_image = None if self.background_image is None else self.background_image.copy()
+        def run():
+            renderer = self._export_renderer(state, background_image)
+            try:
+                export(renderer)
+            finally:
+                self._renderer._platform.make_current() # the worker keeps rendering with this context
+        self.run_gl(run, wait=False)
+
+    def _export_renderer(self, state:dict, background_image) -> OffscreenFaceRenderer:
+        """Offscreen renderer of the same mesh with `state`, on the render thread.
+
+        Created once and kept: deleting a pyrender EGL context terminates the display
+        it shares with this renderer's context.
+        """
+        if self._exporter is None:
+            mesh, kwargs = self._init_args
+            self._exporter = OffscreenFaceRenderer(mesh, **kwargs)
+            self._exporter.profiler = self.profiler
+        self._exporter._renderer._platform.make_current()
+        self._exporter.set_state(state)
+        self._exporter.background_image = background_image
+        return self._exporter
 
-        self._update_texture = True
-        return 
-    
-    def render_animation_from_pkl(self, animation_file:Path):
-        output_filename = datetime.now().strftime(f'Screenshots/{animation_file.stem}_rendered_%Y%m%d_%H%M%S.mp4')
-        
-        screenshot = Path('Screenshots')
-        tmp_folder = screenshot / 'tmp'
-        if tmp_folder.exists():
-            shutil.rmtree(tmp_folder) # remove all existing caches
-        tmp_folder.mkdir(parents=True)
-
-        with open(animation_file,'rb') as f:
-            animation_frames = pickle.load(f)
-        log.info(f'Rendering animation: {len(animation_frames["data"])} frames from {animation_file} -> {output_filename}')
-        if hasattr(self.mesh.primitives[0], 'coes_0') and self.mesh.primitives[0].coes_0 is not None:
-            self.mesh.primitives[0].coes_0[:] = 0.0
-        
-        for i, animation in tqdm(enumerate(animation_frames['data']), total=len(animation_frames['data'])):
-            if 'blendshapes' in animation:
-                a:dict = animation['blendshapes']
-                for blendshape_name, value in a.items():
-                    if blendshape_name in self.blendshape_model.blendshape_names:
-                        idx = self.blendshape_model.blendshape_names.index(blendshape_name)
-                        self.mesh.primitives[0].coes_0[idx] = value
-                    else:
-                        logger.warning(f'[{i}] Blendshape {blendshape_name} not found in model ({value})')
-            if 'vertex' in animation:
-                self.update_mesh(animation['vertex'], update_normal=False)
-            color, depth = self._render()
-            Image.fromarray(color).save(f'Screenshots/tmp/{animation_file.stem}{i:07d}.png')
-        
-        fps = animation_frames['metadata']['fps']
-        if 'audio' in animation_frames['metadata'] and Path(animation_frames['metadata']['audio']).exists(): # attach the audio file
-            audio_file_path = animation_frames['metadata']['audio']
-            import librosa
-            sample, sr =  librosa.load(audio_file_path)
-            duration = sample.shape[-1]/sr
-            fps = len(animation_frames['data'])/duration
-            command = f"ffmpeg -framerate {fps} -pattern_type glob -i 'Screenshots/tmp/*.png' -i {audio_file_path}  -map 0:v -map 1:a -c:v libx264 -pix_fmt yuv420p {output_filename}"
-        else:
-            command = f"ffmpeg -framerate {fps} -pattern_type glob -i 'Screenshots/tmp/*.png' -c:v libx264 -pix_fmt yuv420p {output_filename}"
-        
-        p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,universal_newlines=True, shell=True)
-        p.wait()
-        _platform = platform.system().lower()
-        if _platform == "windows":
-            os.startfile(output_filename)
-        elif _platform == "darwin":
-            subprocess.Popen(["open", output_filename])
-        else:
-            subprocess.Popen(["xdg-open", output_filename])
 
-        self._update_texture = True
-        return 
+    def _render(self):
+        """Trigger a re-render event, returns (color, depth) with color composited as displayed"""
+        return self._render_view('rgba+depth' if self._update_texture else 'color+depth')
 
+    def _present(self):
+        """Render for display, reading back only the RGBA the texture needs, or nothing without a texture update"""
+        self._render_view('rgba' if self._update_texture else 'none')
 
-    def _render(self):
-        """Trigger a re-render event"""
+    def _render_view(self, outputs:str):
         if self._is_rendering:
             log.debug('Dropping frame')
             return 
         self._is_rendering = True
         pose = self.trackball.pose.copy()
-        self._camera_node.matrix = pose
-        self.mesh_node.translation = dpg.get_value('__fr_ctrl_panel_mesh_trans')[:3]
-        self.mesh_node.rotation = rot2quat(*dpg.get_value('__fr_ctrl_panel_mesh_rot')[:3])
-        self.mesh_node.scale = [dpg.get_value('__fr_ctrl_panel_mesh_scale')]*3
-        
-        
-        flags = RenderFlags.NONE
-        if dpg.get_value('__fr_ctrl_panel_wireframe'):
-            flags |= RenderFlags.FLIP_WIREFRAME
+        def render():
+            result = self.render(outputs)
+            color, depth = result if outputs.endswith('+depth') else (result, None)
+            if self._update_texture:
+                color = self.composite(color)
+            if self._render_worker is not None: # the worker's next frame reuses the buffers
+                color, depth = [None if a is None else a.copy() for a in (color, depth)]
+            return color, depth
+        color, depth = self.run_gl(render)
 
-        color, depth = self._renderer.render(self.scene, flags)
-        
         if self._update_texture:
-            _depth = (depth[..., None] > 0.01)
-            alpha = dpg.get_value('__fr_ctrl_panel_alpha')
-            if self.background_image is None:
-                _depth = _depth.astype(np.uint8) * int(255*alpha)
-                color = np.concatenate([color, _depth], axis=-1)
-            elif alpha == 1.0: 
-                color = np.where(_depth, color, self.background_image)
-            else: # alpha blending with image
-                _depth = _depth.astype(float)*alpha
-                color = (color * _depth + self.background_image * (1-_depth)).astype(np.uint8)
-
-            texture_data = numpy2texture_data(color, bgr=False)
-            dpg.set_value('__face_renderer_texture_tag', texture_data)
+            with self.profiler.stage('texture_convert'):
+                texture_data = self._texture.convert(color)
+            with self.profiler.stage('dpg_set_value'):
+                dpg.set_value('__face_renderer_texture_tag', texture_data)
             # logger.debug('Updated image')
 
-        for i in range(4):
-            dpg.set_value(f'__fr_ctrl_panel_camera_pose_row_{i}', pose[i, :].astype(np.float32))
+        self._show_camera_pose(pose)
         self._is_rendering = False
         return color, depth
 
+    def _render_texture(self, texture:TextureBuffer):
+        """Render the current state into `texture`, on the render thread"""
+        color = self.composite(self.render('rgba'))
+        with self.profiler.stage('texture_convert'):
+            texture.convert(color)
+
+    def _present_frame(self):
+        """Hand the latest frame finished by the render thread to DearPyGui"""
+        def present(texture):
+            with self.profiler.stage('dpg_set_value'):
+                dpg.set_value('__face_renderer_texture_tag', texture.data.reshape(-1))
+        if self._render_worker.present(present):
+            self._show_camera_pose(self.trackball.pose)
+
+    def _update_performance_panel(self):
+        now = time.monotonic()
+        if now - self._performance_panel_updated < 0.5:
+            return
+        self._performance_panel_updated = now
+        if dpg.is_item_visible('__fr_ctrl_panel_profiler_stats'):
+            dpg.set_value('__fr_ctrl_panel_profiler_stats', self.profiler.summary())
+
+    def _show_camera_pose(self, pose):
+        for i in range(4):
+            dpg.set_value(f'__fr_ctrl_panel_camera_pose_row_{i}', pose[i, :].astype(np.float32))
+
 
     def print_pose(self):
         logger.info(self.trackball.pose)
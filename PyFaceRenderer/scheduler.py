@@ -0,0 +1,147 @@
+from typing import Callable, List, Tuple
+from concurrent.futures import Future
+import collections
+import threading
+import logging as log
+import dearpygui.dearpygui as dpg
+from .utils import TextureBuffer
+
+logger = log.getLogger('PyRenderer')
+
+
+class RenderScheduler:
+    """Coalesce render requests into at most one render per displayed frame.
+
+    UI callbacks only mark the view dirty through `request`; `run` drives DearPyGui with
+    a manual frame loop that runs the queued callbacks, then renders once if anything
+    changed, so the latest state always wins and no intermediate state is rendered.
+    Without the frame loop, `request` renders right away.
+    """
+
+    def __init__(self, render_fn:Callable) -> None:
+        self._render_fn = render_fn
+        self._dirty = False
+        self._frame_callbacks:List[Callable] = []
+        self.running = False
+
+    def request(self):
+        if self.running:
+            self._dirty = True
+        else:
+            self._render_fn()
+
+    def add_frame_callback(self, callback:Callable):
+        """Call `callback` once per displayed frame, before the render"""
+        self._frame_callbacks.append(callback)
+
+    def remove_frame_callback(self, callback:Callable):
+        if callback in self._frame_callbacks:
+            self._frame_callbacks.remove(callback)
+
+    def run_frame(self):
+        dpg.run_callbacks(dpg.get_callback_queue())
+        for callback in list(self._frame_callbacks):
+            callback()
+        if self._dirty:
+            self._dirty = False
+            self._render_fn()
+
+    def run(self):
+        """Replacement for `dpg.start_dearpygui()`"""
+        # callbacks are queued for this thread, which also owns the GL context
+        dpg.configure_app(manual_callback_management=True)
+        self.running = True
+        try:
+            while dpg.is_dearpygui_running():
+                self.run_frame()
+                dpg.render_dearpygui_frame()
+        finally:
+            self.running = False
+            dpg.configure_app(manual_callback_management=False)
+
+
+class RenderWorker(threading.Thread):
+    """Thread that owns the offscreen GL context and renders finished textures off the UI thread.
+
+    GL work (uploads, renders, exports) is submitted with `submit` and runs on this thread
+    in order. `request` asks for a new frame: `render_fn(texture)` fills the back buffer,
+    which is then swapped with the front buffer, and the UI thread hands the front buffer
+    to DearPyGui with `present`. Requests made while a frame is rendering collapse into one.
+    """
+
+    def __init__(self, setup_fn:Callable, render_fn:Callable, shape:Tuple[int, int]) -> None:
+        super().__init__(name='FaceRendererWorker', daemon=True)
+        self.log = log.getLogger(self.__class__.__name__)
+        self._setup_fn = setup_fn
+        self._render_fn = render_fn
+        self._front = TextureBuffer(*shape)
+        self._back = TextureBuffer(*shape)
+        self._swap_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._tasks = collections.deque()
+        self._requested = False
+        self._fresh = False
+        self._stopped = False
+
+    def submit(self, fn:Callable, wait:bool=True):
+        """Run `fn` on the render thread, return its result if `wait` else a Future"""
+        if threading.current_thread() is self:
+            return fn() if wait else _done(fn())
+        future = Future()
+        with self._wake:
+            self._tasks.append((fn, future))
+            self._wake.notify()
+        return future.result() if wait else future
+
+    def request(self):
+        with self._wake:
+            self._requested = True
+            self._wake.notify()
+
+    def present(self, present_fn:Callable) -> bool:
+        """Call `present_fn(texture)` with the front buffer if a new frame finished since the last call"""
+        with self._swap_lock: # the worker must not swap while the front buffer is being read
+            if not self._fresh:
+                return False
+            self._fresh = False
+            present_fn(self._front)
+        return True
+
+    def stop(self):
+        with self._wake:
+            self._stopped = True
+            self._wake.notify()
+        self.join()
+
+    def run(self):
+        self._setup_fn()
+        while True:
+            with self._wake:
+                while not (self._tasks or self._requested or self._stopped):
+                    self._wake.wait()
+                if self._stopped:
+                    break
+                tasks = list(self._tasks)
+                self._tasks.clear()
+                requested, self._requested = self._requested, False
+            for fn, future in tasks:
+                try:
+                    future.set_result(fn())
+                except Exception as e:
+                    self.log.exception(e)
+                    future.set_exception(e)
+            if requested:
+                try:
+                    self._render_fn(self._back)
+                except Exception as e:
+                    self.log.exception(e)
+                    continue
+                with self._swap_lock:
+                    self._front, self._back = self._back, self._front
+                    self._fresh = True
+
+
+def _done(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
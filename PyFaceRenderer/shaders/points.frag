@@ -0,0 +1,23 @@
+#version 330 core
+
+struct Material {
+    vec4 base_color_factor;
+};
+uniform Material material;
+
+in vec4 color_multiplier;
+
+out vec4 frag_color;
+
+void main()
+{
+    vec2 p = gl_PointCoord * 2.0 - 1.0;
+    float r2 = dot(p, p);
+    if (r2 > 1.0) {
+        discard;
+    }
+    // shade as the camera-facing hemisphere of the sphere the sprite stands for
+    float nz = sqrt(1.0 - r2);
+    vec4 color = material.base_color_factor * color_multiplier;
+    frag_color = vec4(color.rgb * (0.25 + 0.75 * nz), color.a);
+}
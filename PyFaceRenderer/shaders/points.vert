@@ -0,0 +1,29 @@
+#version 330 core
+
+// Point sprites standing for spheres of radius `point_radius` (world units)
+layout(location = 0) in vec3 position;
+#ifdef COLOR_0_LOC
+layout(location = COLOR_0_LOC) in vec4 color_0;
+#endif
+layout(location = INST_M_LOC) in mat4 inst_m;
+
+uniform mat4 M;
+uniform mat4 V;
+uniform mat4 P;
+uniform float point_radius;
+uniform float viewport_height;
+
+out vec4 color_multiplier;
+
+void main()
+{
+    gl_Position = P * V * M * inst_m * vec4(position, 1);
+    // projected diameter in pixels, w is the depth with a perspective camera and 1 with an orthographic one
+    float scale = length(vec3(M[0]));
+    gl_PointSize = max(point_radius * scale * P[1][1] * viewport_height / gl_Position.w, 1.0);
+#ifdef COLOR_0_LOC
+    color_multiplier = color_0;
+#else
+    color_multiplier = vec4(1.0);
+#endif
+}
@@ -1,18 +1,46 @@
+import os
+import subprocess
+import warnings
 import numpy as np
 import platform 
 _platform = platform.system().lower()
 
+class TextureBuffer:
+    """Preallocated float32 RGBA buffer holding the data of a DearPyGui dynamic texture.
+
+    DearPyGui textures only take normalized floats, so uint8 frames are converted in a
+    single in-place pass, without intermediate arrays.
+    """
+    _scale = np.float32(1.0/255.0)
+
+    def __init__(self, height:int, width:int) -> None:
+        self.data = np.ones((height, width, 4), dtype=np.float32)
+        self._opaque = True # alpha channel is all ones
+
+    def convert(self, frame:np.ndarray, bgr=False) -> np.ndarray:
+        """Convert a uint8 RGB(A) frame into the buffer and return it flattened (no copy)"""
+        assert frame.shape[:2] == self.data.shape[:2], (frame.shape, self.data.shape)
+        color = frame[..., 2::-1] if bgr else frame[..., :3]
+        np.multiply(color, self._scale, out=self.data[..., :3], dtype=np.float32)
+        if frame.shape[2] == 4:
+            np.multiply(frame[..., 3], self._scale, out=self.data[..., 3], dtype=np.float32)
+            self._opaque = False
+        elif not self._opaque:
+            self.data[..., 3] = 1.0
+            self._opaque = True
+        return self.data.reshape(-1)
+
+
 def numpy2texture_data(array, force_alpha=True, bgr=True):
-    if bgr:
-        frame = np.flip(array.copy(), 2)
-    else:
-        frame = array
+    """Deprecated, allocates new texture data on every call: convert frames into a reused `TextureBuffer` instead"""
+    warnings.warn('numpy2texture_data is deprecated, use TextureBuffer.convert', DeprecationWarning, stacklevel=2)
+    frame = np.flip(array, 2) if bgr else array
     if ('darwin' in _platform or force_alpha) and (frame.shape[2] == 3):
-        frame = np.concatenate((frame, np.ones((*frame.shape[:2], 1), dtype=np.uint8)*255), axis=-1)
-    data = frame.ravel()
-    data = np.asfarray(data, dtype='f')    
-    data = np.true_divide(data, 255.0)
-    return data
+        data = np.ones((*frame.shape[:2], 4), dtype=np.float32)
+        np.true_divide(frame, np.float32(255.0), out=data[..., :3], dtype=np.float32)
+    else:
+        data = np.true_divide(frame, np.float32(255.0), dtype=np.float32)
+    return data.reshape(-1)
 
 def normalize(vector):
     return vector / (np.linalg.norm(vector))
@@ -43,3 +71,13 @@ def rot2quat(roll, pitch, yaw):
   return [qx, qy, qz, qw]
 
 
+
+
+def open_file(filename):
+    """Open a file with the default application of the platform"""
+    if _platform == "windows":
+        os.startfile(filename)
+    elif _platform == "darwin":
+        subprocess.Popen(["open", filename])
+    else:
+        subprocess.Popen(["xdg-open", filename])
@@ -0,0 +1,76 @@
+"""Timing, environment and result helpers shared by the benchmark scripts"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+# outside the repository, so results of every revision can be compared without being committed
+RESULTS_DIR = Path(os.environ.get('PYFACERENDERER_BENCHMARKS', Path.home() / '.cache' / 'PyFaceRenderer' / 'benchmarks'))
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except OSError:
+        return 'unknown'
+    return revision + ('-dirty' if dirty else '') if revision else 'unknown'
+
+
+def environment() -> dict:
+    return {'revision': git_revision(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'gl_platform': os.environ.get('PYOPENGL_PLATFORM', 'default')}
+
+
+def measure(fn:Callable, repeat:int=20, warmup:int=2, budget:float=5.0) -> dict:
+    """Latency statistics of `fn()` in milliseconds, over at most `repeat` calls or `budget` seconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < repeat and (len(samples) == 0 or time.perf_counter() - start < budget):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    samples = np.array(samples) * 1000
+    return {'median_ms': float(np.median(samples)), 'mean_ms': float(samples.mean()),
+            'p95_ms': float(np.percentile(samples, 95)), 'min_ms': float(samples.min()), 'n': len(samples)}
+
+
+def run_child(script:Path, args:List[str], timeout:Optional[float]=None) -> dict:
+    """Run `script *args` in a fresh interpreter (own GL context, cold imports), return the JSON it prints last"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), os.environ.get('PYTHONPATH', '')]))
+    try:
+        result = subprocess.run([sys.executable, str(script), *args], cwd=ROOT, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f'timed out after {timeout}s'}
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit {result.returncode}'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def write_results(suite:str, results:Dict[str, dict], path:Optional[Path]=None) -> Path:
+    """Write results with the environment, by default to `RESULTS_DIR/<suite>-<revision>.json`"""
+    env = environment()
+    if path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f'{suite}-{env["revision"]}.json'
+    with open(path, 'w') as f:
+        json.dump({'suite': suite, 'environment': env, 'results': results}, f, indent=2)
+    return Path(path)
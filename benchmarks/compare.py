@@ -0,0 +1,58 @@
+"""Compare two benchmark result files, e.g. from two commits:
+
+    python benchmarks/compare.py ~/.cache/PyFaceRenderer/benchmarks/pipeline-<old>.json ~/.cache/PyFaceRenderer/benchmarks/pipeline-<new>.json
+
+Exits with status 1 when a case got slower than `--threshold`.
+"""
+import argparse
+import json
+import sys
+
+# metric of each result entry, lower is better
+METRICS = ['median_ms', 'total_ms', 'total']
+
+
+def metric(result:dict):
+    for key in METRICS:
+        if key in result:
+            return key, result[key]
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(args.candidate, 'r') as f:
+        candidate = json.load(f)
+    print(f'baseline  {baseline["environment"]["revision"]} ({baseline["environment"]["date"]})')
+    print(f'candidate {candidate["environment"]["revision"]} ({candidate["environment"]["date"]})')
+    if baseline['environment'].get('platform') != candidate['environment'].get('platform'):
+        print('warning: results come from different platforms')
+
+    regressions = []
+    for name in sorted(set(baseline['results']) | set(candidate['results'])):
+        key, old = metric(baseline['results'].get(name, {}))
+        _, new = metric(candidate['results'].get(name, {}))
+        if old is None or new is None:
+            print(f'{name:<40} {"only in one run":>30}')
+            continue
+        change = new / old - 1.0 if old > 0 else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = '  improved'
+        print(f'{name:<40} {old:>12.2f} -> {new:>12.2f} {key:<10} {change:+7.1%}{flag}')
+    if regressions:
+        print(f'{len(regressions)} regression(s) above {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Render pipeline benchmark: per-stage latency and fps of each built-in model, microbenchmarks
+of the hot helpers and an end-to-end export of a synthetic animation.
+
+Runs headless; every case runs in a fresh interpreter with its own GL context.
+Run from the repository root and compare two runs with `benchmarks/compare.py`:
+
+    PYOPENGL_PLATFORM=egl python benchmarks/pipeline.py
+    python benchmarks/compare.py ~/.cache/PyFaceRenderer/benchmarks/pipeline-<old>.json ~/.cache/PyFaceRenderer/benchmarks/pipeline-<new>.json
+"""
+import argparse
+import itertools
+import json
+import pickle
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from common import measure, run_child, write_results
+
+MODELS = ['mediapipe', 'fuze', 'flame', 'arkit', 'pointcloud', 'points']
+HEIGHT, WIDTH = 640, 360
+
+
+def model_child(model:str, repeat:int, budget:float) -> dict:
+    from PyFaceRenderer import OffscreenFaceRenderer
+    from PyFaceRenderer.primitive_extension import upload_instance_translations, upload_pose_data, upload_vertex_data
+    from PyFaceRenderer.utils import TextureBuffer
+    renderer = OffscreenFaceRenderer(model, height=HEIGHT, width=WIDTH)
+    renderer.render() # uploads the mesh
+    primitive = renderer.mesh.primitives[0]
+    stats = lambda fn: measure(fn, repeat=repeat, budget=budget)
+    results = {}
+    if model == 'pointcloud':
+        update = lambda: renderer.update_pointcloud_size(1.0)
+        results['upload_pose_data'] = stats(lambda: renderer.run_gl(lambda: upload_pose_data(primitive)))
+        results['upload_instance_translations'] = stats(lambda: renderer.run_gl(lambda: upload_instance_translations(primitive)))
+    else:
+        rng = np.random.default_rng(0)
+        positions = np.array(primitive.positions)
+        vertex_frames = itertools.cycle(positions + rng.normal(scale=1e-3, size=(8, *positions.shape)).astype(np.float32))
+        update = lambda: renderer.update_mesh(next(vertex_frames))
+        normals = primitive.normals is not None
+        results['upload_vertex_data'] = stats(lambda: renderer.run_gl(lambda: upload_vertex_data(primitive, normals=normals)))
+    results['update_mesh'] = stats(update)
+    results['render'] = stats(renderer.render)
+    for outputs in ['color', 'rgba', 'none']:
+        results[f'render_{outputs}'] = stats(lambda: renderer.render(outputs))
+    if model != 'pointcloud': # seconds per view in software GL
+        poses = np.tile(renderer.camera_pose, (16, 1, 1))
+        results['render_views_16'] = stats(lambda: renderer.render_views(poses))
+        results['render_views_16_atlas'] = stats(lambda: renderer.render_views(poses, atlas=True))
+    color, depth = renderer.render()
+    results['composite'] = stats(lambda: renderer.composite(color, depth))
+    rgba = renderer.render('rgba')
+    results['composite_rgba'] = stats(lambda: renderer.composite(rgba))
+    frame = renderer.composite(color, depth).copy()
+    texture = TextureBuffer(HEIGHT, WIDTH)
+    results['texture_convert'] = stats(lambda: texture.convert(frame))
+    results['frame'] = stats(lambda: (update(), renderer.render_frame()))
+    results['frame']['fps'] = 1000.0 / results['frame']['median_ms']
+    return results
+
+
+def micro_child(repeat:int, budget:float) -> dict:
+    from PyFaceRenderer.blendshape_model import BlendshapeModel
+    from PyFaceRenderer.normals import VertexNormals
+    from PyFaceRenderer.utils import TextureBuffer
+    stats = lambda fn: measure(fn, repeat=repeat, budget=budget)
+    rng = np.random.default_rng(0)
+    results = {}
+    texture = TextureBuffer(HEIGHT, WIDTH)
+    for n_channels, name in [(3, 'rgb'), (4, 'rgba')]:
+        frame = rng.integers(0, 256, size=(HEIGHT, WIDTH, n_channels), dtype=np.uint8)
+        results[f'texture_convert_{name}'] = stats(lambda: texture.convert(frame))
+
+    # synthetic 52-shape model on the mediapipe topology
+    blendshapes = rng.normal(scale=1e-3, size=(52, 468, 3)).astype(np.float32)
+    model = BlendshapeModel('data/models/face_mesh.obj', blendshapes, [f'bs{i}' for i in range(52)])
+    coe = rng.random(52).astype(np.float32)
+    coes = rng.random((256, 52)).astype(np.float32)
+    results['get_mesh'] = stats(lambda: model.get_mesh(coe))
+    results['get_meshes_256'] = stats(lambda: model.get_meshes(coes))
+    results['get_meshes_256_sparse'] = stats(lambda: model.get_meshes(coes, sparse=True))
+
+    normals = VertexNormals(model.neutral_mesh.primitives[0].indices, len(model.neutral_position))
+    vertices = model.get_meshes(coes[:64])
+    results['vertex_normals'] = stats(lambda: normals(vertices[0]))
+    results['vertex_normals_64'] = stats(lambda: normals(vertices))
+    return results
+
+
+def export_child(n_frames:int) -> dict:
+    from PyFaceRenderer import OffscreenFaceRenderer
+    renderer = OffscreenFaceRenderer('mediapipe', height=HEIGHT, width=WIDTH)
+    positions = np.array(renderer.mesh.primitives[0].positions)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        animation_file = Path(tmp) / 'synthetic.pkl'
+        data = [{'vertex': positions + rng.normal(scale=1e-3, size=positions.shape).astype(np.float32)} for _ in range(n_frames)]
+        with open(animation_file, 'wb') as f:
+            pickle.dump({'data': data, 'metadata': {'fps': 30}}, f)
+        t = time.perf_counter()
+        renderer.render_animation_from_pkl(animation_file, output_filename=Path(tmp) / 'synthetic.mp4')
+        elapsed = time.perf_counter() - t
+    return {'render_animation_from_pkl': {'total_ms': elapsed * 1000, 'frames': n_frames, 'fps': n_frames / elapsed}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='*', default=MODELS)
+    parser.add_argument('--repeat', type=int, default=20, help='maximum samples per stage')
+    parser.add_argument('--budget', type=float, default=5.0, help='seconds of sampling per stage (at least one sample)')
+    parser.add_argument('--export-frames', type=int, default=120, help='frames of the synthetic export, 0 to skip')
+    parser.add_argument('--json', type=str, default=None, help='output file, default ~/.cache/PyFaceRenderer/benchmarks/pipeline-<revision>.json')
+    parser.add_argument('--child', nargs='*', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        case, *options = args.child
+        if case == 'model':
+            results = model_child(options[0], args.repeat, args.budget)
+        elif case == 'micro':
+            results = micro_child(args.repeat, args.budget)
+        else:
+            results = export_child(args.export_frames)
+        print(json.dumps(results))
+        return
+
+    child_args = ['--repeat', str(args.repeat), '--budget', str(args.budget), '--export-frames', str(args.export_frames)]
+    cases = [(f'model.{model}', ['model', model]) for model in args.models] + [('micro', ['micro'])]
+    if args.export_frames > 0:
+        cases.append(('export', ['export']))
+    results = {}
+    for name, case in cases:
+        # options go before --child, which takes the remaining arguments
+        output = run_child(Path(__file__), [*child_args, '--child', *case])
+        if 'error' in output:
+            print(f'{name:<40} failed: {output["error"]}')
+            results[name] = output
+            continue
+        for stage, stat in output.items():
+            results[f'{name}.{stage}'] = stat
+            value = f'{stat["median_ms"]:9.2f}ms median {stat["p95_ms"]:9.2f}ms p95' if 'median_ms' in stat else f'{stat["total_ms"]:9.1f}ms total'
+            fps = f'  {stat["fps"]:7.1f} fps' if 'fps' in stat else ''
+            print(f'{name + "." + stage:<40} {value}{fps}')
+    path = write_results('pipeline', results, args.json)
+    print(f'Results written to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Cold-start benchmark: import time and time to first frame of each built-in model.
+
+Every measurement runs in a fresh interpreter, as a spawned render job would.
+Run from the repository root (models are loaded from `data/models`):
+
+    PYOPENGL_PLATFORM=egl python benchmarks/startup.py --repeat 3
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from common import run_child, write_results
+
+DEFAULT_MODELS = ['mediapipe', 'fuze', 'arkit', 'flame', 'pointcloud', 'points']
+
+
+def child(model:str):
+    """Measure one cold start, print the timings as JSON"""
+    timings = {}
+    t = time.perf_counter()
+    import PyFaceRenderer.animation
+    timings['import_animation'] = time.perf_counter() - t
+    t = time.perf_counter()
+    from PyFaceRenderer import OffscreenFaceRenderer
+    timings['import_offscreen'] = time.perf_counter() - t
+    t = time.perf_counter()
+    renderer = OffscreenFaceRenderer(model)
+    timings['init'] = time.perf_counter() - t
+    t = time.perf_counter()
+    renderer.render_frame()
+    timings['first_frame'] = time.perf_counter() - t
+    timings['total'] = sum(timings.values())
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('models', nargs='*', default=DEFAULT_MODELS)
+    parser.add_argument('--repeat', type=int, default=3, help='cold starts per model, the fastest is kept')
+    parser.add_argument('--json', type=str, default=None, help='output file, default ~/.cache/PyFaceRenderer/benchmarks/startup-<revision>.json')
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        return child(args.child)
+
+    results = {}
+    columns = ['import_animation', 'import_offscreen', 'init', 'first_frame', 'total']
+    print(f'{"model":<12}' + ''.join(f'{c:>18}' for c in columns))
+    for model in args.models:
+        runs = [run_child(Path(__file__), ['--child', model]) for _ in range(args.repeat)]
+        runs = [r for r in runs if 'error' not in r] or runs[:1]
+        best = min(runs, key=lambda r: r.get('total', 0.0))
+        results[model] = best
+        if 'error' in best:
+            print(f'{model:<12}  failed: {best["error"]}')
+        else:
+            print(f'{model:<12}' + ''.join(f'{best[c]*1000:>16.1f}ms' for c in columns))
+    path = write_results('startup', results, args.json)
+    print(f'Results written to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -11,4 +11,4 @@ fr.show_face_renderer(show_control=True)
 
 dpg.setup_dearpygui()
 dpg.show_viewport()
-dpg.start_dearpygui()   
\ No newline at end of file
+fr.start_dearpygui()   
\ No newline at end of file
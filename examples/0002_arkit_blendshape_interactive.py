@@ -13,4 +13,4 @@ fr._render()
 
 dpg.setup_dearpygui()
 dpg.show_viewport()
-dpg.start_dearpygui()
\ No newline at end of file
+fr.start_dearpygui()
\ No newline at end of file
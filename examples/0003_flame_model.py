@@ -17,4 +17,4 @@ fr._render()
 
 dpg.setup_dearpygui()
 dpg.show_viewport()
-dpg.start_dearpygui()
\ No newline at end of file
+fr.start_dearpygui()
\ No newline at end of file
@@ -0,0 +1,20 @@
+import dearpygui.dearpygui as dpg
+from PyFaceRenderer import FaceRenderer
+from PyFaceRenderer.live import BlendshapeStream
+import logging as log
+log.basicConfig(level='INFO')
+dpg.create_context()
+dpg.configure_app(docking=True, docking_space=True, )
+dpg.create_viewport(title=f'PyFaceRenderer Live Sample', width=700, height=640, always_on_top=True, )
+
+fr = FaceRenderer('arkit', )
+fr.show_face_renderer(show_control=True)
+# coefficient packets on udp://127.0.0.1:9870, e.g. from
+#   python -m PyFaceRenderer.live clip.anim --loop
+stream = BlendshapeStream(fr.blendshape_model.blendshape_names[:fr.blendshape_model.n_blendshapes], protocol='udp').start()
+fr.attach_stream(stream)
+
+dpg.setup_dearpygui()
+dpg.show_viewport()
+fr.start_dearpygui()
+stream.close()
@@ -0,0 +1,17 @@
+import sys
+import logging as log
+from PyFaceRenderer import OffscreenFaceRenderer
+from PyFaceRenderer.encoder import probe_video
+from PyFaceRenderer.landmarks import MediapipeLandmarker
+
+# Renders the mediapipe face mesh of every frame of a video over the frame.
+# Landmarks are cached (see PYFACERENDERER_CACHE), so a second run skips the inference.
+log.basicConfig(level='INFO')
+video = sys.argv[1] if len(sys.argv) > 1 else 'data/face.mp4'
+width, height, fps = probe_video(video)
+scale = 640 / max(width, height)
+
+renderer = OffscreenFaceRenderer('mediapipe', height=round(height * scale) // 2 * 2, width=round(width * scale) // 2 * 2)
+output = renderer.render_landmark_video(video, 'output/mediapipe_video.mp4', landmark_fn=MediapipeLandmarker(), n_workers=4)
+print(output)
+print(renderer.profiler.summary())
@@ -7,5 +7,6 @@ setup(name='PyFaceRenderer',
       author_email='tobyclh@gmail.com',
       license='Copyright',
       packages=find_packages(),
+      package_data={'PyFaceRenderer': ['shaders/*']},
       zip_safe=False,
       include_package_data=False)
@@ -0,0 +1,34 @@
+import os
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT) # built-in models load from data/ relative to the repository
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl') # headless, before anything imports OpenGL
+os.environ.setdefault('PYFACERENDERER_CACHE', 'off') # tests never write to the user's asset cache
+
+# GUI smoke scripts, run by hand: they open windows or render at import
+collect_ignore = ['test_3d_viewers.py', 'test_dearpygui_drag.py', 'test_drag_floatx.py', 'test_item_clicked.py', 'test_offscreen.py']
+
+
+def close_renderer(renderer):
+    """Free the GL context of a renderer on the thread that owns it.
+
+    pyrender's EGL contexts share one display that deleting any of them terminates,
+    so a test module keeps its renderers alive until it is done with all of them.
+    """
+    worker = getattr(renderer, '_render_worker', None)
+    renderer.run_gl(renderer._renderer.delete)
+    if worker is not None:
+        worker.stop()
+
+
+@pytest.fixture(scope='module')
+def fuze():
+    """Small offscreen renderer of the fuze bottle, which is visible from the default camera"""
+    from PyFaceRenderer.offscreen import OffscreenFaceRenderer
+    renderer = OffscreenFaceRenderer('fuze', height=96, width=72)
+    yield renderer
+    close_renderer(renderer)
@@ -0,0 +1,91 @@
+import pickle
+import numpy as np
+import pytest
+from PyFaceRenderer.animation import ColumnarAnimation, PickleAnimation, convert_pickle_animation, load_animation, save_animation
+
+NAMES = ['jawOpen', 'eyeBlinkLeft', 'mouthSmile']
+
+
+@pytest.fixture
+def animation_file(tmp_path):
+    rng = np.random.default_rng(0)
+    data = []
+    for i in range(20):
+        names = NAMES if i == 0 else list(rng.choice(NAMES, 2, replace=False)) # later frames omit some names
+        data.append({'blendshapes': {name: float(rng.random()) for name in names},
+                     'vertex': rng.standard_normal((7, 3)).astype(np.float32)})
+    filename = tmp_path / 'clip.pkl'
+    with open(filename, 'wb') as f:
+        pickle.dump({'data': data, 'metadata': {'fps': 24, 'audio': 'clip.wav'}}, f)
+    return filename
+
+
+def test_columnar_matches_pickle(animation_file):
+    animation_dir = convert_pickle_animation(animation_file)
+    assert animation_dir == animation_file.with_suffix('.anim')
+    legacy, columnar = load_animation(animation_file), load_animation(animation_dir)
+    assert isinstance(legacy, PickleAnimation) and isinstance(columnar, ColumnarAnimation)
+    assert len(columnar) == len(legacy) == 20
+    assert columnar.fps == legacy.fps == 24
+    assert columnar.audio == legacy.audio == 'clip.wav'
+    for i in [0, 7, 19]:
+        np.testing.assert_array_equal(columnar[i]['vertex'], legacy[i]['vertex'])
+        assert set(columnar[i]['blendshapes']) == set(NAMES) # missing values carried over
+
+
+def test_columnar_frames_carry_missing_values(animation_file):
+    legacy = load_animation(animation_file)
+    columnar = ColumnarAnimation(convert_pickle_animation(animation_file), window=3) # several read windows
+    frames = list(columnar.frames(2, 11))
+    assert len(frames) == 9
+    coe = {}
+    for i, frame in enumerate(legacy.frames(0, 11)):
+        coe.update(frame['blendshapes'])
+        if i >= 2:
+            assert frames[i - 2]['blendshapes'] == pytest.approx(coe)
+            np.testing.assert_array_equal(frames[i - 2]['vertex'], frame['vertex'])
+
+
+def test_columnar_is_memory_mapped(tmp_path):
+    vertex = np.random.default_rng(0).standard_normal((10, 5, 3)).astype(np.float32)
+    animation = load_animation(save_animation(tmp_path / 'clip.anim', vertex=vertex, fps=60))
+    assert isinstance(animation.vertex, np.memmap)
+    assert animation.fps == 60 and animation.audio is None
+    np.testing.assert_array_equal(np.stack([frame['vertex'] for frame in animation.frames()]), vertex)
+    assert 'blendshapes' not in animation[0]
+
+
+def test_save_animation_checks_names(tmp_path):
+    with pytest.raises(ValueError):
+        save_animation(tmp_path / 'empty.anim')
+    with pytest.raises(ValueError):
+        save_animation(tmp_path / 'clip.anim', blendshapes=np.zeros((4, 3)), blendshape_names=NAMES[:2])
+
+
+def test_blendshape_track_matches_frame_by_frame(animation_file):
+    legacy = load_animation(animation_file)
+    columnar = load_animation(convert_pickle_animation(animation_file))
+    names = NAMES[::-1] + ['unknown'] # model order differs from the animation
+    coe = dict.fromkeys(names, 0.0)
+    expected = []
+    for frame in legacy.frames():
+        coe.update({name: value for name, value in frame['blendshapes'].items() if name in coe})
+        expected.append([coe[name] for name in names])
+    np.testing.assert_allclose(legacy.blendshape_track(names), expected)
+    np.testing.assert_array_equal(columnar.blendshape_track(names), legacy.blendshape_track(names))
+    assert legacy.blendshape_track(names).dtype == np.float32
+
+
+def test_vertex_frames(animation_file):
+    legacy = load_animation(animation_file)
+    columnar = ColumnarAnimation(convert_pickle_animation(animation_file), window=4)
+    frames = list(columnar.vertex_frames(3, 13))
+    assert len(frames) == 10
+    for i, (expected, vertex) in enumerate(zip(legacy.vertex_frames(3, 13), frames), start=3):
+        np.testing.assert_array_equal(vertex, legacy[i]['vertex'])
+        np.testing.assert_array_equal(vertex, expected)
+
+
+def test_track_without_blendshapes(tmp_path):
+    animation = load_animation(save_animation(tmp_path / 'clip.anim', vertex=np.zeros((3, 2, 3))))
+    assert animation.blendshape_track(NAMES) is None
@@ -0,0 +1,83 @@
+import os
+import shutil
+import numpy as np
+import pyrender
+import pytest
+import trimesh
+from pathlib import Path
+from PyFaceRenderer.asset_cache import cache_dir, cached_arrays, load_mesh, mesh_trimesh
+from conftest import ROOT
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYFACERENDERER_CACHE', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+def _assert_same_mesh(mesh, reference):
+    primitive, expected = mesh.primitives[0], reference.primitives[0]
+    assert primitive.mode == expected.mode
+    for key in ['positions', 'normals', 'indices', 'texcoord_0', 'texcoord_1', 'color_0']:
+        a, b = getattr(primitive, key), getattr(expected, key)
+        assert (a is None) == (b is None), key
+        if a is not None:
+            np.testing.assert_array_equal(a, b, err_msg=key)
+    material, reference_material = primitive.material, expected.material
+    for key in ['alphaMode', 'metallicFactor', 'roughnessFactor', 'doubleSided', 'smooth', 'wireframe']:
+        assert getattr(material, key) == getattr(reference_material, key), key
+    np.testing.assert_array_equal(material.baseColorFactor, reference_material.baseColorFactor)
+    texture, reference_texture = material.baseColorTexture, reference_material.baseColorTexture
+    assert (texture is None) == (reference_texture is None)
+    if texture is not None:
+        np.testing.assert_array_equal(texture.source, reference_texture.source)
+        assert texture.source_channels == reference_texture.source_channels
+
+
+@pytest.mark.parametrize('name', ['face_mesh', 'fuze'])
+def test_round_trip(cache, name):
+    path = ROOT / 'data' / 'models' / f'{name}.obj'
+    reference = pyrender.Mesh.from_trimesh(trimesh.load(str(path)))
+    built = load_mesh(path) # builds and caches
+    assert len(list(cache.glob(f'{name}-*'))) == 1
+    cached = load_mesh(path)
+    _assert_same_mesh(built, reference)
+    _assert_same_mesh(cached, reference)
+    assert cached.primitives[0].positions.flags.writeable # vertex data can be edited in place
+    np.testing.assert_array_equal(mesh_trimesh(cached).faces, mesh_trimesh(built).faces)
+
+
+def test_edited_source_misses_the_cache(cache, tmp_path):
+    path = tmp_path / 'face_mesh.obj'
+    shutil.copy(ROOT / 'data' / 'models' / 'face_mesh.obj', path)
+    load_mesh(path)
+    with open(path, 'a') as f:
+        f.write('\n')
+    os.utime(path, ns=(0, 0))
+    load_mesh(path)
+    assert len(list(cache.glob('face_mesh-*'))) == 2
+
+
+def test_cached_arrays(cache):
+    calls = []
+    def build():
+        calls.append(1)
+        return {'a': np.arange(5)}, {'answer': 42}
+    source = ROOT / 'data' / 'models' / 'fuze.obj'
+    arrays, meta = cached_arrays('test', [source], build)
+    arrays, meta = cached_arrays('test', [source], build)
+    assert len(calls) == 1
+    assert isinstance(arrays['a'], np.memmap) and meta == {'answer': 42}
+    np.testing.assert_array_equal(arrays['a'], np.arange(5))
+    entry, = cache.glob('test-*')
+    (entry / 'a.npy').write_bytes(b'corrupt')
+    arrays, _ = cached_arrays('test', [source], build) # rebuilt
+    assert len(calls) == 2
+    np.testing.assert_array_equal(arrays['a'], np.arange(5))
+
+
+def test_cache_off(monkeypatch):
+    monkeypatch.setenv('PYFACERENDERER_CACHE', 'off')
+    assert cache_dir() is None
+    monkeypatch.delenv('PYFACERENDERER_CACHE')
+    assert cache_dir() == Path.home() / '.cache' / 'PyFaceRenderer'
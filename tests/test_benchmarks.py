@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+from conftest import ROOT
+
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+import common
+
+
+def test_results_dir_outside_the_repository(tmp_path):
+    assert ROOT not in common.RESULTS_DIR.resolve().parents
+    code = 'import common; print(common.RESULTS_DIR)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT / 'benchmarks', stdout=subprocess.PIPE, text=True, check=True,
+                            env=dict(os.environ, PYFACERENDERER_BENCHMARKS=str(tmp_path)))
+    assert result.stdout.strip() == str(tmp_path)
+
+
+def test_measure():
+    calls = []
+    stats = common.measure(lambda: calls.append(1), repeat=5, warmup=2)
+    assert len(calls) == 7 and stats['n'] == 5
+    assert 0 <= stats['min_ms'] <= stats['median_ms'] <= stats['p95_ms']
+
+
+def _compare(tmp_path, old:float, new:float) -> subprocess.CompletedProcess:
+    files = []
+    for name, value in [('old', old), ('new', new)]:
+        files.append(common.write_results('pipeline', {'render': {'median_ms': value}, name: {'total_ms': 1.0}},
+                                          tmp_path / f'{name}.json'))
+    assert json.loads(files[0].read_text())['environment']['revision'] == common.git_revision()
+    return subprocess.run([sys.executable, str(ROOT / 'benchmarks' / 'compare.py'), *map(str, files)],
+                          stdout=subprocess.PIPE, text=True)
+
+
+def test_compare_flags_regressions(tmp_path):
+    result = _compare(tmp_path, 10.0, 12.0)
+    assert result.returncode == 1 and 'REGRESSION' in result.stdout
+    assert 'only in one run' in result.stdout
+    result = _compare(tmp_path, 10.0, 8.0)
+    assert result.returncode == 0 and 'improved' in result.stdout
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from PyFaceRenderer.asset_cache import load_mesh
+from PyFaceRenderer.blendshape_model import BlendshapeModel
+from conftest import ROOT
+
+FACE_MESH = ROOT / 'data' / 'models' / 'face_mesh.obj'
+
+
+@pytest.fixture(scope='module')
+def model():
+    n_vertices = len(load_mesh(FACE_MESH).primitives[0].positions)
+    rng = np.random.default_rng(0)
+    blendshapes = np.zeros((8, n_vertices, 3), dtype=np.float32)
+    for k in range(8): # localized deltas, as in real blendshape sets
+        moving = rng.choice(n_vertices, n_vertices // 10, replace=False)
+        blendshapes[k, moving] = 0.01 * rng.standard_normal((len(moving), 3))
+    return BlendshapeModel(FACE_MESH, blendshapes, [f'shape{k}' for k in range(8)])
+
+
+def test_dense_matches_sparse(model):
+    coes = np.random.default_rng(1).random((5, model.n_blendshapes)).astype(np.float32)
+    dense = model.get_meshes(coes)
+    sparse = model.get_meshes(coes, sparse=True)
+    assert dense.shape == (5, *model.neutral_position.shape) and dense.dtype == np.float32
+    np.testing.assert_allclose(sparse, dense, atol=1e-6)
+    reference = model.neutral_position + np.einsum('tk,kvc->tvc', coes, model.blendshapes)
+    np.testing.assert_allclose(dense, reference, atol=1e-6)
+
+
+def test_get_meshes_out(model):
+    coes = np.random.default_rng(2).random((3, model.n_blendshapes))
+    out = np.empty((3, *model.neutral_position.shape), dtype=np.float32)
+    assert model.get_meshes(coes, sparse=True, out=out) is out
+    np.testing.assert_allclose(out, model.get_meshes(coes), atol=1e-6)
+    np.testing.assert_allclose(model.get_mesh(coes[1]), out[1], atol=1e-6)
+
+
+def test_bake_animation(model, tmp_path):
+    from PyFaceRenderer.animation import load_animation
+    coes = np.random.default_rng(3).random((10, model.n_blendshapes))
+    animation = load_animation(model.bake_animation(coes, tmp_path / 'clip.anim', fps=50, sparse=True, chunk=4))
+    assert len(animation) == 10 and animation.fps == 50
+    np.testing.assert_allclose(np.stack(list(animation.vertex_frames())), model.get_meshes(coes), atol=1e-6)
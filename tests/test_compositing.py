@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from PyFaceRenderer.compositing import Compositor
+
+H, W = 6, 5
+
+
+def _frames(n=3, seed=0):
+    rng = np.random.default_rng(seed)
+    rgba = rng.integers(0, 256, size=(n, H, W, 4), dtype=np.uint8)
+    rgba[:, 0, 0, 3] = 0
+    rgba[:, 0, 1, 3] = 255
+    depth = np.where(rng.random((n, H, W)) < 0.5, 0.0, rng.uniform(0.1, 2.0, (n, H, W))).astype(np.float32)
+    backgrounds = rng.integers(0, 256, size=(n, H, W, 3), dtype=np.uint8)
+    return rgba, depth, backgrounds
+
+
+def _reference(color, weight, background):
+    """Blend with an integer weight in [0, 255], rounded to nearest"""
+    weight = weight.astype(np.float64)[..., None]
+    return np.floor((color[..., :3] * weight + background * (255 - weight) + 127) / 255).astype(np.uint8)
+
+
+def test_depth_mask_over_background():
+    rgba, depth, backgrounds = _frames(1)
+    compositor = Compositor(H, W, backgrounds[0])
+    out = compositor.composite(rgba[0, ..., :3], depth[0])
+    covered = depth[0] > 0.01
+    np.testing.assert_array_equal(out[covered], rgba[0, ..., :3][covered])
+    np.testing.assert_array_equal(out[~covered], backgrounds[0][~covered])
+
+
+def test_depth_mask_without_background_is_alpha():
+    rgba, depth, _ = _frames(1)
+    out = Compositor(H, W).composite(rgba[0, ..., :3], depth[0], alpha=0.5)
+    np.testing.assert_array_equal(out[..., :3], rgba[0, ..., :3])
+    np.testing.assert_array_equal(out[..., 3], np.where(depth[0] > 0.01, 128, 0)) # round(255*0.5)
+
+
+@pytest.mark.parametrize('alpha', [1.0, 0.4])
+def test_coverage_blend(alpha):
+    rgba, _, backgrounds = _frames(1)
+    out = Compositor(H, W, backgrounds[0]).composite(rgba[0], alpha=alpha)
+    weight = (rgba[0, ..., 3].astype(np.uint32) * int(round(255*alpha)) + 127) // 255 if alpha < 1.0 else rgba[0, ..., 3]
+    np.testing.assert_array_equal(out, _reference(rgba[0], weight, backgrounds[0]))
+    assert out[0, 0].tolist() == backgrounds[0, 0, 0].tolist()
+
+
+def test_coverage_without_background_keeps_rgba():
+    rgba, _, _ = _frames(1)
+    np.testing.assert_array_equal(Compositor(H, W).composite(rgba[0]), rgba[0])
+
+
+def test_background_is_resized():
+    compositor = Compositor(H, W, np.zeros((2*H, 3*W, 4), dtype=np.uint8))
+    assert compositor.background.shape == (H, W, 3)
+
+
+@pytest.mark.parametrize('alpha', [1.0, 0.3])
+@pytest.mark.parametrize('with_depth', [False, True])
+@pytest.mark.parametrize('with_background', [False, True])
+def test_batch_matches_single_frames(alpha, with_depth, with_background):
+    rgba, depth, backgrounds = _frames(4)
+    compositor = Compositor(H, W, backgrounds[0] if with_background else None)
+    single = np.stack([compositor.composite(rgba[i], depth[i] if with_depth else None, alpha).copy() for i in range(4)])
+    batch = compositor.composite_batch(rgba, depth if with_depth else None, alpha)
+    np.testing.assert_array_equal(batch, single)
+
+
+def test_batch_per_frame_backgrounds():
+    rgba, _, backgrounds = _frames(3)
+    out = np.empty((3, H, W, 3), dtype=np.uint8)
+    result = Compositor(H, W).composite_batch(rgba, out=out, backgrounds=backgrounds)
+    assert result is out
+    for i in range(3):
+        np.testing.assert_array_equal(out[i], Compositor(H, W, backgrounds[i]).composite(rgba[i]))
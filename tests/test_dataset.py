@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from PyFaceRenderer.dataset import DATASET_FILE, dataset_config, generate_dataset, read_shard, sample_labels, shard_ranges
+from PyFaceRenderer.models import MODELS
+from conftest import ROOT
+
+
+def test_shard_ranges():
+    assert shard_ranges(10, 4) == [range(0, 4), range(4, 8), range(8, 10)]
+    assert shard_ranges(8, 4) == [range(0, 4), range(4, 8)]
+    assert shard_ranges(0, 4) == []
+
+
+def test_labels_do_not_depend_on_sharding():
+    config = dataset_config({'seed': 3, 'backgrounds': ['a.png', 'b.png']})
+    whole = sample_labels(config, range(0, 50), 12)
+    for shard_size in [1, 7, 16]:
+        parts = [sample_labels(config, indices, 12) for indices in shard_ranges(50, shard_size)]
+        for key, value in whole.items():
+            np.testing.assert_array_equal(np.concatenate([part[key] for part in parts]), value)
+    assert set(np.unique(whole['background'])) <= {0, 1}
+
+
+def test_labels_depend_on_seed():
+    a = sample_labels(dataset_config({'seed': 0}), range(4), 12)
+    b = sample_labels(dataset_config({'seed': 1}), range(4), 12)
+    assert not np.array_equal(a['coefficients'], b['coefficients'])
+    assert (a['background'] == -1).all()
+
+
+def test_dataset_config():
+    config = dataset_config({'n_samples': 10, 'camera': {'yaw': [0.0, 0.0]}})
+    assert config['n_samples'] == 10
+    assert config['camera']['yaw'] == [0.0, 0.0] and config['camera']['distance'] == [0.8, 1.2]
+    with pytest.raises(ValueError):
+        dataset_config({'n_sample': 10})
+
+
+@pytest.fixture
+def blendshapes(monkeypatch):
+    """'test_blendshapes' model: the face mesh with a few random blendshapes, the ARKit data is not in the repository"""
+    from PyFaceRenderer.asset_cache import load_mesh
+    from PyFaceRenderer.blendshape_model import BlendshapeModel
+    face_mesh = ROOT / 'data' / 'models' / 'face_mesh.obj'
+    n_vertices = len(load_mesh(face_mesh).primitives[0].positions)
+    deltas = 0.01 * np.random.default_rng(0).standard_normal((4, n_vertices, 3)).astype(np.float32)
+    def load(renderer, **options):
+        renderer.blendshape_model = BlendshapeModel(face_mesh, deltas, [f'shape{k}' for k in range(4)])
+        renderer.trimesh = renderer.blendshape_model.trimesh
+        renderer.mesh = renderer.blendshape_model.neutral_mesh
+        renderer.mesh_type = 'blendshape'
+    monkeypatch.setitem(MODELS, 'test_blendshapes', load)
+    return 'test_blendshapes'
+
+
+def test_generate_dataset(tmp_path, blendshapes):
+    config = {'model': blendshapes, 'n_samples': 5, 'shard_size': 2, 'height': 32, 'width': 32, 'depth': True, 'seed': 4}
+    shards = generate_dataset(tmp_path, config, n_workers=1)
+    assert [shard.name for shard in shards] == ['shard-000000.npz', 'shard-000001.npz', 'shard-000002.npz']
+    assert (tmp_path / DATASET_FILE).exists()
+    samples = [read_shard(shard) for shard in shards]
+    assert [len(sample['images']) for sample in samples] == [2, 2, 1]
+    last = samples[-1]
+    assert last['images'].shape == (1, 32, 32, 4) and last['depth'].shape == (1, 32, 32)
+    assert last['images'][..., 3].max() == 255 and (last['depth'] > 0).any() # the face is in view
+    labels = sample_labels(dataset_config(config), range(4, 5), last['coefficients'].shape[1])
+    np.testing.assert_array_equal(last['coefficients'], labels['coefficients'])
+
+    shards[1].unlink()
+    mtime = shards[0].stat().st_mtime_ns
+    generate_dataset(tmp_path, config, n_workers=1) # resumes with the missing shard
+    assert shards[1].exists() and shards[0].stat().st_mtime_ns == mtime
+    np.testing.assert_array_equal(read_shard(shards[1])['coefficients'], samples[1]['coefficients'])
+    with pytest.raises(ValueError):
+        generate_dataset(tmp_path, {**config, 'seed': 5}, n_workers=1)
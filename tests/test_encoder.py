@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from PyFaceRenderer.encoder import FFmpegReader, FFmpegWriter, concat_videos, probe_video
+
+H, W = 48, 64
+LOSSLESS = ('-c:v', 'ffv1', '-pix_fmt', 'rgb24')
+
+
+def _frames(n=6, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(n, H, W, 3), dtype=np.uint8)
+
+
+def _write(filename, frames, fps=25, codec_args=LOSSLESS):
+    with FFmpegWriter(filename, W, H, fps, codec_args=codec_args) as writer:
+        for frame in frames:
+            writer.write(frame)
+    return filename
+
+
+def test_lossless_round_trip(tmp_path):
+    frames = _frames()
+    filename = _write(tmp_path / 'clip.mkv', frames)
+    assert probe_video(filename) == (W, H, 25.0)
+    with FFmpegReader(filename) as reader:
+        decoded = np.stack(list(reader))
+    np.testing.assert_array_equal(decoded, frames)
+
+
+def test_writer_copies_reused_buffers(tmp_path):
+    frames = _frames()
+    buffer = np.empty((H, W, 4), dtype=np.uint8) # RGBA, as a renderer reusing its readback buffer
+    with FFmpegWriter(tmp_path / 'clip.mkv', W, H, 25, codec_args=LOSSLESS) as writer:
+        for frame in frames:
+            buffer[..., :3] = frame
+            writer.write(buffer)
+    with FFmpegReader(tmp_path / 'clip.mkv') as reader:
+        np.testing.assert_array_equal(np.stack(list(reader)), frames)
+
+
+def test_default_codec(tmp_path):
+    frames = np.repeat(np.linspace(0, 255, W, dtype=np.uint8)[None, None, :, None], 3, axis=-1)
+    frames = np.broadcast_to(frames, (4, H, W, 3))
+    _write(tmp_path / 'clip.mp4', frames, codec_args=('-c:v', 'libx264', '-pix_fmt', 'yuv420p'))
+    with FFmpegReader(tmp_path / 'clip.mp4', width=W // 2, height=H // 2) as reader:
+        decoded = np.stack(list(reader))
+    assert decoded.shape == (4, H // 2, W // 2, 3)
+    assert np.abs(decoded.astype(int) - frames[:, ::2, ::2].astype(int)).mean() < 4
+
+
+def test_concat_videos(tmp_path):
+    frames = _frames(8)
+    segments = [_write(tmp_path / f'{i}.mkv', frames[4*i:4*i+4]) for i in range(2)]
+    concat_videos(segments, tmp_path / 'clip.mkv')
+    with FFmpegReader(tmp_path / 'clip.mkv') as reader:
+        np.testing.assert_array_equal(np.stack(list(reader)), frames)
+
+
+def test_reader_close_early(tmp_path):
+    filename = _write(tmp_path / 'clip.mkv', _frames(20))
+    with FFmpegReader(filename, queue_size=2) as reader:
+        next(iter(reader))
+
+
+def test_writer_errors(tmp_path):
+    with FFmpegWriter(tmp_path / 'clip.mkv', W, H, 25, codec_args=LOSSLESS) as writer:
+        with pytest.raises(ValueError):
+            writer.write(np.zeros((H + 1, W, 3), dtype=np.uint8))
+    writer = FFmpegWriter(tmp_path / 'missing' / 'clip.mkv', W, H, 25, codec_args=LOSSLESS)
+    writer.write(_frames(1)[0])
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_export_streams_every_frame(fuze, tmp_path):
+    from PyFaceRenderer.animation import save_animation
+    positions = np.array(fuze.mesh.primitives[0].positions)
+    vertex = positions + np.linspace(-0.02, 0.02, 5)[:, None, None] * [1.0, 0.0, 0.0]
+    animation = save_animation(tmp_path / 'clip.anim', vertex=vertex, fps=10)
+    try:
+        output = fuze.render_animation_file(animation, tmp_path / 'clip.mp4')
+    finally:
+        fuze.update_mesh(positions)
+    assert probe_video(output) == (72, 96, 10.0)
+    with FFmpegReader(output) as reader:
+        frames = np.stack(list(reader))
+    assert len(frames) == 5
+    assert not np.array_equal(frames[0], frames[-1]) # the mesh moved
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from PyFaceRenderer.encoder import FFmpegWriter
+from PyFaceRenderer.landmarks import (N_LANDMARKS, MediapipeLandmarker, face_landmarks, landmarks_to_vertices,
+                                      video_landmark_frames, video_landmarks)
+
+H, W = 32, 48
+
+
+@pytest.fixture
+def video(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYFACERENDERER_CACHE', str(tmp_path / 'cache'))
+    filename = tmp_path / 'clip.mkv'
+    with FFmpegWriter(filename, W, H, 25, codec_args=('-c:v', 'ffv1', '-pix_fmt', 'rgb24')) as writer:
+        for i in range(5):
+            writer.write(np.full((H, W, 3), 40 * i, dtype=np.uint8))
+    return filename
+
+
+class FrameLandmarker:
+    """Landmarks encoding the frame brightness, None on black frames"""
+
+    def __init__(self, offset:float=0.0, cache_name:str=None) -> None:
+        self.offset = offset
+        self.calls = 0
+        if cache_name is not None:
+            self.cache_name = cache_name
+
+    def __call__(self, frame):
+        self.calls += 1
+        if frame.max() == 0:
+            return None
+        return np.full((N_LANDMARKS, 3), frame[0, 0, 0] / 255 + self.offset, dtype=np.float32)
+
+
+def _cached(video):
+    return list((video.parent / 'cache' / 'landmarks').glob('*.npy'))
+
+
+def test_face_landmarks():
+    landmark_list = SimpleNamespace(landmark=[SimpleNamespace(x=0.1 * i, y=0.2, z=-0.1) for i in range(3)])
+    np.testing.assert_allclose(face_landmarks(landmark_list), [[0.0, 0.2, -0.1], [0.1, 0.2, -0.1], [0.2, 0.2, -0.1]])
+
+
+def test_landmarks_to_vertices():
+    vertices = landmarks_to_vertices(np.array([[0.5, 0.5, 0.0], [1.0, 0.0, 0.1]]), aspect=2.0)
+    np.testing.assert_allclose(vertices, [[0.0, 0.0, -1.0], [1.0, -0.5, -0.8]])
+
+
+def test_mediapipe_cache_name():
+    assert MediapipeLandmarker().cache_name == 'facemesh'
+    assert MediapipeLandmarker(0.3).cache_name == 'facemesh-0.3'
+
+
+def test_landmarks_of_every_frame(video):
+    landmarks = video_landmarks(video, landmark_fn=FrameLandmarker())
+    assert landmarks.shape == (5, N_LANDMARKS, 3)
+    assert np.isnan(landmarks[0]).all() # no face on the black first frame
+    np.testing.assert_allclose(landmarks[1:, 0, 0], np.arange(1, 5) * 40 / 255, atol=1e-6)
+
+
+def test_custom_landmarks_are_not_cached(video):
+    video_landmarks(video, landmark_fn=FrameLandmarker())
+    assert _cached(video) == []
+    other = FrameLandmarker(offset=1.0)
+    np.testing.assert_allclose(video_landmarks(video, landmark_fn=other)[1:, 0, 0], np.arange(1, 5) * 40 / 255 + 1.0, atol=1e-6)
+    assert other.calls == 5
+
+
+def test_landmarks_are_cached_by_name(video):
+    first = FrameLandmarker(cache_name='frames')
+    landmarks = video_landmarks(video, landmark_fn=first)
+    assert len(_cached(video)) == 1 and first.calls == 5
+    again = FrameLandmarker(cache_name='frames')
+    frames = list(video_landmark_frames(video, landmark_fn=again))
+    assert again.calls == 0 and len(frames) == 5
+    np.testing.assert_array_equal(np.stack([l for _, l in frames]), landmarks)
+    other = FrameLandmarker(offset=1.0, cache_name='frames')
+    video_landmarks(video, landmark_fn=other, cache_name='shifted') # an explicit name wins
+    assert other.calls == 5 and len(_cached(video)) == 2
+    video_landmarks(video, landmark_fn=other, cache_name='') # disabled
+    assert other.calls == 10
@@ -0,0 +1,114 @@
+import json
+import socket
+import time
+import numpy as np
+import pytest
+from PyFaceRenderer.live import BlendshapeStream, CoefficientBuffer, PACKED_HEADER, TCP_LENGTH, decode_packet, encode_packet
+
+NAMES = ['jawOpen', 'eyeBlinkLeft', 'eyeBlinkRight']
+
+
+def test_buffer_interpolates_and_clamps():
+    buffer = CoefficientBuffer(2)
+    assert buffer.sample(0.0).tolist() == [0.0, 0.0]
+    buffer.push(1.0, [0.0, 1.0])
+    buffer.push(2.0, [1.0, 0.0])
+    np.testing.assert_allclose(buffer.sample(1.25), [0.25, 0.75])
+    np.testing.assert_allclose(buffer.sample(0.0), [0.0, 1.0])
+    np.testing.assert_allclose(buffer.sample(5.0), [1.0, 0.0])
+
+
+def test_buffer_drops_reordered_samples():
+    buffer = CoefficientBuffer(1)
+    assert buffer.push(2.0, [1.0])
+    assert not buffer.push(1.0, [5.0])
+    assert not buffer.push(2.0, [5.0])
+    assert len(buffer) == 1
+    assert buffer.latest()[1].tolist() == [1.0]
+
+
+def test_buffer_wraps_around():
+    buffer = CoefficientBuffer(1, capacity=4)
+    for t in range(10):
+        buffer.push(float(t), [float(t)])
+    assert len(buffer) == 4
+    np.testing.assert_allclose(buffer.sample(7.5), [7.5])
+    np.testing.assert_allclose(buffer.sample(0.0), [6.0]) # oldest kept sample
+    np.testing.assert_allclose(buffer.sample(20.0), [9.0])
+
+
+def test_packed_round_trip():
+    coefficients = np.array([0.1, 0.5, 1.0], dtype=np.float32)
+    timestamp, decoded = decode_packet(encode_packet(coefficients, 12.5))
+    assert timestamp == 12.5
+    np.testing.assert_array_equal(decoded, coefficients)
+    assert decode_packet(encode_packet(coefficients))[0] is None
+
+
+def test_json_round_trip():
+    timestamp, decoded = decode_packet(encode_packet([0.25, 0.5, 0.75], 3.0, NAMES))
+    assert timestamp == 3.0
+    assert decoded == dict(zip(NAMES, [0.25, 0.5, 0.75]))
+
+
+def _stream():
+    return BlendshapeStream(NAMES) # never started, packets are fed to `_receive` directly
+
+
+def test_receive_packets():
+    stream = _stream()
+    stream._receive(encode_packet([0.1, 0.2, 0.3], 100.0), 1000.0)
+    stream._receive(json.dumps({'timestamp': 101.0, 'blendshapes': {'jawOpen': 1.0, 'unknown': 4.0}}).encode(), 1001.5)
+    assert stream.n_packets == 2 and stream.n_dropped == 0
+    # sender clock mapped with the smallest offset (900), names missing from a packet keep their value
+    np.testing.assert_allclose(stream.sample(1001.0), [1.0, 0.2, 0.3])
+    np.testing.assert_allclose(stream.sample(1000.5), [0.55, 0.2, 0.3])
+
+
+@pytest.mark.parametrize('packet', [
+    b'',
+    b'not json',
+    b'\xff\xfe',
+    b'[1, 2, 3]',
+    json.dumps({'timestamp': 1.0}).encode(),
+    json.dumps({'blendshapes': {'jawOpen': 'open'}}).encode(),
+    json.dumps({'blendshapes': {'jawOpen': [1.0]}}).encode(),
+    json.dumps({'blendshapes': [[0.1, 0.2, 0.3]]}).encode(),
+    json.dumps({'blendshapes': [0.1, 0.2]}).encode(),
+    json.dumps({'timestamp': 'now', 'blendshapes': {'jawOpen': 1.0}}).encode(),
+    b'{"timestamp": NaN, "blendshapes": {"jawOpen": 1.0}}',
+    b'FRB1',
+    PACKED_HEADER.pack(b'FRB1', 1.0, 3) + b'\x00' * 4, # truncated
+    encode_packet([0.1, 0.2]), # wrong count
+])
+def test_malformed_packets_are_dropped(packet):
+    stream = _stream()
+    stream._receive(packet, 10.0)
+    assert stream.n_dropped == 1 and stream.n_packets == 0
+    stream._receive(encode_packet([0.1, 0.2, 0.3]), 11.0)
+    assert stream.n_packets == 1
+    np.testing.assert_allclose(stream.sample(11.0), [0.1, 0.2, 0.3])
+
+
+def test_unknown_protocol():
+    with pytest.raises(ValueError):
+        BlendshapeStream(NAMES, protocol='http')
+
+
+@pytest.mark.parametrize('protocol', ['udp', 'tcp'])
+def test_stream_over_a_socket(protocol):
+    with BlendshapeStream(NAMES, port=0, protocol=protocol) as stream:
+        address = stream._socket.getsockname()
+        packets = [encode_packet([0.1 * k, 0.2, 0.3], float(k)) for k in range(3)]
+        if protocol == 'udp':
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+                for packet in packets:
+                    sender.sendto(packet, address)
+        else:
+            with socket.create_connection(address) as sender: # one send holding several framed packets
+                sender.sendall(b''.join(TCP_LENGTH.pack(len(packet)) + packet for packet in packets))
+        deadline = time.time() + 5.0
+        while stream.n_packets < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert stream.n_packets == 3 and stream.n_dropped == 0
+        np.testing.assert_allclose(stream.sample(time.time() + 10.0), [0.2, 0.2, 0.3])
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import trimesh
+from PyFaceRenderer.mesh_sequence import MeshSequence, load_obj_vertices, read_obj_vertices
+from conftest import ROOT
+
+FACE_MESH = ROOT / 'data' / 'models' / 'face_mesh.obj'
+
+
+def test_read_obj_vertices_matches_trimesh():
+    vertices = read_obj_vertices(FACE_MESH)
+    assert vertices.dtype == np.float32 and vertices.shape == (468, 3)
+    np.testing.assert_allclose(vertices, trimesh.load(FACE_MESH, process=False).vertices, rtol=1e-6)
+    np.testing.assert_allclose(vertices, load_obj_vertices(FACE_MESH), rtol=1e-6)
+
+
+def test_vertex_colors_and_other_lines(tmp_path):
+    obj = tmp_path / 'colors.obj'
+    obj.write_text('# comment\nmtllib none.mtl\nv 0 0 0 1 0 0\nvn 0 0 1\nvt 0.5 0.5\nv 1 0 0 0 1 0\nv 0 1 0 0 0 1\nf 1 2 3\n')
+    np.testing.assert_array_equal(read_obj_vertices(obj), [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+    (tmp_path / 'empty.obj').write_text('f 1 2 3\n')
+    with pytest.raises(ValueError):
+        read_obj_vertices(tmp_path / 'empty.obj')
+
+
+def _sequence(tmp_path, n_frames=6):
+    mesh = trimesh.load(FACE_MESH, process=False)
+    mesh = trimesh.Trimesh(mesh.vertices, mesh.faces, process=False) # geometry only
+    frames = []
+    for i in range(n_frames):
+        mesh.vertices = np.asarray(mesh.vertices) + 0.01
+        frames.append(np.asarray(mesh.vertices, dtype=np.float32))
+        mesh.export(tmp_path / f'{i:03d}.obj')
+    return sorted(tmp_path.glob('*.obj')), np.stack(frames)
+
+
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_sequence_frames_in_order(tmp_path, use_processes):
+    files, frames = _sequence(tmp_path)
+    sequence = MeshSequence(files, n_workers=2, prefetch=2, use_processes=use_processes)
+    assert sequence.loader is read_obj_vertices
+    assert len(sequence) == 6
+    np.testing.assert_allclose(np.stack(list(sequence)), frames, rtol=1e-6)
+    np.testing.assert_allclose(np.stack(list(sequence.frames(2, 4))), frames[2:4], rtol=1e-6)
+    np.testing.assert_allclose(sequence[5], frames[5], rtol=1e-6)
+
+
+def test_sequence_checks_the_topology(tmp_path):
+    files, _ = _sequence(tmp_path, 2)
+    files[1].write_text('v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n')
+    with pytest.raises(ValueError):
+        list(MeshSequence(files))
+
+
+def test_falls_back_to_trimesh_when_it_reorders_vertices(tmp_path):
+    obj = tmp_path / 'duplicates.obj' # trimesh merges the duplicated vertex on load
+    obj.write_text('v 0 0 0\nv 1 0 0\nv 0 1 0\nv 0 0 0\nv 0 0 1\nf 1 2 3\nf 4 2 5\n')
+    sequence = MeshSequence([obj])
+    assert sequence.loader is load_obj_vertices
+    np.testing.assert_array_equal(sequence[0], load_obj_vertices(obj))
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import pytest
+from PyFaceRenderer.models import MODELS, available_models, load_model, register_model
+from conftest import ROOT, close_renderer
+
+
+def test_package_import_is_lazy():
+    code = ("import sys, PyFaceRenderer, PyFaceRenderer.animation; "
+            "assert not {'pyrender', 'dearpygui', 'OpenGL'} & set(m.split('.')[0] for m in sys.modules)")
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+
+def test_builtin_models_are_registered():
+    assert {'mediapipe', 'fuze', 'arkit', 'flame', 'pointcloud', 'points'} <= set(available_models())
+    with pytest.raises(NotImplementedError):
+        load_model(object(), 'no_such_model')
+
+
+def test_register_model():
+    from PyFaceRenderer import OffscreenFaceRenderer
+    from PyFaceRenderer.asset_cache import load_mesh
+    options = {}
+    @register_model('test_face')
+    def load_test_face(renderer, **kwargs):
+        options.update(kwargs)
+        renderer.mesh = load_mesh('data/models/face_mesh.obj')
+    try:
+        renderer = OffscreenFaceRenderer('test_face', height=32, width=32, n_points=7)
+        try:
+            assert len(renderer.mesh.primitives[0].positions) == 468
+            assert options == {'n_points': 7}
+        finally:
+            close_renderer(renderer)
+    finally:
+        del MODELS['test_face']
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from PyFaceRenderer.multiview import atlas_grid, intrinsics_cameras
+
+
+def _poses(renderer, n_views:int) -> np.ndarray:
+    """Views orbiting the default camera around the vertical axis"""
+    poses = []
+    for angle in np.linspace(-0.4, 0.4, n_views):
+        rotation = np.eye(4)
+        rotation[[0, 0, 2, 2], [0, 2, 0, 2]] = [np.cos(angle), np.sin(angle), -np.sin(angle), np.cos(angle)]
+        poses.append(rotation @ renderer.camera_pose)
+    return np.stack(poses)
+
+
+def test_atlas_grid():
+    assert atlas_grid(16) == (4, 4)
+    assert atlas_grid(5) == (2, 3)
+    assert atlas_grid(5, columns=2) == (3, 2)
+    assert atlas_grid(3, columns=8) == (1, 3)
+
+
+def test_intrinsics_cameras():
+    K = np.array([[100.0, 0, 36], [0, 110.0, 48], [0, 0, 1]])
+    cameras = intrinsics_cameras(K, 3, 0.05, 100.0)
+    assert len(cameras) == 3 and cameras[2].fy == 110.0 and cameras[0].cx == 36
+    with pytest.raises(ValueError):
+        intrinsics_cameras(np.stack([K] * 2), 3, 0.05, 100.0)
+
+
+@pytest.mark.parametrize('outputs', ['color', 'rgba', 'depth'])
+def test_views_match_single_renders(fuze, outputs):
+    poses = _poses(fuze, 3)
+    views = fuze.render_views(poses, outputs=outputs)
+    pose = fuze.camera_pose.copy()
+    try:
+        for view, view_pose in zip(views, poses):
+            fuze.camera_pose = view_pose
+            np.testing.assert_array_equal(view, fuze.render(outputs))
+    finally:
+        fuze.camera_pose = pose
+    assert not np.array_equal(views[0], views[2])
+
+
+@pytest.mark.parametrize('outputs', ['color', 'rgba', 'depth'])
+def test_atlas_tiles_match_views(fuze, outputs):
+    poses = _poses(fuze, 5)
+    views = fuze.render_views(poses, outputs=outputs)
+    atlas = fuze.render_views(poses, outputs=outputs, atlas=True, columns=3)
+    height, width = views.shape[1:3]
+    assert atlas.shape == (2 * height, 3 * width, *views.shape[3:])
+    for i, view in enumerate(views):
+        row, column = divmod(i, 3)
+        np.testing.assert_array_equal(atlas[row * height:(row + 1) * height, column * width:(column + 1) * width], view)
+    empty = atlas[height:, 2 * width:]
+    assert (empty == empty[0, 0]).all() and (outputs == 'color' or (empty[..., -1] == 0).all()) # background
+
+
+def test_views_into_out(fuze):
+    poses = _poses(fuze, 2)
+    out = np.empty((fuze._height, 2 * fuze._width, 3), dtype=np.uint8)
+    assert fuze.render_views(poses, atlas=True, out=out) is out
+    np.testing.assert_array_equal(out[:, :fuze._width], fuze.render_views(poses[:1])[0])
+    with pytest.raises(ValueError):
+        fuze.render_views(poses, outputs='color+depth')
+
+
+def test_intrinsics_views(fuze):
+    K = np.array([[60.0, 0, fuze._width / 2], [0, 60.0, fuze._height / 2], [0, 0, 1]])
+    narrow, wide = fuze.render_views([fuze.camera_pose] * 2, intrinsics=np.stack([K, K * [[0.5], [0.5], [1]]]), outputs='depth')
+    assert (narrow > 0).sum() > (wide > 0).sum() # a shorter focal length shrinks the mesh
@@ -0,0 +1,46 @@
+import numpy as np
+from PyFaceRenderer.asset_cache import load_mesh
+from PyFaceRenderer.normals import VertexNormals
+from conftest import ROOT
+
+
+def _reference(vertices, faces):
+    """Sum of the unnormalized face normals around every vertex"""
+    normals = np.zeros_like(vertices, dtype=np.float64)
+    for face in faces:
+        v0, v1, v2 = vertices[face].astype(np.float64)
+        n = np.cross(v1 - v0, v2 - v0)
+        for i in face:
+            normals[i] += n
+    return normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+
+
+def _mesh():
+    primitive = load_mesh(ROOT / 'data' / 'models' / 'face_mesh.obj').primitives[0]
+    return np.asarray(primitive.positions, dtype=np.float32), np.asarray(primitive.indices, dtype=np.int64).reshape(-1, 3)
+
+
+def test_matches_area_weighted_reference():
+    vertices, faces = _mesh()
+    normals = VertexNormals(faces, len(vertices))(vertices)
+    assert normals.dtype == np.float32 and normals.shape == vertices.shape
+    used = np.unique(faces)
+    np.testing.assert_allclose(normals[used], _reference(vertices, faces)[used], atol=1e-4)
+
+
+def test_batch_matches_single_frames():
+    vertices, faces = _mesh()
+    rng = np.random.default_rng(0)
+    frames = vertices + 0.01 * rng.standard_normal((3, *vertices.shape)).astype(np.float32)
+    normals = VertexNormals(faces, len(vertices))
+    batch = normals(frames)
+    assert batch.shape == frames.shape
+    for i in range(3):
+        np.testing.assert_allclose(batch[i], normals(frames[i]), atol=1e-6)
+
+
+def test_unindexed_triangles():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    normals = VertexNormals(None, len(vertices))(vertices)
+    np.testing.assert_allclose(normals[:3], [[0, 0, 1]] * 3)
+    np.testing.assert_allclose(normals[3:], [[1, 0, 0]] * 3)
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import numpy as np
+from conftest import ROOT
+
+
+def test_renders_without_dearpygui(fuze):
+    color, depth = fuze.render()
+    assert color.shape == (96, 72, 3) and color.dtype == np.uint8
+    assert depth.shape == (96, 72) and depth.dtype == np.float32
+    assert 0 < (depth > 0).mean() < 1
+    alpha = fuze.render('rgba')[..., 3]
+    assert (color[alpha == 0] == color[0, 0]).all() # clear color around the mesh
+
+
+def test_state_round_trip(fuze):
+    state = fuze.get_state()
+    reference = fuze.render('color').copy()
+    try:
+        fuze.set_state({'mesh_translation': [0.05, 0.0, 0.0], 'mesh_scale': 1.5, 'light_intensity': 1.0,
+                        'camera': {'type': 'persp', 'yfov': 0.8}})
+        assert fuze.get_state()['camera'] == {'type': 'persp', 'yfov': 0.8}
+        assert not np.array_equal(fuze.render('color'), reference)
+    finally:
+        fuze.set_state(state)
+    assert fuze.get_state()['camera']['type'] == 'ortho'
+    for key, value in state.items():
+        np.testing.assert_equal(fuze.get_state()[key], value)
+    np.testing.assert_array_equal(fuze.render('color'), reference)
+
+
+def test_render_frame_over_background(fuze):
+    alpha = fuze.render('rgba')[..., 3].copy() # edges are antialiased, compare the other pixels
+    background = np.zeros((96, 72, 3), dtype=np.uint8)
+    background[..., 1] = 200
+    fuze.background_image = background
+    try:
+        frame = fuze.render_frame()
+    finally:
+        fuze.background_image = None
+    assert frame.shape == (96, 72, 3)
+    np.testing.assert_array_equal(frame[alpha == 0], background[alpha == 0])
+    np.testing.assert_array_equal(frame[alpha == 255], fuze.render('color')[alpha == 255])
+
+
+def test_import_does_not_need_dearpygui():
+    code = "import sys; import PyFaceRenderer.offscreen; assert 'dearpygui' not in sys.modules"
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
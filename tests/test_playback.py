@@ -0,0 +1,125 @@
+import time
+import numpy as np
+import pytest
+import trimesh
+from PyFaceRenderer.playback import AnimationPlayer, ArrayFrames, FramePrefetcher, MeshSequenceFrames, PlaybackClock, open_frame_source
+
+
+def test_clock_follows_time():
+    clock = PlaybackClock(10, fps=10.0)
+    assert clock.frame(5.0) == 0
+    clock.play(now=100.0)
+    assert clock.frame(100.35) == 3
+    assert clock.frame(101.25) == 2 # looped
+    clock.pause(now=100.5)
+    assert clock.frame(200.0) == 5
+    clock.play(now=200.0)
+    assert clock.frame(200.25) == 7
+    clock.seek(42, now=300.0)
+    assert clock.frame(300.0) == 9
+
+
+def test_clock_stops_at_the_end():
+    clock = PlaybackClock(10, fps=10.0, speed=2.0, loop=False)
+    clock.play(now=0.0)
+    assert clock.frame(0.25) == 5 and not clock.finished(0.25)
+    assert clock.frame(3.0) == 9 and clock.finished(3.0)
+
+
+def _loaded(prefetcher, expected):
+    """Frames held by `prefetcher` once its threads have loaded `expected`"""
+    deadline = time.time() + 5.0
+    while time.time() < deadline:
+        with prefetcher._wake:
+            frames = set(prefetcher._frames)
+        if frames == expected:
+            return frames
+        time.sleep(0.001)
+    return frames
+
+
+@pytest.mark.parametrize('loop', [True, False])
+def test_prefetcher_window(loop):
+    prefetcher = FramePrefetcher(ArrayFrames(blendshapes=np.arange(10, dtype=np.float32)[:, None]), depth=3, loop=loop)
+    try:
+        assert _loaded(prefetcher, {0, 1, 2}) == {0, 1, 2}
+        assert prefetcher.get(1)[1].tolist() == [1.0]
+        assert _loaded(prefetcher, {1, 2, 3}) == {1, 2, 3}
+        window = {9, 0, 1} if loop else {9}
+        prefetcher.get(9) # the frames before it are dropped
+        assert _loaded(prefetcher, window) == window
+        prefetcher.seek(5)
+        assert prefetcher.get(5, wait=True)[1].tolist() == [5.0]
+    finally:
+        prefetcher.close()
+
+
+def _update(player, now):
+    """`update` once the frame at `now` has been prefetched"""
+    deadline = time.time() + 5.0
+    while time.time() < deadline:
+        result = player.update(now)
+        if result is not None:
+            return result
+        time.sleep(0.001)
+    raise TimeoutError(now)
+
+
+@pytest.fixture
+def player():
+    player = AnimationPlayer(ArrayFrames(blendshapes=np.arange(10, dtype=np.float32)[:, None], fps=10.0), prefetch=10)
+    yield player
+    player.close()
+
+
+def test_player_counts_dropped_frames(player):
+    player.clock.play(now=0.0)
+    index, (vertex, coefficients) = _update(player, 0.0)
+    assert index == 0 and vertex is None and coefficients.tolist() == [0.0]
+    assert player.update(0.05) is None # same frame
+    assert _update(player, 0.1)[0] == 1
+    assert _update(player, 0.45)[0] == 4
+    assert player.n_dropped == 2 and player.n_shown == 3
+    assert _update(player, 1.15)[0] == 1 # looped over 5..9 and 0
+    assert player.n_dropped == 2 + 6
+
+
+def test_player_seek_while_paused(player):
+    player.seek(6)
+    index, (_, coefficients) = player.update()
+    assert index == 6 and coefficients.tolist() == [6.0]
+    assert player.update() is None
+    player.seek(6) # shown again
+    assert player.update()[0] == 6
+    assert player.n_dropped == 0
+
+
+def test_player_stops_at_the_end():
+    player = AnimationPlayer(ArrayFrames(vertex=np.zeros((5, 2, 3)), fps=10.0), loop=False)
+    try:
+        player.clock.play(now=0.0)
+        assert _update(player, 0.0)[0] == 0
+        assert _update(player, 2.0)[0] == 4
+        assert not player.playing
+        player.play() # restarts from the first frame
+        assert player.clock.frame() in [0, 1]
+    finally:
+        player.close()
+
+
+def test_empty_source():
+    with pytest.raises(ValueError):
+        AnimationPlayer(ArrayFrames(blendshapes=np.zeros((0, 3))))
+
+
+def test_open_frame_source(tmp_path):
+    with pytest.raises(ValueError):
+        open_frame_source(tmp_path)
+    mesh = trimesh.Trimesh(np.eye(3), [[0, 1, 2]], process=False)
+    for i in range(3):
+        mesh.export(tmp_path / f'{i:04d}.obj')
+    source = open_frame_source(tmp_path, fps=30.0)
+    assert isinstance(source, MeshSequenceFrames) and len(source) == 3 and source.fps == 30.0
+    vertex, coefficients = source[2]
+    np.testing.assert_allclose(vertex, np.eye(3))
+    assert coefficients is None
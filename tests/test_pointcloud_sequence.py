@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from OpenGL.GL import GL_ARRAY_BUFFER, glBindBuffer, glGetBufferSubData
+from PyFaceRenderer.pointcloud_sequence import PointCloudSequence, stack_frames
+from PyFaceRenderer.primitive_extension import upload_instance_translations, upload_pose_data
+from conftest import close_renderer
+
+N_POINTS = 50
+
+
+def _frames(n_frames=6, n_points=N_POINTS):
+    return np.random.default_rng(0).random((n_frames, n_points, 3), dtype=np.float32) - 0.5
+
+
+def test_stack_frames(tmp_path):
+    frames = _frames()
+    files = []
+    for i, frame in enumerate(frames):
+        files.append(tmp_path / f'{i:04d}.npy')
+        np.save(files[-1], frame)
+    np.testing.assert_array_equal(stack_frames(files, tmp_path / 'stacked.npy'), frames)
+    np.testing.assert_array_equal(np.load(tmp_path / 'stacked.npy'), frames)
+    np.save(files[2], frames[2, :10])
+    with pytest.raises(ValueError):
+        stack_frames(files, tmp_path / 'stacked.npy')
+
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_sequence_from_a_directory(tmp_path, monkeypatch, cache):
+    if cache:
+        monkeypatch.setenv('PYFACERENDERER_CACHE', str(tmp_path / 'cache'))
+    frames = _frames()
+    (tmp_path / 'frames').mkdir()
+    for i, frame in enumerate(frames):
+        np.save(tmp_path / 'frames' / f'{i:04d}.npy', frame)
+    sequence = PointCloudSequence(tmp_path / 'frames', prefetch=2)
+    try:
+        assert len(sequence) == len(frames) and sequence.n_points == N_POINTS
+        for i in [0, 3, 2, 5, 1]:
+            np.testing.assert_array_equal(sequence[i], frames[i])
+        np.testing.assert_array_equal(sequence[-3], frames[0]) # clipped
+        np.testing.assert_array_equal(sequence[100], frames[-1])
+    finally:
+        sequence.close()
+    assert len(list((tmp_path / 'cache').glob('*.npy'))) == (1 if cache else 0)
+
+
+def test_sequence_from_a_file(tmp_path):
+    frames = _frames()
+    np.save(tmp_path / 'frames.npy', frames)
+    sequence = PointCloudSequence(tmp_path / 'frames.npy', prefetch=0)
+    np.testing.assert_array_equal(sequence[4], frames[4])
+    np.save(tmp_path / 'flat.npy', frames[0])
+    with pytest.raises(ValueError):
+        PointCloudSequence(tmp_path / 'flat.npy')
+
+
+@pytest.fixture(scope='module')
+def spheres():
+    from PyFaceRenderer.offscreen import OffscreenFaceRenderer
+    renderer = OffscreenFaceRenderer('pointcloud', height=64, width=64, n_points=N_POINTS)
+    renderer.update_pointcloud_size(0.02)
+    renderer.render()
+    yield renderer
+    close_renderer(renderer)
+
+
+def _instance_buffer(renderer, primitive) -> np.ndarray:
+    def read():
+        glBindBuffer(GL_ARRAY_BUFFER, primitive._buffers[1])
+        return np.frombuffer(glGetBufferSubData(GL_ARRAY_BUFFER, 0, len(primitive.poses) * 64), dtype=np.float32)
+    return renderer.run_gl(read).reshape(len(primitive.poses), 16).copy()
+
+
+def test_translation_upload_matches_full_upload(spheres):
+    primitive = spheres.mesh.primitives[0]
+    frames = _frames(2)
+    spheres.update_points(frames[0])
+    translated = _instance_buffer(spheres, primitive)
+    spheres.run_gl(lambda: upload_pose_data(primitive))
+    np.testing.assert_array_equal(translated, _instance_buffer(spheres, primitive))
+
+    primitive.poses[10:20, :3, 3] = frames[1, 10:20]
+    spheres.run_gl(lambda: upload_instance_translations(primitive, (10, 20)))
+    translated = _instance_buffer(spheres, primitive)
+    spheres.run_gl(lambda: upload_pose_data(primitive))
+    np.testing.assert_array_equal(translated, _instance_buffer(spheres, primitive))
+
+
+def test_update_points_moves_the_spheres(spheres):
+    points = np.zeros((N_POINTS, 3), dtype=np.float32)
+    spheres.update_points(points)
+    centered = spheres.render()[1] > 0
+    points[:, 0] = 0.4
+    spheres.update_points(points)
+    moved = spheres.render()[1] > 0
+    assert centered[32, 32] and not moved[32, 32]
+    assert np.nonzero(moved)[1].mean() > np.nonzero(centered)[1].mean()
+    with pytest.raises(ValueError):
+        spheres.update_points(points[:10])
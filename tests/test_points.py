@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from PyFaceRenderer.points import points_mesh
+from conftest import close_renderer
+
+SIZE = 64
+
+
+@pytest.fixture(scope='module')
+def point():
+    """One red point sprite at the origin, seen from 0.5 through a 90° perspective camera"""
+    from PyFaceRenderer.offscreen import OffscreenFaceRenderer
+    renderer = OffscreenFaceRenderer(points_mesh(np.zeros((1, 3)), colors=np.array([[1.0, 0.0, 0.0]])),
+                                     height=SIZE, width=SIZE, camera_type='persp')
+    yield renderer
+    close_renderer(renderer)
+
+
+def _sprite(renderer, radius:float, distance:float=0.5):
+    pose = np.eye(4)
+    pose[2, 3] = distance
+    renderer.camera_pose = pose
+    renderer.point_radius = radius
+    color, depth = renderer.render()
+    return color, depth > 0
+
+
+@pytest.mark.parametrize('radius, distance', [(0.1, 0.5), (0.2, 1.0), (0.15, 0.5), (0.1, 1.0)])
+def test_sprite_is_a_round_disk_of_the_projected_size(point, radius, distance):
+    color, covered = _sprite(point, radius, distance)
+    diameter = radius * SIZE / distance # yfov 90°: one world unit at distance 1 spans half the height
+    ys, xs = np.nonzero(covered)
+    assert abs((xs.max() - xs.min() + 1) - diameter) <= 2
+    assert abs((ys.max() - ys.min() + 1) - diameter) <= 2
+    assert covered.sum() == pytest.approx(np.pi * diameter**2 / 4, rel=0.2) # a square would cover 4/pi more
+    assert (color[SIZE // 2, SIZE // 2] == [255, 0, 0]).sum() >= 2 # shaded red
+
+
+def test_depth_only_pass_draws_sprites(point):
+    _, covered = _sprite(point, 0.1)
+    depth = point.render('depth')
+    np.testing.assert_array_equal(depth > 0, covered)
+
+
+def test_update_pointcloud_size_scales_sprites(point):
+    assert point.mesh_type == 'points'
+    _sprite(point, 0.1)
+    point.update_pointcloud_size(0.05)
+    small = (point.render('depth') > 0).sum()
+    point.update_pointcloud_size(0.1)
+    assert (point.render('depth') > 0).sum() > small > 0
+
+
+def test_points_model():
+    from types import SimpleNamespace
+    from pyrender.constants import GLTF
+    from PyFaceRenderer.models import load_model
+    renderer = SimpleNamespace()
+    load_model(renderer, 'points', n_points=2000)
+    assert renderer.mesh_type == 'points'
+    assert renderer.mesh.primitives[0].mode == GLTF.POINTS and len(renderer.mesh.primitives[0].positions) == 2000
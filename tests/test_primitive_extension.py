@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from OpenGL.GL import GL_ARRAY_BUFFER, glBindBuffer, glGetBufferSubData
+from PyFaceRenderer.primitive_extension import AttributeStream, dirty_range, merge_ranges, upload_vertex_data
+
+
+def test_dirty_range():
+    old = np.zeros((10, 3), dtype=np.float32)
+    new = old.copy()
+    assert dirty_range(old, new) == (0, 0)
+    new[3, 1] = 1.0
+    new[6, 0] = 1.0
+    assert dirty_range(old, new) == (3, 7)
+    assert dirty_range(None, new) is None
+    assert dirty_range(old[:5], new) is None
+    assert dirty_range(new, new) is None # edited in place, the previous values are gone
+
+
+def test_merge_ranges():
+    assert merge_ranges((2, 4), (6, 9)) == (2, 9)
+    assert merge_ranges((0, 0), (6, 9)) == (6, 9)
+    assert merge_ranges((2, 4), (0, 0)) == (2, 4)
+    assert merge_ranges(None, (6, 9)) is None
+
+
+def _vbo(renderer, stream:AttributeStream) -> np.ndarray:
+    def read():
+        glBindBuffer(GL_ARRAY_BUFFER, stream.vbo)
+        return np.frombuffer(glGetBufferSubData(GL_ARRAY_BUFFER, 0, stream.n_vertex * stream.size * 4), dtype=np.float32)
+    return renderer.run_gl(read).reshape(stream.n_vertex, stream.size)
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """(attribute location, vertex range) of every attribute upload"""
+    calls = []
+    upload = AttributeStream.upload
+    def record(self, data, vertex_range=None):
+        calls.append((self.location, vertex_range))
+        return upload(self, data, vertex_range)
+    monkeypatch.setattr(AttributeStream, 'upload', record)
+    return calls
+
+
+def test_update_mesh_uploads_the_dirty_range(fuze, uploads):
+    primitive = fuze.mesh.primitives[0]
+    positions = np.array(primitive.positions)
+    fuze.render()
+    fuze.update_mesh(positions.copy()) # first update moves the attributes into their own buffers
+    streams = primitive.face_renderer_streams
+    try:
+        uploads.clear()
+        vertex = positions.copy()
+        vertex[100:120] += 0.01
+        fuze.update_mesh(vertex)
+        (_, position_range), (_, normal_range) = uploads
+        assert position_range == normal_range # normals around the moved vertices change too
+        assert position_range[0] <= 100 and position_range[1] >= 120 and position_range[1] - position_range[0] < len(vertex)
+        np.testing.assert_array_equal(_vbo(fuze, streams['positions']), primitive.positions)
+        np.testing.assert_allclose(_vbo(fuze, streams['normals']), primitive.normals)
+        partial = fuze.render('color').copy()
+        fuze.run_gl(lambda: upload_vertex_data(primitive, normals=True)) # full upload
+        np.testing.assert_array_equal(fuze.render('color'), partial)
+
+        uploads.clear()
+        fuze.update_mesh(vertex.copy())
+        assert [r for _, r in uploads] == [(0, 0), (0, 0)] # nothing moved, nothing uploaded
+        vertex[5] += 0.01
+        fuze.update_mesh(vertex) # the caller's array becomes the positions
+        vertex[200] += 0.01
+        uploads.clear()
+        fuze.update_mesh(vertex) # edited in place
+        assert [r for _, r in uploads][0] is None
+        np.testing.assert_array_equal(_vbo(fuze, streams['positions']), vertex)
+    finally:
+        fuze.update_mesh(positions)
@@ -0,0 +1,71 @@
+import json
+import time
+import pytest
+from PyFaceRenderer import readback
+from PyFaceRenderer.profiling import StageProfiler
+
+
+def test_stage_statistics():
+    profiler = StageProfiler(window=3)
+    for _ in range(5):
+        with profiler.stage('draw'):
+            time.sleep(0.001)
+    with profiler.stage('readback'):
+        pass
+    stats = profiler.stats()
+    assert list(stats) == ['draw', 'readback']
+    assert stats['draw']['count'] == 5 # rolling statistics over the last `window`
+    assert 1.0 <= stats['draw']['mean_ms'] <= stats['draw']['max_ms']
+    assert 'draw' in profiler.summary()
+    profiler.reset()
+    assert profiler.stats() == {}
+
+
+def test_timed_iteration():
+    profiler = StageProfiler()
+    assert list(profiler.timed('load', range(4))) == [0, 1, 2, 3]
+    assert profiler.stats()['load']['count'] == 4
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler(enabled=False)
+    with profiler.stage('draw'):
+        pass
+    profiler.record('draw', 0, 10)
+    assert list(profiler.timed('load', [1])) == [1]
+    assert profiler.stats() == {}
+
+
+def test_export_trace(tmp_path):
+    profiler = StageProfiler()
+    with profiler.stage('draw'):
+        pass
+    filename = profiler.export_trace(tmp_path / 'traces' / 'trace.json')
+    trace = json.loads(filename.read_text())
+    event, = trace['traceEvents']
+    assert event['name'] == 'draw' and event['ph'] == 'X' and event['dur'] >= 0
+    assert 'draw' in trace['otherData']['stats']
+
+
+@pytest.fixture
+def gl_finish(monkeypatch):
+    calls = []
+    finish = readback.glFinish
+    monkeypatch.setattr(readback, 'glFinish', lambda: (calls.append(1), finish()))
+    return calls
+
+
+def test_readback_only_syncs_on_request(fuze, gl_finish):
+    fuze.profiler.reset()
+    assert fuze.profiler.enabled and not fuze.profiler.sync_gpu
+    for outputs in ['none', 'rgba', 'color+depth']:
+        fuze.render(outputs)
+    fuze.render_views([fuze.camera_pose] * 4, atlas=True)
+    assert gl_finish == []
+    assert {'scene_update', 'gl_draw', 'readback'} <= set(fuze.profiler.stats())
+    fuze.profiler.sync_gpu = True
+    try:
+        fuze.render('color')
+    finally:
+        fuze.profiler.sync_gpu = False
+    assert len(gl_finish) == 1
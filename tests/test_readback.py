@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from pyrender import RenderFlags
+from pyrender.renderer import Renderer
+
+
+def _pyrender_read(renderer, flags):
+    """What pyrender's own `_read_main_framebuffer` reads from the last render"""
+    return renderer.run_gl(lambda: Renderer._read_main_framebuffer(renderer._renderer._renderer, renderer.scene, flags))
+
+
+@pytest.mark.parametrize('outputs, flags', [('color+depth', RenderFlags.NONE), ('rgba+depth', RenderFlags.RGBA)])
+def test_reader_matches_pyrender(fuze, outputs, flags):
+    color, depth = fuze.render(outputs)
+    expected_color, expected_depth = _pyrender_read(fuze, flags)
+    np.testing.assert_array_equal(color, expected_color)
+    np.testing.assert_allclose(depth, expected_depth, rtol=1e-6)
+    assert (depth == 0).sum() == (expected_depth == 0).sum() > 0
+
+
+def test_partial_outputs(fuze):
+    color, depth = [a.copy() for a in fuze.render('color+depth')]
+    np.testing.assert_array_equal(fuze.render('color'), color)
+    np.testing.assert_array_equal(fuze.render('depth'), depth)
+    rgba = fuze.render('rgba')
+    np.testing.assert_array_equal(rgba[..., :3], color)
+    assert rgba.shape[-1] == 4 and set(np.unique(rgba[..., 3])) >= {0, 255}
+    assert fuze.render('none') is None
+    with pytest.raises(ValueError):
+        fuze.render('normals')
+
+
+def test_buffers_are_reused(fuze):
+    first = fuze.render('color')
+    assert fuze.render('color') is first
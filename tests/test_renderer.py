@@ -0,0 +1,73 @@
+import dearpygui.dearpygui as dpg
+import numpy as np
+import pytest
+from conftest import close_renderer
+
+
+@pytest.fixture(scope='module')
+def threaded():
+    """FaceRenderer whose GL context belongs to its render thread"""
+    from PyFaceRenderer.renderer import FaceRenderer
+    dpg.create_context()
+    renderer = FaceRenderer('fuze', height=96, width=72, render_thread=True)
+    renderer.show_face_renderer(show_control=True)
+    yield renderer
+    renderer.unload_playback()
+    close_renderer(renderer) # also frees the export context, they share the EGL display
+    dpg.destroy_context()
+
+
+def _reference(renderer):
+    return renderer.run_gl(lambda: [a.copy() for a in renderer.render('rgba+depth')])
+
+
+def test_render_from_the_ui_thread(threaded):
+    color, depth = threaded._render()
+    reference_color, reference_depth = _reference(threaded)
+    assert color.shape == (96, 72, 4) and depth.shape == (96, 72)
+    np.testing.assert_array_equal(color, reference_color)
+    np.testing.assert_array_equal(depth, reference_depth)
+    assert 0 < (depth > 0).mean() < 1
+    texture = np.array(dpg.get_value('__face_renderer_texture_tag')).reshape(96, 72, 4)
+    np.testing.assert_allclose(texture, color / 255.0, atol=1e-6)
+
+
+def test_render_while_the_worker_renders(threaded):
+    reference_color, _ = _reference(threaded)
+    for _ in range(20):
+        threaded.request_render() # frames rendered by the worker reuse the readback buffers
+        color, _ = threaded._render()
+        np.testing.assert_array_equal(color, reference_color)
+
+
+def test_gl_work_runs_on_the_render_thread(threaded):
+    primitive = threaded.mesh.primitives[0]
+    positions = np.array(primitive.positions)
+    reference, _ = _reference(threaded)
+    try:
+        threaded.update_mesh(positions + [0.02, 0.0, 0.0], update_normal=False) # keep the normals of the file
+        moved, _ = threaded._render()
+        assert not np.array_equal(moved, reference)
+        views = threaded.render_views(np.stack([threaded.camera_pose] * 2), outputs='rgba')
+        np.testing.assert_array_equal(views[0], moved)
+    finally:
+        threaded.update_mesh(positions, update_normal=False)
+    np.testing.assert_array_equal(threaded._render()[0], reference)
+
+
+def test_export_renders_a_snapshot_of_the_state(threaded):
+    state = threaded.get_state()
+    exported = {}
+    def export(renderer):
+        exported['renderer'] = renderer
+        exported['state'] = renderer.get_state()
+        exported['frame'] = renderer.render('color').copy()
+    threaded._run_export(export)
+    threaded.mesh_scale = 2.0 # the UI stays live while the export runs
+    try:
+        threaded.run_gl(lambda: None) # tasks run in order, the export is done
+        assert exported['renderer'] is not threaded
+        assert exported['state']['mesh_scale'] == state['mesh_scale']
+    finally:
+        threaded.set_state(state)
+    np.testing.assert_array_equal(exported['frame'], threaded.run_gl(lambda: threaded.render('color').copy()))
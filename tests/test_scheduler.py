@@ -0,0 +1,90 @@
+import threading
+import time
+import dearpygui.dearpygui as dpg
+import numpy as np
+import pytest
+from PyFaceRenderer.scheduler import RenderScheduler, RenderWorker
+
+
+@pytest.fixture
+def dpg_context():
+    dpg.create_context()
+    yield
+    dpg.destroy_context()
+
+
+def test_renders_right_away_without_frame_loop():
+    renders = []
+    scheduler = RenderScheduler(lambda: renders.append(1))
+    scheduler.request()
+    scheduler.request()
+    assert len(renders) == 2
+
+
+def test_coalesces_requests_into_one_render_per_frame(dpg_context):
+    renders, calls = [], []
+    scheduler = RenderScheduler(lambda: renders.append(len(calls)))
+    scheduler.add_frame_callback(lambda: calls.append(1))
+    scheduler.running = True # as inside `run`
+    for _ in range(5):
+        scheduler.request()
+    assert renders == []
+    scheduler.run_frame()
+    assert renders == [1] # after the frame callbacks
+    scheduler.run_frame()
+    assert renders == [1] # nothing changed
+    callback = scheduler._frame_callbacks[0]
+    scheduler.remove_frame_callback(callback)
+    scheduler.request()
+    scheduler.run_frame()
+    assert renders == [1, 2] and len(calls) == 2 # rendered, without the removed callback
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.001)
+
+
+def test_worker_runs_tasks_on_its_thread():
+    threads = []
+    worker = RenderWorker(lambda: threads.append(threading.get_ident()), lambda texture: None, (2, 3))
+    worker.start()
+    try:
+        assert worker.submit(threading.get_ident) == threads[0] != threading.get_ident()
+        futures = [worker.submit(lambda i=i: i, wait=False) for i in range(10)]
+        assert [future.result() for future in futures] == list(range(10)) # in order
+        with pytest.raises(ZeroDivisionError):
+            worker.submit(lambda: 1 / 0)
+        assert worker.submit(lambda: worker.submit(lambda: 'nested')) == 'nested'
+    finally:
+        worker.stop()
+
+
+def test_worker_double_buffers_frames():
+    frame = [1]
+    renders = []
+    def render(texture):
+        renders.append(frame[0])
+        texture.data[:] = frame[0]
+    worker = RenderWorker(lambda: None, render, (2, 3))
+    presented = []
+    present = lambda texture: presented.append(texture.data.copy())
+    assert not worker.present(present)
+    worker.request()
+    worker.request() # pending requests collapse into one frame
+    worker.start()
+    try:
+        _wait(lambda: worker._fresh)
+        assert worker.present(present)
+        assert not worker.present(present)
+        frame[0] = 2
+        worker.request()
+        _wait(lambda: worker._fresh)
+        assert worker.present(present)
+        assert renders == [1, 2]
+        assert [p.max() for p in presented] == [1, 2]
+        assert worker._front is not worker._back
+    finally:
+        worker.stop()
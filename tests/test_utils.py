@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from PyFaceRenderer.utils import TextureBuffer, numpy2texture_data
+
+
+def _frame(channels, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(5, 4, channels), dtype=np.uint8)
+
+
+@pytest.mark.parametrize('bgr', [False, True])
+def test_convert_rgb_matches_numpy2texture_data(bgr):
+    frame = _frame(3)
+    with pytest.warns(DeprecationWarning):
+        expected = numpy2texture_data(frame, bgr=bgr)
+    np.testing.assert_allclose(TextureBuffer(5, 4).convert(frame, bgr=bgr), expected, rtol=1e-6)
+
+
+def test_convert_rgba_matches_numpy2texture_data():
+    frame = _frame(4)
+    with pytest.warns(DeprecationWarning):
+        expected = numpy2texture_data(frame, bgr=False)
+    np.testing.assert_allclose(TextureBuffer(5, 4).convert(frame), expected, rtol=1e-6)
+
+
+def test_convert_reuses_the_buffer():
+    texture = TextureBuffer(5, 4)
+    data = texture.convert(_frame(4))
+    assert np.shares_memory(data, texture.data) and data.dtype == np.float32
+    data = texture.convert(_frame(3, seed=1)) # RGB after RGBA resets the alpha
+    assert np.shares_memory(data, texture.data)
+    assert (texture.data[..., 3] == 1.0).all()
+    np.testing.assert_allclose(texture.data[..., :3], _frame(3, seed=1) / 255.0, rtol=1e-6)
+    with pytest.raises(AssertionError):
+        texture.convert(np.zeros((4, 4, 3), dtype=np.uint8))